@@ -1,5 +1,4 @@
 import os
-import json
 import base64
 import io
 from typing import Optional
@@ -9,26 +8,58 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import torch
 from fastapi import HTTPException
-from chronos import BaseChronosPipeline
+from chronos import ChronosPipeline
 from jwt_utils import verify_token
+from adapters.forecast_workers import get_forecaster
+from adapters.ledger_source import get_source
+from adapters.ledger_store import LedgerStore, forecast_index, normalize_account_name
+from adapters.model_registry import DEFAULT_MODEL_ID, get_pipeline, wait_for_pipeline, warm_up
 
 class NOCFOAdapter:
-    def __init__(self, json_path: Optional[str] = None):
+    def __init__(self, json_path: Optional[str] = None, model_id: str = DEFAULT_MODEL_ID, lazy: bool = False, seed: int = 0):
         self.json_path = json_path or self._default_path()
-        self.data = self._load_data()
-        self.pipeline = BaseChronosPipeline.from_pretrained(
-            "amazon/chronos-t5-small",
+        # parsed once and shared with the other adapters, re-parsed only when the file changes
+        self.source = get_source(self.json_path)
+        self.source.ledger  # parse now, so a missing or invalid file fails at startup
+        self.model_id = model_id
+        self.seed = seed
+        self.ready_timeout = float(os.getenv("CHRONOS_READY_TIMEOUT") or 120)
+        # period of the forecast series, when not given per call: daily, weekly or monthly
+        self.frequency = os.getenv("NOCFO_FORECAST_FREQUENCY") or "monthly"
+        if lazy:
+            # Load in the background so the server can accept connections right away.
+            warm_up(model_id, device_map="cpu", torch_dtype=torch.float32)
+        else:
+            get_pipeline(model_id, device_map="cpu", torch_dtype=torch.float32)
+
+    @property
+    def pipeline(self):
+        return get_pipeline(
+            self.model_id,
+            device_map="cpu",
+            torch_dtype=torch.float32,
+            timeout=self.ready_timeout,
+        )
+
+    async def wait_until_ready(self, timeout: Optional[float] = None):
+        await wait_for_pipeline(
+            self.model_id,
             device_map="cpu",
             torch_dtype=torch.float32,
+            timeout=self.ready_timeout if timeout is None else timeout,
         )
 
     def _default_path(self):
         current_dir = os.path.dirname(os.path.abspath(__file__))
         return os.path.join(os.path.dirname(current_dir), "NOCFO.json")
 
-    def _load_data(self):
-        with open(self.json_path, 'r') as f:
-            return json.load(f)
+    @property
+    def data(self) -> dict:
+        return self.source.data
+
+    @property
+    def ledger(self) -> LedgerStore:
+        return self.source.ledger
 
     def get_company_financials_from_token(self, report_type: str, token: Optional[str]) -> dict:
         if not token:
@@ -39,13 +70,14 @@ class NOCFOAdapter:
         except HTTPException as e:
             return {"error": f"Authentication failed: {e.detail}"}
 
-        if company_id not in self.data:
+        if company_id not in self.source:
             return {"error": f"Company '{company_id}' not found"}
 
+        company_data = self.source.company(company_id)
         if report_type == "all":
-            return {company_id: self.data[company_id]}
-        elif report_type in self.data[company_id]:
-            return {company_id: {report_type: self.data[company_id][report_type]}}
+            return {company_id: company_data}
+        elif report_type in company_data:
+            return {company_id: {report_type: company_data[report_type]}}
         else:
             return {"error": f"Report type '{report_type}' not found for {company_id}"}
 
@@ -63,65 +95,78 @@ class NOCFOAdapter:
         except HTTPException as e:
             return {"error": f"Authentication failed: {e.detail}"}
 
-        if company_id not in self.data:
+        if company_id not in self.source:
             return {"error": f"Company '{company_id}' not found"}
 
+        company_data = self.source.company(company_id)
         if report_type == "all":
-            return {company_id: self.data[company_id]}
-        elif report_type in self.data[company_id]:
-            return {company_id: {report_type: self.data[company_id][report_type]}}
+            return {company_id: company_data}
+        elif report_type in company_data:
+            return {company_id: {report_type: company_data[report_type]}}
         else:
             return {"error": f"Report type '{report_type}' not found for {company_id}"}
 
 # ================================================================================================
 # Chronos related function
 # ================================================================================================
-    def extract_metric_series(self, company_data: dict, metric: str) -> pd.Series:
-        ledger = company_data.get("ledger", [])
-        series = []
-        for acc in ledger:
-            acc_key = acc["account_name"].lower().replace(" ", "_")
-            if metric in acc_key:
-
-                for entry in sorted(acc["entries"], key=lambda x: x["date"]):
-                    net = entry.get("debet", 0) - entry.get("credit", 0)
-                    series.append(net)
-        return pd.Series(series)
+    def extract_metric_series(self, company_name: str, metric: str, frequency: Optional[str] = None) -> pd.Series:
+        # net amounts of every account whose name contains the metric, summed per period and indexed by period
+        return self.ledger.metric_series(company_name, metric, frequency or self.frequency)
 
     def format_metric_name(self, metric: str) -> str:
         return metric.replace("_", " ").title()
 
-    def forecast_company_metric(self, company_name: str, metric: str, forecast_periods: int = 12) -> dict:
-        company = self.data.get(company_name)
-        if not company:
+    def _prepare_forecast(self, company_name: str, metric: str, forecast_periods: int, frequency: Optional[str] = None):
+        if company_name not in self.ledger:
             raise ValueError(f"Company '{company_name}' not found in data.")
 
-        normalized_metric = metric.lower().replace(" ", "_")
-        ts = self.extract_metric_series(company, normalized_metric)
+        frequency = frequency or self.frequency
+        ts = self.extract_metric_series(company_name, normalize_account_name(metric), frequency)
         if len(ts) < 10:
             raise ValueError(f"Chronos model requires at least 10 historical time points, but only {len(ts)} were found.")
 
-        ledger_entries = []
-        for acc in company.get("ledger", []):
-            acc_key = acc["account_name"].lower().replace(" ", "_")
-            if acc_key == normalized_metric:
-                ledger_entries = sorted(acc["entries"], key=lambda x: x["date"])
-                break
-
-        if len(ledger_entries) < len(ts):
-            raise ValueError("Mismatch between extracted time series and ledger entries.")
+        history_index = ts.index
+        return ts, history_index, forecast_index(history_index, forecast_periods, frequency)
 
-        start_date = pd.to_datetime(ledger_entries[0]["date"])
-        history_index = pd.date_range(start=start_date, periods=len(ts), freq="MS")
-        forecast_index = pd.date_range(start=history_index[-1] + pd.offsets.MonthBegin(), periods=forecast_periods, freq="MS")
+    def _predict_kwargs(self, pipeline) -> dict:
+        # Roll out long horizons in one KV-cached decoding pass instead of re-encoding per chunk,
+        # and decode all sample paths against a single encoder pass per series.
+        if isinstance(pipeline, ChronosPipeline):
+            return {"long_horizon": "incremental", "decoding": "shared_encoder"}
+        return {}
 
+    def forecast_company_metric(self, company_name: str, metric: str, forecast_periods: int = 12, frequency: Optional[str] = None) -> dict:
+        ts, history_index, forecast_index = self._prepare_forecast(company_name, metric, forecast_periods, frequency)
+        context = torch.tensor(ts.values, dtype=torch.float32)
+        pipeline = self.pipeline
+        quantiles, _ = get_forecaster().submit(
+            pipeline,
+            self.model_id,
+            context,
+            prediction_length=forecast_periods,
+            quantile_levels=[0.1, 0.5, 0.9],
+            seed=self.seed,
+            **self._predict_kwargs(pipeline),
+        ).result()
+        return self._render_forecast(company_name, metric, ts, history_index, forecast_index, quantiles)
+
+    async def forecast_company_metric_async(self, company_name: str, metric: str, forecast_periods: int = 12, frequency: Optional[str] = None) -> dict:
+        """Same as ``forecast_company_metric``, but awaits the forecast so concurrent calls share a batch and the event loop stays free."""
+        ts, history_index, forecast_index = self._prepare_forecast(company_name, metric, forecast_periods, frequency)
         context = torch.tensor(ts.values, dtype=torch.float32)
-        quantiles, _ = self.pipeline.predict_quantiles(
-            context=context,
+        pipeline = self.pipeline
+        quantiles, _ = await get_forecaster().forecast(
+            pipeline,
+            self.model_id,
+            context,
             prediction_length=forecast_periods,
             quantile_levels=[0.1, 0.5, 0.9],
+            seed=self.seed,
+            **self._predict_kwargs(pipeline),
         )
+        return self._render_forecast(company_name, metric, ts, history_index, forecast_index, quantiles)
 
+    def _render_forecast(self, company_name: str, metric: str, ts: pd.Series, history_index, forecast_index, quantiles: torch.Tensor) -> dict:
         low, median, high = quantiles[0, :, 0], quantiles[0, :, 1], quantiles[0, :, 2]
 
 
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from chronos import EmbeddingStore
+
+from adapters.ledger_store import LedgerStore
+from adapters.vector_index import VectorIndex
+
+
+class CompanySimilarityIndex:
+    """
+    Nearest-neighbour search over the ledger series of all companies.
+
+    Every ledger account of every company in the adapter's ledger store is embedded
+    into one pooled float16 vector with the Chronos encoder and added to a
+    ``VectorIndex``. Encoder embeddings are kept in an ``EmbeddingStore`` keyed
+    by company and account, so rebuilding after entries were appended only
+    embeds the series that changed.
+    """
+
+    def __init__(self, nocfo, pooling: str = "mean", mode: Optional[str] = None, n_probe: int = 4):
+        self.nocfo = nocfo
+        self.pooling = pooling
+        self.mode = mode or os.getenv("CHRONOS_INDEX_MODE") or "exact"
+        self.n_probe = n_probe
+        self.index: Optional[VectorIndex] = None
+        self.entries: Dict[str, dict] = {}
+        self.max_memory_mb = float(os.getenv("CHRONOS_EMBEDDING_STORE_MB") or 256)
+        self.spill_path = os.getenv("CHRONOS_EMBEDDING_SPILL_PATH") or None
+        self._store: Optional[EmbeddingStore] = None
+        # the ledger the index was built from; a reload replaces the store object
+        self._ledger: Optional[LedgerStore] = None
+        self._lock = threading.Lock()
+        self.build_seconds: Optional[float] = None
+
+    @staticmethod
+    def ledger_series(ledger: LedgerStore) -> Dict[str, Tuple[dict, torch.Tensor]]:
+        series = {}
+        for company in ledger.companies:
+            for account_number, account_name in ledger.accounts(company).items():
+                values = ledger.column("net", company, account_number)
+                if not len(values):
+                    continue
+                entry_id = f"{company}/{account_number}"
+                info = {
+                    "company": company,
+                    "account_number": account_number,
+                    "account_name": account_name,
+                }
+                series[entry_id] = (info, torch.tensor(values, dtype=torch.float32))
+        return series
+
+    def build(self):
+        start = time.perf_counter()
+        ledger = self.nocfo.ledger
+        series = self.ledger_series(ledger)
+        pipeline = self.nocfo.pipeline
+        if self._store is None or self._store.pipeline is not pipeline:
+            self._store = EmbeddingStore(pipeline, max_memory_mb=self.max_memory_mb, spill_path=self.spill_path)
+        # drop the embeddings of series that no longer exist
+        for entry_id in set(self.entries) - set(series):
+            self._store.invalidate(entry_id)
+
+        ids = list(series)
+        misses = self._store.misses
+        if ids:
+            pooled = self._store.embed_pooled([series[i][1] for i in ids], keys=ids, pooling=self.pooling)
+            index = VectorIndex(pooled.shape[-1], mode=self.mode, n_probe=self.n_probe)
+            index.add(ids, pooled)
+        else:
+            index = VectorIndex(0, mode=self.mode, n_probe=self.n_probe)
+        embedded = self._store.misses - misses
+        self.index = index
+        self.entries = {entry_id: info for entry_id, (info, _) in series.items()}
+        self._ledger = ledger
+        self.build_seconds = time.perf_counter() - start
+        print(f"[SIMILARITY] Indexed {len(ids)} ledger series ({embedded} embedded) in {self.build_seconds:.2f}s")
+
+    def _ensure_built(self):
+        with self._lock:
+            if self.index is None or self._ledger is not self.nocfo.ledger:
+                self.build()
+
+    def find_similar(self, company_name: str, account_number: int = 1910, k: int = 3) -> dict:
+        self._ensure_built()
+        entry_id = f"{company_name}/{account_number}"
+        if entry_id not in self.entries:
+            return {"error": f"No ledger series for account {account_number} of '{company_name}'"}
+
+        start = time.perf_counter()
+        query = self.index.vector(entry_id)
+        # ask for enough neighbours to still have k companies after dropping the
+        # company's own accounts and further accounts of already matched companies
+        own = sum(1 for info in self.entries.values() if info["company"] == company_name)
+        neighbours = self.index.search(query, k=4 * k + own)[0]
+
+        matches: List[dict] = []
+        seen = set()
+        for neighbour_id, similarity in neighbours:
+            info = self.entries[neighbour_id]
+            if info["company"] == company_name or info["company"] in seen:
+                continue
+            seen.add(info["company"])
+            matches.append({**info, "similarity": round(similarity, 4)})
+            if len(matches) == k:
+                break
+        return {
+            "company": company_name,
+            "account_number": account_number,
+            "matches": matches,
+            "query_ms": round(1000 * (time.perf_counter() - start), 3),
+        }
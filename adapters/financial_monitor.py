@@ -1,47 +1,58 @@
-import json
+import asyncio
+import os
+import numpy as np
 import pandas as pd
 import torch
 from datetime import datetime, timedelta
-from chronos import BaseChronosPipeline
 from dateutil.relativedelta import relativedelta
 import calendar
+from chronos import ChronosPipeline
+from adapters.forecast_workers import get_forecaster
+from adapters.ledger_source import get_source
+from adapters.model_registry import DEFAULT_MODEL_ID, get_pipeline, wait_for_pipeline
 
 class FinancialMonitorAdapter:
-    def __init__(self, company_data_path="NOCFO.json"):
+    PREDICTION_MONTHS = 3
+
+    def __init__(self, company_data_path="NOCFO.json", model_id=DEFAULT_MODEL_ID, seed=0):
         self.accounts = {
             1910: "Bank Account",
             4000: "Revenue Account",
             6000: "Expense Account"
         }
         self.company_data_path = company_data_path
-        self.company_data = None
+        self.model_id = model_id
+        self.seed = seed
+        self.ready_timeout = float(os.getenv("CHRONOS_READY_TIMEOUT") or 120)
+        self.ledger = None
         self.company_name = None
 
+    async def wait_until_ready(self, timeout=None):
+        await wait_for_pipeline(
+            self.model_id,
+            device_map="cpu",
+            torch_dtype=torch.float32,
+            timeout=self.ready_timeout if timeout is None else timeout,
+        )
+
     def set_company(self, company_name: str):
-        with open(self.company_data_path, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-        if company_name not in all_data:
+        ledger = get_source(self.company_data_path).ledger
+        if company_name not in ledger:
             raise ValueError(f"Company '{company_name}' not found in data")
-        self.company_data = all_data[company_name]
+        self.ledger = ledger
         self.company_name = company_name
 
     def load_company_df(self):
-        records = []
-        for account_data in self.company_data.get("ledger", []):
-            account_number = int(account_data.get("account_number"))
-            for entry in account_data.get("entries", []):
-                if "date" in entry and entry["date"] is not None:
-                    debit_value = float(entry.get("debit", entry.get("debet", 0)))
-                    credit_value = float(entry.get("credit", 0))
-                    records.append({
-                        "date": entry["date"],
-                        "account_number": account_number,
-                        "net_flow": credit_value - debit_value
-                    })
-        if not records:
+        ledger, company = self.ledger, self.company_name
+        dates = ledger.column("date", company)
+        dated = ~np.isnat(dates)
+        if not dated.any():
             return pd.DataFrame()
-        df = pd.DataFrame(records)
-        df['date'] = pd.to_datetime(df['date'])
+        df = pd.DataFrame({
+            "date": dates[dated].astype("datetime64[ns]"),
+            "account_number": ledger.column("account_number", company)[dated],
+            "net_flow": ledger.column("net_flow", company)[dated],
+        })
         df['month'] = df['date'].dt.to_period('M').dt.to_timestamp()
         return df
 
@@ -70,27 +81,55 @@ class FinancialMonitorAdapter:
 
         return ts_data
 
-    def run_forecast(self, ts_data, prediction_length=3):
+    def _submit_forecasts(self, ts_data, prediction_length):
         valid_ts_data = {k: v for k, v in ts_data.items() if len(v) > 3}
         if not valid_ts_data:
             print("Warning: No accounts have sufficient historical months for forecasting.")
-            return {acc: [] for acc in self.accounts}
+            return None
 
-        pipeline = BaseChronosPipeline.from_pretrained("amazon/chronos-t5-small")
-        contexts = [torch.tensor(v.values, dtype=torch.float32) for v in valid_ts_data.values()]
-        padded = torch.nn.utils.rnn.pad_sequence(contexts, batch_first=True)
+        pipeline = get_pipeline(self.model_id, device_map="cpu", torch_dtype=torch.float32, timeout=self.ready_timeout)
 
         print("Running Chronos prediction (monthly)...")
-        forecast = pipeline.predict(padded, prediction_length=prediction_length, num_samples=20)
+        predict_kwargs = {"num_samples": 20, "decoding": "shared_encoder"} if isinstance(pipeline, ChronosPipeline) else {}
+        # One request per account: the batcher (or worker pool) forecasts them in
+        # a single predict call together with any other account forecasts in flight.
+        forecaster = get_forecaster()
+        return {
+            acc: forecaster.submit(
+                pipeline,
+                self.model_id,
+                torch.tensor(v.values, dtype=torch.float32),
+                prediction_length=prediction_length,
+                quantile_levels=[0.5],
+                seed=self.seed,
+                **predict_kwargs,
+            )
+            for acc, v in valid_ts_data.items()
+        }
 
-        result = {}
-        for i, acc in enumerate(valid_ts_data.keys()):
-            result[acc] = forecast[i].mean(dim=0).tolist()
+    def _forecast_result(self, means, prediction_length):
+        if means is None:
+            return {acc: [] for acc in self.accounts}
+        result = {acc: mean[0].tolist() for acc, mean in means.items()}
         for acc in self.accounts:
             if acc not in result:
                 result[acc] = [0] * prediction_length
         return result
 
+    def run_forecast(self, ts_data, prediction_length=3):
+        futures = self._submit_forecasts(ts_data, prediction_length)
+        means = None if futures is None else {acc: future.result()[1] for acc, future in futures.items()}
+        return self._forecast_result(means, prediction_length)
+
+    async def run_forecast_async(self, ts_data, prediction_length=3):
+        """Same as ``run_forecast``, but awaits the forecasts instead of blocking the event loop."""
+        futures = await asyncio.to_thread(self._submit_forecasts, ts_data, prediction_length)
+        if futures is None:
+            return self._forecast_result(None, prediction_length)
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()))
+        means = {acc: mean for acc, (_, mean) in zip(futures, results)}
+        return self._forecast_result(means, prediction_length)
+
     def get_actuals(self, df, prediction_length=3):
         start_date = (datetime.now().replace(day=1) - relativedelta(months=prediction_length - 1)).date()
         end_date = datetime.now().date()
@@ -155,7 +194,7 @@ class FinancialMonitorAdapter:
                 text += "No data for comparison.\n"
         return text
 
-    def run_monitoring(self, company_id: str):
+    def _prepare_monitoring(self, company_id: str):
         print(f"Starting MONTHLY monitoring for company: {company_id}")
         self.set_company(company_id)
 
@@ -165,12 +204,12 @@ class FinancialMonitorAdapter:
         print("Preparing monthly forecast data...")
         ts_data = self.prepare_forecast_data(df)
 
-        PREDICTION_MONTHS = 3
-        print(f"Running forecast for the next {PREDICTION_MONTHS} months...")
-        forecast = self.run_forecast(ts_data, prediction_length=PREDICTION_MONTHS)
+        print(f"Running forecast for the next {self.PREDICTION_MONTHS} months...")
+        return df, ts_data
 
+    def _monitoring_result(self, df, forecast):
         print("Getting actuals for recent months...")
-        actuals = self.get_actuals(df, prediction_length=PREDICTION_MONTHS)
+        actuals = self.get_actuals(df, prediction_length=self.PREDICTION_MONTHS)
 
         print("Comparing forecast and actuals...")
         comparison = self.compare(forecast, actuals)
@@ -180,4 +219,19 @@ class FinancialMonitorAdapter:
 
         print("Monitoring finished. Returning raw data.")
 
-        return {"summary": summary, "comparison_data": comparison}
\ No newline at end of file
+        return {"summary": summary, "comparison_data": comparison}
+
+    def run_monitoring(self, company_id: str):
+        df, ts_data = self._prepare_monitoring(company_id)
+        forecast = self.run_forecast(ts_data, prediction_length=self.PREDICTION_MONTHS)
+        return self._monitoring_result(df, forecast)
+
+    async def run_monitoring_async(self, company_id: str):
+        """
+        Same as ``run_monitoring``, but awaits the forecasts so other tools keep
+        running meanwhile. Company state is only read before the first await,
+        so concurrent calls for different companies do not interfere.
+        """
+        df, ts_data = self._prepare_monitoring(company_id)
+        forecast = await self.run_forecast_async(ts_data, prediction_length=self.PREDICTION_MONTHS)
+        return self._monitoring_result(df, forecast)
@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from chronos import BaseChronosPipeline, ForecastType, ShardedExecutor
+from chronos.utils import left_pad_and_stack_1D
+
+from adapters.forecast_cache import ForecastCache, forecast_cache
+from adapters.model_registry import registry
+
+
+def predict_quantiles_seeded(
+    pipeline: BaseChronosPipeline,
+    contexts: List[torch.Tensor],
+    prediction_length: int,
+    quantile_levels: List[float],
+    seed: int = 0,
+    predictor=None,
+    **predict_kwargs,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    ``predict_quantiles`` of a batch of 1D contexts in which the forecast of
+    each series only depends on that series and ``seed``, never on the other
+    series of the batch or on its row.
+
+    Deterministic (quantile) pipelines forecast the batch in one call, through
+    ``predictor`` if given (e.g. a ``ShardedExecutor``). Sampling pipelines draw
+    each series from its own generator seeded with ``seed`` when decoding with
+    ``decoding="shared_encoder"``, and otherwise forecast each series in its own
+    call, seeded with ``seed``.
+    """
+
+    def predict(batch: List[torch.Tensor], **kwargs) -> Tuple[torch.Tensor, torch.Tensor]:
+        return (predictor or pipeline).predict_quantiles(
+            left_pad_and_stack_1D(batch, max_length=pipeline.context_length),
+            prediction_length=prediction_length,
+            quantile_levels=quantile_levels,
+            **predict_kwargs,
+            **kwargs,
+        )
+
+    if pipeline.forecast_type != ForecastType.SAMPLES:
+        return predict(contexts)
+    if predict_kwargs.get("decoding") == "shared_encoder":
+        device = pipeline.inner_model.device
+        return predict(contexts, generator=[torch.Generator(device=device).manual_seed(seed) for _ in contexts])
+
+    rows = []
+    for context in contexts:
+        with torch.random.fork_rng():
+            torch.manual_seed(seed)
+            rows.append(predict([context]))
+    return torch.cat([quantiles for quantiles, _ in rows]), torch.cat([mean for _, mean in rows])
+
+
+class ForecastRequest:
+    def __init__(self, pipeline, model_id, context, prediction_length, quantile_levels, seed, predict_kwargs, cache_key):
+        self.pipeline = pipeline
+        self.model_id = model_id
+        self.context = context
+        self.prediction_length = prediction_length
+        self.quantile_levels = list(quantile_levels)
+        self.seed = seed
+        self.predict_kwargs = predict_kwargs
+        self.cache_key = cache_key
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def batch_key(self) -> tuple:
+        # Only requests that can share one predict_quantiles call are batched together.
+        return (
+            id(self.pipeline),
+            str(self.model_id),
+            self.prediction_length,
+            tuple(float(q) for q in self.quantile_levels),
+            self.seed,
+            json.dumps(self.predict_kwargs, sort_keys=True, default=str),
+        )
+
+
+class ForecastBatcher:
+    """
+    Dynamic batching in front of ``predict_quantiles``.
+
+    Forecast requests are queued and a background thread collects them for at
+    most ``max_wait_ms`` after the first one arrives, or until ``max_batch_size``
+    requests are waiting. Requests sharing the pipeline, prediction length,
+    quantile levels, seed and sampling parameters are left-padded into one batch
+    and forecast with a single call; each caller gets its own row back.
+
+    Results go through ``cache``: hits are answered without queueing, and every
+    computed row is stored under its own key. Rows are forecast with
+    ``predict_quantiles_seeded``, so a sampled forecast only depends on its
+    series and seed: it is the same alone, in any batch and in the cache.
+
+    With ``shard_workers`` > 1, batches of pipelines with deterministic
+    (quantile) forecasts are split across that many single-threaded workers
+    with a ``ShardedExecutor``. Sampling pipelines are never sharded.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache: Optional[ForecastCache] = forecast_cache,
+        shard_workers: int = 1,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache = cache
+        self.shard_workers = shard_workers
+        self._executors: Dict[int, ShardedExecutor] = {}
+        self._queue: "queue.Queue[ForecastRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched_series = 0
+        self.predict_seconds = 0.0
+        self.errors = 0
+        self._latencies = deque(maxlen=1000)
+        self._started_at = time.time()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="chronos-forecast-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(
+        self,
+        pipeline: BaseChronosPipeline,
+        model_id: str,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int = 0,
+        **predict_kwargs,
+    ) -> Future:
+        """
+        Queue the forecast of one 1D ``context`` and return a future resolving to
+        ``(quantiles, mean)`` with a leading batch dimension of one, like
+        ``pipeline.predict_quantiles`` on a single series.
+        """
+        context = torch.as_tensor(context)
+        if context.ndim != 1:
+            raise ValueError(f"Expected a 1D context, found {context.ndim}D")
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                model_id,
+                context,
+                prediction_length,
+                quantile_levels,
+                seed,
+                model_info=registry.model_info(pipeline, model_id),
+                **predict_kwargs,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._lock:
+                    self.requests += 1
+                    self.cache_hits += 1
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        request = ForecastRequest(
+            pipeline, model_id, context, prediction_length, quantile_levels, seed, predict_kwargs, cache_key
+        )
+        with self._lock:
+            self.requests += 1
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    async def forecast(
+        self,
+        pipeline: BaseChronosPipeline,
+        model_id: str,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int = 0,
+        **predict_kwargs,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Awaitable ``submit`` for use from async MCP tools."""
+        future = self.submit(pipeline, model_id, context, prediction_length, quantile_levels, seed, **predict_kwargs)
+        return await asyncio.wrap_future(future)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            pending: Dict[tuple, List[ForecastRequest]] = {first.batch_key: [first]}
+            deadline = first.enqueued_at + self.max_wait_ms / 1000
+            while len(pending[first.batch_key]) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.setdefault(request.batch_key, []).append(request)
+
+            for requests in pending.values():
+                for start in range(0, len(requests), self.max_batch_size):
+                    batch = requests[start : start + self.max_batch_size]
+                    try:
+                        self._run_batch(batch)
+                    except Exception as e:
+                        # e.g. from the cache; the thread must survive to serve later requests
+                        self._fail(batch, e)
+
+    def _fail(self, requests: List[ForecastRequest], error: Exception):
+        with self._lock:
+            self.errors += len(requests)
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def _predictor(self, pipeline: BaseChronosPipeline):
+        if self.shard_workers <= 1 or pipeline.forecast_type != ForecastType.QUANTILES:
+            return pipeline
+        # only called from the worker thread, so no locking is needed
+        executor = self._executors.get(id(pipeline))
+        if executor is None or executor.pipeline is not pipeline:
+            executor = ShardedExecutor(pipeline, num_workers=self.shard_workers, threads_per_worker=1)
+            self._executors[id(pipeline)] = executor
+        return executor
+
+    def _run_batch(self, requests: List[ForecastRequest]):
+        # Identical series queued by concurrent callers are forecast once.
+        rows: Dict[str, int] = {}
+        contexts = []
+        request_rows = []
+        for request in requests:
+            dedup_key = request.cache_key or str(id(request))
+            if dedup_key not in rows:
+                rows[dedup_key] = len(contexts)
+                contexts.append(request.context)
+            request_rows.append(rows[dedup_key])
+
+        head = requests[0]
+        start = time.perf_counter()
+        try:
+            quantiles, mean = predict_quantiles_seeded(
+                head.pipeline,
+                contexts,
+                head.prediction_length,
+                head.quantile_levels,
+                head.seed,
+                predictor=self._predictor(head.pipeline),
+                **head.predict_kwargs,
+            )
+        except Exception as e:
+            self._fail(requests, e)
+            return
+        finished = time.perf_counter()
+
+        values = [(quantiles[i : i + 1].clone(), mean[i : i + 1].clone()) for i in range(len(contexts))]
+        if self.cache is not None and head.cache_key is not None:
+            for cache_key, row in rows.items():
+                self.cache.put(cache_key, values[row])
+
+        with self._lock:
+            self.batches += 1
+            self.batched_series += len(contexts)
+            self.predict_seconds += finished - start
+            for request in requests:
+                self._latencies.append(finished - request.enqueued_at)
+        for request, row in zip(requests, request_rows):
+            request.future.set_result(values[row])
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+            def percentile(q: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "shard_workers": self.shard_workers,
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_series / self.batches if self.batches else 0.0,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+                "series_per_second": self.batched_series / self.predict_seconds if self.predict_seconds else 0.0,
+                "latency_ms_p50": percentile(0.5),
+                "latency_ms_p95": percentile(0.95),
+                "uptime_seconds": round(time.time() - self._started_at, 3),
+            }
+
+
+forecast_batcher = ForecastBatcher(
+    max_batch_size=int(os.getenv("CHRONOS_BATCH_MAX_SIZE") or 32),
+    max_wait_ms=float(os.getenv("CHRONOS_BATCH_MAX_WAIT_MS") or 5),
+    shard_workers=int(os.getenv("CHRONOS_SHARD_WORKERS") or 1),
+)
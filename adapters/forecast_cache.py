@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import torch
+
+
+class ForecastCache:
+    """
+    Memoizes ``predict_quantiles`` results for the ``ForecastBatcher`` and the
+    ``ForecastWorkerService``, which look entries up before forecasting.
+
+    Entries are keyed on (model id, model info, context tensor hash,
+    prediction length, quantile levels, sampling parameters, seed) and expire
+    after ``ttl_seconds``. The model info (see ``ModelRegistry.model_info``)
+    covers the revision, dtype, inference mode and memory mapping of the
+    weights, so forecasts persisted on disk are not served after the model
+    is loaded differently.
+    At most ``max_entries`` are kept, least recently used first out. Both
+    forecast through ``predict_quantiles_seeded``, so a recomputed forecast
+    equals the cached one. With ``persist_dir`` set, entries are also written
+    to disk and survive restarts.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, persist_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_dir = persist_dir
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[torch.Tensor, torch.Tensor]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        model_id: str,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int,
+        model_info: Optional[dict] = None,
+        **sampling_params,
+    ) -> str:
+        context = context.detach().to(device="cpu", dtype=torch.float32).contiguous()
+        digest = hashlib.sha256()
+        digest.update(json.dumps(list(context.shape)).encode("utf-8"))
+        digest.update(context.numpy().tobytes())
+        digest.update(
+            json.dumps(
+                {
+                    "model_id": str(model_id),
+                    "model_info": model_info,
+                    "prediction_length": prediction_length,
+                    "quantile_levels": [float(q) for q in quantile_levels],
+                    "seed": seed,
+                    "sampling_params": sampling_params,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, f"{key}.pt")
+
+    def get(self, key: str) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.persist_dir and os.path.exists(self._path(key)):
+            try:
+                stored = torch.load(self._path(key), weights_only=True)
+            except Exception as e:
+                print(f"[FORECAST CACHE] Ignoring unreadable entry {key}: {e}")
+                stored = None
+            if stored is not None and stored["expires_at"] > now:
+                value = (stored["quantiles"], stored["mean"])
+                self._remember(key, stored["expires_at"], value)
+                with self._lock:
+                    self.hits += 1
+                return value
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Tuple[torch.Tensor, torch.Tensor]):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, value)
+        if self.persist_dir:
+            quantiles, mean = value
+            torch.save({"expires_at": expires_at, "quantiles": quantiles, "mean": mean}, self._path(key))
+            self._prune_disk()
+
+    def _remember(self, key: str, expires_at: float, value: Tuple[torch.Tensor, torch.Tensor]):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _prune_disk(self):
+        files = [os.path.join(self.persist_dir, f) for f in os.listdir(self.persist_dir) if f.endswith(".pt")]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_entries]:
+            os.remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persist_dir": self.persist_dir,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+forecast_cache = ForecastCache(
+    max_entries=int(os.getenv("CHRONOS_FORECAST_CACHE_SIZE") or 256),
+    ttl_seconds=float(os.getenv("CHRONOS_FORECAST_CACHE_TTL") or 3600),
+    persist_dir=os.getenv("CHRONOS_FORECAST_CACHE_DIR") or None,
+)
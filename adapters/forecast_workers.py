@@ -0,0 +1,511 @@
+import asyncio
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+import torch
+import torch.multiprocessing as torch_mp
+from chronos import BaseChronosPipeline
+
+from adapters.forecast_batcher import forecast_batcher, predict_quantiles_seeded
+from adapters.forecast_cache import ForecastCache, forecast_cache
+from adapters.model_registry import registry
+
+
+@contextmanager
+def _spawn_without_main():
+    # Spawned processes re-run the parent's __main__ module (server.py), which
+    # would build every adapter and start loading the models again in each
+    # worker. Workers only need this module, so hide the main module while
+    # starting them: its __file__ when run as a script, its __spec__ when run
+    # with ``python -m``.
+    main = sys.modules["__main__"]
+    main_file = main.__dict__.pop("__file__", None)
+    main_spec = main.__dict__.get("__spec__")
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        if main_file is not None:
+            main.__file__ = main_file
+        main.__spec__ = main_spec
+
+
+def _is_quantized(pipeline: BaseChronosPipeline) -> bool:
+    # dynamically quantized linear layers keep their int8 weights as packed params
+    return any(hasattr(module, "_packed_params") for module in pipeline.inner_model.modules())
+
+
+def _serialize_pipeline(pipeline: BaseChronosPipeline) -> bytes:
+    buffer = io.BytesIO()
+    torch.save(pipeline, buffer)
+    return buffer.getvalue()
+
+
+def _worker_main(pipeline, contexts, lengths, quantiles, means, jobs, results, num_threads: int, max_batch_size: int):
+    torch.set_num_threads(num_threads)
+    if isinstance(pipeline, bytes):
+        # a quantized pipeline, serialized by the parent
+        pipeline = torch.load(io.BytesIO(pipeline), weights_only=False)
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        batch = [job]
+        stop = False
+        # take whatever else is already queued, so concurrent requests share a predict call
+        while len(batch) < max_batch_size:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            batch.append(job)
+
+        groups: Dict[tuple, List[tuple]] = {}
+        for job in batch:
+            slot, prediction_length, quantile_levels, seed, predict_kwargs = job
+            key = (prediction_length, quantile_levels, seed, json.dumps(predict_kwargs, sort_keys=True, default=str))
+            groups.setdefault(key, []).append(job)
+
+        for group in groups.values():
+            slots = [job[0] for job in group]
+            _, prediction_length, quantile_levels, seed, predict_kwargs = group[0]
+            try:
+                batch_quantiles, batch_mean = predict_quantiles_seeded(
+                    pipeline,
+                    [contexts[slot, : int(lengths[slot])].clone() for slot in slots],
+                    prediction_length=prediction_length,
+                    quantile_levels=list(quantile_levels),
+                    seed=seed,
+                    **predict_kwargs,
+                )
+                for i, slot in enumerate(slots):
+                    quantiles[slot, :prediction_length, : len(quantile_levels)] = batch_quantiles[i]
+                    means[slot, :prediction_length] = batch_mean[i]
+                results.put((slots, None))
+            except Exception as e:
+                results.put((slots, f"{type(e).__name__}: {e}"))
+        if stop:
+            return
+
+
+class _Job:
+    def __init__(self, context, prediction_length, quantile_levels, seed, predict_kwargs):
+        self.context = context
+        self.prediction_length = prediction_length
+        self.quantile_levels = tuple(float(q) for q in quantile_levels)
+        self.seed = seed
+        self.predict_kwargs = predict_kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ForecastWorkerPool:
+    """
+    ``predict_quantiles`` of one pipeline in a pool of worker processes.
+
+    The parent moves the model weights to shared memory once, and every worker
+    is spawned with a handle to them instead of its own copy, so N workers cost
+    one model in RAM. Contexts and forecasts travel through shared-memory ring
+    buffers of ``slots`` rows: a request takes a free slot, writes its context
+    there and only sends the slot number and forecast parameters to a worker;
+    the worker writes quantiles and mean back to the same slot. When all slots
+    are taken, further requests wait in the parent until one is released.
+
+    Each worker forecasts everything queued when it picks up work as one batch
+    per set of forecast parameters, seeded per series like the
+    ``ForecastBatcher``, so a forecast does not depend on its batch. Model
+    calls then run outside the server process, so they neither hold its GIL nor
+    block its event loop.
+
+    Pipelines quantized to int8 are serialized with ``torch.save`` and loaded
+    by each worker rather than shared, since packed quantized weights cannot
+    live in shared memory; each worker then holds its own (4x smaller) copy.
+    """
+
+    def __init__(
+        self,
+        pipeline: BaseChronosPipeline,
+        num_workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        slots: int = 64,
+        max_prediction_length: int = 64,
+        max_quantiles: int = 16,
+        max_batch_size: int = 32,
+    ):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.pipeline = pipeline
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.slots = slots
+        self.max_context_length = pipeline.context_length
+        self.max_prediction_length = max_prediction_length
+        self.max_quantiles = max_quantiles
+
+        self.quantized = _is_quantized(pipeline)
+        if self.quantized:
+            worker_pipeline = _serialize_pipeline(pipeline)
+        else:
+            pipeline.inner_model.share_memory()
+            worker_pipeline = pipeline
+        self._contexts = torch.zeros((slots, self.max_context_length), dtype=torch.float32).share_memory_()
+        self._lengths = torch.zeros(slots, dtype=torch.int64).share_memory_()
+        self._quantiles = torch.zeros((slots, max_prediction_length, max_quantiles), dtype=torch.float32).share_memory_()
+        self._means = torch.zeros((slots, max_prediction_length), dtype=torch.float32).share_memory_()
+
+        context = torch_mp.get_context("spawn")
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        self._free_slots: Deque[int] = deque(range(slots))
+        self._waiting: Deque[_Job] = deque()
+        self._inflight: Dict[int, _Job] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[str] = None
+        self.jobs = 0
+        self.completed = 0
+        self.batches = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=1000)
+
+        start = time.perf_counter()
+        self._processes = [
+            context.Process(
+                target=_worker_main,
+                args=(
+                    worker_pipeline,
+                    self._contexts,
+                    self._lengths,
+                    self._quantiles,
+                    self._means,
+                    self._jobs,
+                    self._results,
+                    self.threads_per_worker,
+                    max_batch_size,
+                ),
+                name=f"chronos-forecast-worker-{i}",
+                daemon=True,
+            )
+            for i in range(num_workers)
+        ]
+        with _spawn_without_main():
+            for process in self._processes:
+                process.start()
+        self.start_seconds = time.perf_counter() - start
+        print(f"[FORECAST WORKERS] Started {num_workers} workers in {self.start_seconds:.2f}s")
+
+        self._collector = threading.Thread(target=self._collect, name="chronos-forecast-collector", daemon=True)
+        self._collector.start()
+
+    def submit(
+        self,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int = 0,
+        **predict_kwargs,
+    ) -> Future:
+        """
+        Forecast one 1D ``context`` in a worker and return a future resolving to
+        ``(quantiles, mean)`` with a leading batch dimension of one.
+        """
+        context = torch.as_tensor(context, dtype=torch.float32)
+        if context.ndim != 1:
+            raise ValueError(f"Expected a 1D context, found {context.ndim}D")
+        if prediction_length > self.max_prediction_length:
+            raise ValueError(f"prediction_length is limited to {self.max_prediction_length}, found {prediction_length}")
+        if len(quantile_levels) > self.max_quantiles:
+            raise ValueError(f"At most {self.max_quantiles} quantile levels are supported, found {len(quantile_levels)}")
+
+        # the pipeline only looks at the last context_length values anyway
+        job = _Job(context[-self.max_context_length :], prediction_length, quantile_levels, seed, predict_kwargs)
+        with self._lock:
+            if self._closed or self._error is not None:
+                raise RuntimeError(f"Forecast worker pool is not running: {self._error or 'closed'}")
+            self.jobs += 1
+            self._waiting.append(job)
+            self._dispatch()
+        return job.future
+
+    def _dispatch(self):
+        # called with self._lock held
+        while self._waiting and self._free_slots:
+            job = self._waiting.popleft()
+            slot = self._free_slots.popleft()
+            length = len(job.context)
+            self._contexts[slot, :length] = job.context
+            self._lengths[slot] = length
+            self._inflight[slot] = job
+            self._jobs.put((slot, job.prediction_length, job.quantile_levels, job.seed, job.predict_kwargs))
+
+    def _collect(self):
+        while True:
+            try:
+                slots, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if self._closed:
+                    return
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    self._fail(f"worker process exited: {', '.join(dead)}")
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            finished = time.perf_counter()
+            outputs = []
+            with self._lock:
+                for slot in slots:
+                    job = self._inflight.pop(slot, None)
+                    self._free_slots.append(slot)
+                    if job is None:
+                        # already failed by close()
+                        continue
+                    if error is None:
+                        value = (
+                            self._quantiles[slot, : job.prediction_length, : len(job.quantile_levels)].clone().unsqueeze(0),
+                            self._means[slot, : job.prediction_length].clone().unsqueeze(0),
+                        )
+                        outputs.append((job, value))
+                        self._latencies.append(finished - job.enqueued_at)
+                    else:
+                        outputs.append((job, None))
+                self.batches += 1
+                self.completed += len(slots)
+                if error is not None:
+                    self.errors += len(slots)
+                self._dispatch()
+            for job, value in outputs:
+                if value is None:
+                    job.future.set_exception(RuntimeError(f"Forecast worker failed: {error}"))
+                else:
+                    job.future.set_result(value)
+
+    def _fail(self, error: str):
+        print(f"[FORECAST WORKERS] {error}")
+        with self._lock:
+            self._error = error
+            jobs = list(self._inflight.values()) + list(self._waiting)
+            self._inflight.clear()
+            self._waiting.clear()
+            self.errors += len(jobs)
+        for job in jobs:
+            job.future.set_exception(RuntimeError(f"Forecast worker pool failed: {error}"))
+
+    def close(self, timeout: float = 5.0):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # jobs not handed to a worker yet would never complete
+            waiting = list(self._waiting)
+            self._waiting.clear()
+        for job in waiting:
+            job.future.set_exception(RuntimeError("Forecast worker pool was closed"))
+        for _ in self._processes:
+            self._jobs.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout)
+        with self._lock:
+            inflight = list(self._inflight.values())
+            self._inflight.clear()
+        for job in inflight:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Forecast worker pool was closed"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+            def percentile(q: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                return round(1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+            return {
+                "workers": self.num_workers,
+                "workers_alive": sum(p.is_alive() for p in self._processes),
+                "quantized": self.quantized,
+                "threads_per_worker": self.threads_per_worker,
+                "slots": self.slots,
+                "free_slots": len(self._free_slots),
+                "waiting": len(self._waiting),
+                "jobs": self.jobs,
+                "batches": self.batches,
+                "mean_batch_size": self.completed / self.batches if self.batches else 0.0,
+                "errors": self.errors,
+                "error": self._error,
+                "start_seconds": round(self.start_seconds, 3),
+                "latency_ms_p50": percentile(0.5),
+                "latency_ms_p95": percentile(0.95),
+            }
+
+
+class ForecastWorkerService:
+    """
+    Routes forecasts of each model to its own ``ForecastWorkerPool``.
+
+    Has the same ``submit`` / ``forecast`` interface as ``ForecastBatcher`` and
+    uses the same forecast cache, so adapters can use either one. Pools are
+    started on the first request for a model, and replaced if the registry
+    hands out a different pipeline for it, e.g., after an eviction.
+
+    The shared-memory slots of the pools hold forecasts of up to
+    ``max_prediction_length`` steps and ``max_quantiles`` quantile levels;
+    larger requests are forecast by the in-process ``forecast_batcher`` instead.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 0,
+        slots: int = 64,
+        max_prediction_length: int = 64,
+        max_quantiles: int = 16,
+        cache: Optional[ForecastCache] = forecast_cache,
+    ):
+        self.num_workers = num_workers
+        self.slots = slots
+        self.max_prediction_length = max_prediction_length
+        self.max_quantiles = max_quantiles
+        self.cache = cache
+        self._pools: Dict[str, ForecastWorkerPool] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.num_workers > 0
+
+    def _pool(self, pipeline: BaseChronosPipeline, model_id: str) -> ForecastWorkerPool:
+        with self._lock:
+            old = self._pools.get(str(model_id))
+            if old is not None and old.pipeline is pipeline and old._error is None:
+                return old
+            pool = ForecastWorkerPool(
+                pipeline,
+                num_workers=self.num_workers,
+                slots=self.slots,
+                max_prediction_length=self.max_prediction_length,
+                max_quantiles=self.max_quantiles,
+            )
+            self._pools[str(model_id)] = pool
+        # joining the old workers can take a while; other callers go on meanwhile
+        if old is not None:
+            old.close()
+        return pool
+
+    def submit(
+        self,
+        pipeline: BaseChronosPipeline,
+        model_id: str,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int = 0,
+        **predict_kwargs,
+    ) -> Future:
+        """Same as ``ForecastBatcher.submit``, forecast in a worker process."""
+        if prediction_length > self.max_prediction_length or len(quantile_levels) > self.max_quantiles:
+            # does not fit the slots of the pools
+            with self._lock:
+                self.fallbacks += 1
+            return forecast_batcher.submit(
+                pipeline, model_id, context, prediction_length, quantile_levels, seed, **predict_kwargs
+            )
+        context = torch.as_tensor(context)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                model_id,
+                context,
+                prediction_length,
+                quantile_levels,
+                seed,
+                model_info=registry.model_info(pipeline, model_id),
+                **predict_kwargs,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._lock:
+                    self.requests += 1
+                    self.cache_hits += 1
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        with self._lock:
+            self.requests += 1
+        future = self._pool(pipeline, model_id).submit(
+            context, prediction_length, quantile_levels, seed, **predict_kwargs
+        )
+        if cache_key is not None:
+            future.add_done_callback(
+                lambda f: self.cache.put(cache_key, f.result()) if f.exception() is None else None
+            )
+        return future
+
+    async def forecast(
+        self,
+        pipeline: BaseChronosPipeline,
+        model_id: str,
+        context: torch.Tensor,
+        prediction_length: int,
+        quantile_levels: List[float],
+        seed: int = 0,
+        **predict_kwargs,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Awaitable ``submit`` for use from async MCP tools."""
+        # starting a pool spawns processes, which should not happen on the event loop
+        future = await asyncio.to_thread(
+            self.submit, pipeline, model_id, context, prediction_length, quantile_levels, seed, **predict_kwargs
+        )
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "num_workers": self.num_workers,
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "fallbacks": self.fallbacks,
+                "max_prediction_length": self.max_prediction_length,
+                "pools": {model_id: pool.stats() for model_id, pool in self._pools.items()},
+            }
+
+
+forecast_workers = ForecastWorkerService(
+    num_workers=int(os.getenv("CHRONOS_FORECAST_WORKERS") or 0),
+    slots=int(os.getenv("CHRONOS_FORECAST_SLOTS") or 64),
+    max_prediction_length=int(os.getenv("CHRONOS_FORECAST_MAX_PREDICTION_LENGTH") or 64),
+)
+
+
+def get_forecaster():
+    """The worker pool service if ``CHRONOS_FORECAST_WORKERS`` is set, else the in-process batcher."""
+    return forecast_workers if forecast_workers.enabled else forecast_batcher
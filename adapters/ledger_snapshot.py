@@ -0,0 +1,183 @@
+"""
+Binary snapshots of the ledger store.
+
+A snapshot is the compiled form of a NOCFO JSON file: the fixed-width
+columns of its ``LedgerStore`` and its string table, each stored as a raw
+array at an aligned offset, after a small JSON header. Loading it maps the
+file read-only and wraps the arrays in place, so it takes milliseconds
+whatever the size of the ledger, and every process mapping the same
+snapshot shares one copy of it in the page cache.
+
+The header records the size and modification time of the JSON file the
+snapshot was compiled from; ``LedgerSource`` uses a snapshot only while
+they still match. Compile one after each change of the JSON file with::
+
+    python -m adapters.ledger_snapshot NOCFO.json [-o NOCFO.ledger]
+
+File layout (little-endian): the magic ``NOCFOLDG``, the format version
+(uint32) and the header length (uint64), the UTF-8 JSON header, then the
+arrays, each starting at a multiple of ``ALIGNMENT``.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+from adapters.ledger_store import LedgerStore, StringTable
+from adapters.ledger_stream import stream_ledger
+
+MAGIC = b"NOCFOLDG"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUFFIX = ".ledger"
+
+_PREFIX = struct.Struct("<8sIQ")
+
+
+def snapshot_path(json_path: str) -> str:
+    """The default snapshot path of a JSON file: the same path with a ``.ledger`` suffix."""
+    return os.path.splitext(json_path)[0] + SUFFIX
+
+
+def _source_signature(json_path: str) -> dict:
+    st = os.stat(json_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def write_snapshot(store: LedgerStore, path: str, source: Optional[str] = None):
+    """
+    Write ``store`` to ``path``, atomically: readers see either the previous
+    snapshot or the complete new one. ``source`` is the JSON file the store
+    was built from, whose signature is recorded to detect stale snapshots.
+    """
+    arrays = {f"columns/{name}": store.columns[name] for name in LedgerStore.COLUMNS}
+    arrays["strings/offsets"] = store.strings.offsets
+    arrays["strings/data"] = store.strings.data
+    header = {
+        "version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": dict(path=os.path.realpath(source), **_source_signature(source)) if source else None,
+        "companies": store.companies,
+        # lists of pairs, as JSON keys can only be strings
+        "accounts": {company: list(store.accounts(company).items()) for company in store.companies},
+        "arrays": {},
+    }
+    # the offsets depend on the header length, which depends on the offsets:
+    # lay out again until the length stops changing
+    header_len = 0
+    while True:
+        offset = _align(_PREFIX.size + header_len)
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "length": len(array), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header).encode("utf-8")
+        if len(encoded) == header_len:
+            break
+        header_len = len(encoded)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, header_len))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).view(np.uint8))
+    os.replace(tmp_path, path)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _read_header(f, path: str) -> dict:
+    prefix = f.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size or prefix[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a ledger snapshot")
+    _, version, header_len = _PREFIX.unpack(prefix)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported ledger snapshot version {version} in {path}, expected {FORMAT_VERSION}")
+    return json.loads(f.read(header_len))
+
+
+def read_header(path: str) -> dict:
+    """The header of the snapshot at ``path``, raising ``ValueError`` if it is not a supported snapshot."""
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+def _check_source(header: dict, path: str, json_path: str):
+    source = header["source"]
+    if source is None or {k: source[k] for k in ("size", "mtime_ns")} != _source_signature(json_path):
+        raise ValueError(f"Ledger snapshot {path} is out of date with {json_path}")
+
+
+def is_current(path: str, json_path: str) -> bool:
+    """Whether the snapshot at ``path`` exists, is supported and was compiled from ``json_path`` as it is now."""
+    try:
+        _check_source(read_header(path), path, json_path)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def load_snapshot(path: str, json_path: Optional[str] = None) -> LedgerStore:
+    """
+    Map the snapshot at ``path`` read-only and return its ``LedgerStore``.
+    With ``json_path``, raises ``ValueError`` unless the snapshot was compiled
+    from that file as it is now.
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f, path)
+        if json_path is not None:
+            _check_source(header, path, json_path)
+        # the arrays keep the mapping alive after the file is closed
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        if spec["offset"] + spec["length"] * dtype.itemsize > len(buffer):
+            raise ValueError(f"Ledger snapshot {path} is truncated")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=spec["length"], offset=spec["offset"])
+    accounts = {company: {int(n): name for n, name in pairs} for company, pairs in header["accounts"].items()}
+    return LedgerStore(
+        header["companies"],
+        accounts,
+        StringTable(arrays["strings/offsets"], arrays["strings/data"]),
+        {name: arrays[f"columns/{name}"] for name in LedgerStore.COLUMNS},
+    )
+
+
+def compile_snapshot(json_path: str, path: Optional[str] = None) -> str:
+    """Compile ``json_path`` into a snapshot (by default next to it) and return the snapshot path."""
+    path = path or snapshot_path(json_path)
+    signature = _source_signature(json_path)
+    store, ingest = stream_ledger(json_path)
+    if _source_signature(json_path) != signature:
+        raise ValueError(f"{json_path} changed while it was compiled")
+    write_snapshot(store, path, source=json_path)
+    print(
+        f"[LEDGER SNAPSHOT] Compiled {json_path} ({ingest['bytes'] / 2**20:.1f} MB, {ingest['entries']} entries) "
+        f"into {path} ({os.path.getsize(path) / 2**20:.1f} MB) in {ingest['seconds']:.2f}s"
+    )
+    return path
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m adapters.ledger_snapshot",
+        description="Compile a NOCFO JSON file into a memory-mappable ledger snapshot.",
+    )
+    parser.add_argument("json_path")
+    parser.add_argument("-o", "--output", default=None, help="Snapshot path (default: the JSON path with a .ledger suffix)")
+    args = parser.parse_args(argv)
+    compile_snapshot(args.json_path, args.output)
+
+
+if __name__ == "__main__":
+    main()
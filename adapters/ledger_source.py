@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from adapters.ledger_snapshot import load_snapshot, snapshot_path
+from adapters.ledger_store import LedgerStore
+from adapters.ledger_stream import ingest_stats, stream_company, stream_ledger
+
+FileSignature = Tuple[int, int, int, int]
+
+
+class LedgerSource:
+    """
+    One parsed copy of a NOCFO JSON file, shared by every adapter reading it.
+
+    The file is parsed on first access and again only when its signature
+    (device, inode, mtime, size) changes, which also catches files replaced by
+    an atomic rename. By default the signature is checked with one ``stat``
+    per access; with ``watch=True`` and the optional ``watchdog`` package, a
+    file system watcher (inotify on Linux) flags changes instead and accesses
+    do not touch the file system at all.
+
+    ``data`` is the raw dict and ``ledger`` the columnar ``LedgerStore`` of
+    the same parse. If a changed file fails to parse (e.g. it is read while
+    being written), the previous version stays in use until the file changes
+    again, and so it does while the file is missing (e.g. deleted or moved
+    away). ``loads`` counts parses, so a steady state shows no increase.
+
+    With ``streaming=True`` (by default, for files of ``streaming_mb`` or
+    more), the raw dict is never held: ``ledger`` is built by the streaming
+    reader of ``adapters.ledger_stream``, and ``company`` decodes the data
+    of the requested company alone, keeping the last few of them. ``data``
+    then raises ``RuntimeError`` rather than parsing the whole file on each
+    access; use ``company`` and ``ledger`` instead.
+
+    With ``snapshot``, the path of a binary snapshot compiled from the file
+    (see ``adapters.ledger_snapshot``), ``ledger`` maps the snapshot instead
+    of parsing, as long as it is up to date with the file, and raw data is
+    read on demand as with ``streaming``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        watch: bool = False,
+        streaming: Optional[bool] = None,
+        streaming_mb: float = 64,
+        cached_companies: int = 8,
+        snapshot: Optional[str] = None,
+    ):
+        self.path = os.path.realpath(path)
+        self.snapshot = snapshot
+        if streaming is None:
+            streaming = os.path.isfile(self.path) and os.path.getsize(self.path) >= streaming_mb * 2**20
+        self.streaming = streaming
+        self.cached_companies = cached_companies
+        self.ingest: Optional[dict] = None
+        self.mode: Optional[str] = None
+        self.loads = 0
+        self.failed_loads = 0
+        self.load_seconds = 0.0
+        self.total_load_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self._signature: Optional[FileSignature] = None
+        self._failed_signature: Optional[FileSignature] = None
+        self._data: Optional[dict] = None
+        self._ledger: Optional[LedgerStore] = None
+        self._companies: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._changed.set()
+        self._observer = None
+        if watch:
+            self._start_watching()
+
+    def _start_watching(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print("[LEDGER SOURCE] watchdog is not installed, checking the file on access instead")
+            return
+
+        source = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = {getattr(event, "src_path", None), getattr(event, "dest_path", None)}
+                if source.path in {os.path.realpath(p) for p in paths if p}:
+                    source._changed.set()
+
+        # watch the directory, so replacing the file by a rename is seen too
+        self._observer = Observer()
+        self._observer.schedule(Handler(), os.path.dirname(self.path), recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+
+    @property
+    def watching(self) -> bool:
+        return self._observer is not None
+
+    def _stat(self) -> FileSignature:
+        st = os.stat(self.path)
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _current_signature(self) -> Optional[FileSignature]:
+        # None when the file cannot be read but a version of it is loaded,
+        # which then stays in use
+        try:
+            return self._stat()
+        except OSError as e:
+            if self._ledger is None:
+                raise
+            error = f"{type(e).__name__}: {e}"
+            if error != self.last_error:
+                self.last_error = error
+                print(f"[LEDGER SOURCE] Keeping the loaded version of {self.path}: {error}")
+            return None
+
+    def _refresh(self):
+        if self.watching and not self._changed.is_set():
+            return
+        signature = self._current_signature()
+        if signature is None or signature in (self._signature, self._failed_signature):
+            return
+        with self._lock:
+            signature = self._current_signature()
+            if signature is None or signature in (self._signature, self._failed_signature):
+                return
+            self._changed.clear()
+            start = time.perf_counter()
+            try:
+                data, ledger, ingest, mode = self._load(signature)
+            except (OSError, ValueError) as e:
+                self.failed_loads += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                if self._ledger is None:
+                    raise
+                # not retried until the file changes again
+                self._failed_signature = signature
+                print(f"[LEDGER SOURCE] Keeping the previous version of {self.path}: {self.last_error}")
+                self._changed.set()
+                return
+            self.load_seconds = time.perf_counter() - start
+            self.total_load_seconds += self.load_seconds
+            self.loads += 1
+            self.ingest, self.mode = ingest, mode
+            self._data, self._ledger, self._signature = data, ledger, signature
+            self._companies.clear()
+            print(
+                f"[LEDGER SOURCE] Loaded {self.path} (load #{self.loads}, {mode}) "
+                f"in {1000 * self.load_seconds:.1f}ms, {ingest['mb_per_s']} MB/s, peak RSS {ingest['peak_rss_mb']} MB"
+            )
+
+    def _load(self, signature: FileSignature) -> Tuple[Optional[dict], LedgerStore, dict, str]:
+        start = time.perf_counter()
+        if self.snapshot is not None and os.path.exists(self.snapshot):
+            try:
+                ledger = load_snapshot(self.snapshot, self.path)
+                ingest = ingest_stats(os.path.getsize(self.snapshot), time.perf_counter() - start, ledger)
+                return None, ledger, ingest, "snapshot"
+            except ValueError as e:
+                print(f"[LEDGER SOURCE] Not using the snapshot: {e}; recompile it with python -m adapters.ledger_snapshot")
+        if self.streaming:
+            ledger, ingest = stream_ledger(self.path)
+            return None, ledger, ingest, "streamed"
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ledger = LedgerStore.from_data(data)
+        return data, ledger, ingest_stats(signature[3], time.perf_counter() - start, ledger), "json"
+
+    @property
+    def data(self) -> dict:
+        self._refresh()
+        if self._data is None:
+            raise RuntimeError(
+                f"The raw data of {self.path} is not kept in {self.mode} mode; use company() or ledger instead"
+            )
+        return self._data
+
+    @property
+    def ledger(self) -> LedgerStore:
+        self._refresh()
+        return self._ledger
+
+    def __contains__(self, company: str) -> bool:
+        return company in self.ledger
+
+    def company(self, company: str) -> dict:
+        """The raw data of one company, raising ``KeyError`` if it does not exist."""
+        self._refresh()
+        if self._data is not None:
+            return self._data[company]
+        if company not in self.ledger:
+            raise KeyError(company)
+        with self._lock:
+            data = self._companies.get(company)
+            if data is not None:
+                self._companies.move_to_end(company)
+                return data
+            signature = self._signature
+        data = stream_company(self.path, company)
+        with self._lock:
+            # not kept if the file was reloaded in the meantime
+            if signature == self._signature:
+                self._companies[company] = data
+                while len(self._companies) > self.cached_companies:
+                    self._companies.popitem(last=False)
+        return data
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "watching": self.watching,
+            "mode": self.mode,
+            "loads": self.loads,
+            "failed_loads": self.failed_loads,
+            "last_load_ms": round(1000 * self.load_seconds, 3),
+            "total_load_ms": round(1000 * self.total_load_seconds, 3),
+            "last_error": self.last_error,
+            "companies": len(self._ledger.companies) if self._ledger is not None else None,
+            "cached_companies": len(self._companies),
+            "ingest": self.ingest,
+        }
+
+
+_sources: Dict[str, LedgerSource] = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(path: str) -> LedgerSource:
+    """The shared ``LedgerSource`` of ``path``, created on first use."""
+    key = os.path.realpath(path)
+    with _sources_lock:
+        source = _sources.get(key)
+        if source is None:
+            watch = (os.getenv("NOCFO_WATCH") or "").lower() in ("1", "true", "yes")
+            # empty: decided by the size of the file
+            streaming = (os.getenv("NOCFO_STREAMING") or "").lower()
+            source = _sources[key] = LedgerSource(
+                key,
+                watch=watch,
+                streaming=streaming in ("1", "true", "yes") if streaming else None,
+                streaming_mb=float(os.getenv("NOCFO_STREAMING_MB") or 64),
+                snapshot=os.getenv("NOCFO_SNAPSHOT") or snapshot_path(key),
+            )
+        return source
+
+
+def sources_stats() -> list:
+    with _sources_lock:
+        return [source.stats() for source in _sources.values()]
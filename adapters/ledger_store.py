@@ -0,0 +1,374 @@
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+AccountNumbers = Optional[Union[int, Sequence[int]]]
+
+# pandas frequencies of the periods of ``LedgerStore.metric_series``
+SERIES_FREQUENCIES = {"daily": "D", "weekly": "W", "monthly": "MS"}
+
+
+def normalize_account_name(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def forecast_index(history_index: pd.DatetimeIndex, periods: int, frequency: str = "monthly") -> pd.DatetimeIndex:
+    """
+    The ``periods`` periods following the last one of a ``metric_series`` index
+    of the given frequency. The frequency is given explicitly, as the index
+    may have lost its own (``freq`` is None after slicing or concatenating).
+    """
+    return pd.date_range(start=history_index[-1], periods=periods + 1, freq=SERIES_FREQUENCIES[frequency])[1:]
+
+
+class StringTable:
+    """
+    Immutable table of strings stored as one UTF-8 blob and the offsets of
+    each string in it, so it can be saved and memory-mapped as two arrays.
+    Strings are decoded when accessed.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        if not 0 <= code < len(self):
+            raise IndexError(code)
+        return bytes(self.data[self.offsets[code] : self.offsets[code + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[code] for code in range(len(self)))
+
+    def take(self, codes: np.ndarray) -> np.ndarray:
+        """The strings of ``codes`` as an object array, None where the code is -1 (missing)."""
+        unique, inverse = np.unique(codes, return_inverse=True)
+        decoded = np.empty(len(unique), dtype=object)
+        decoded[:] = [self[code] if code >= 0 else None for code in unique.tolist()]
+        return decoded[inverse.reshape(-1)]
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.data.nbytes
+
+
+class LedgerBuilder:
+    """
+    Collects ledger accounts one at a time and builds a ``LedgerStore``.
+
+    Only flat typed arrays are kept until ``build`` (dates and strings as
+    codes into tables of the distinct values), so the nested JSON objects of
+    an account can be dropped as soon as it is added.
+    """
+
+    def __init__(self):
+        self.companies: List[str] = []
+        self._company_codes: Dict[str, int] = {}
+        self._accounts: Dict[str, Dict[int, str]] = {}
+        self._account_order: Dict[Tuple[str, int], int] = {}
+        self._named: Set[Tuple[str, int]] = set()
+        self._strings: Dict[str, int] = {}
+        self._dates: Dict[str, int] = {}
+        self._company = array("i")
+        self._order = array("i")
+        self._account_number = array("q")
+        self._date = array("i")
+        self._debit = array("d")
+        self._credit = array("d")
+        self._document = array("i")
+        self._description = array("i")
+
+    def _string(self, value) -> int:
+        if value is None:
+            return -1
+        code = self._strings.get(value)
+        if code is None:
+            code = self._strings[value] = len(self._strings)
+        return code
+
+    def _date_code(self, value) -> int:
+        if value is None:
+            return -1
+        code = self._dates.get(value)
+        if code is None:
+            code = self._dates[value] = len(self._dates)
+        return code
+
+    def _company_code(self, company: str) -> int:
+        code = self._company_codes.get(company)
+        if code is None:
+            code = self._company_codes[company] = len(self.companies)
+            self.companies.append(company)
+            self._accounts[company] = {}
+        return code
+
+    def add_company(self, company: str, company_data: dict):
+        self._company_code(company)
+        for account in company_data.get("ledger", []):
+            self.add_account(company, account)
+
+    def add_account(self, company: str, account: dict):
+        number = int(account["account_number"])
+        self.name_account(company, number, account.get("account_name", str(number)))
+        self.add_entries(company, number, account.get("entries", []))
+
+    def _account(self, company: str, number: int) -> Tuple[int, int]:
+        company_code = self._company_code(company)
+        accounts = self._accounts[company]
+        # a number listed twice is merged into the first account of that number
+        order = self._account_order.get((company, number))
+        if order is None:
+            order = self._account_order[(company, number)] = len(accounts)
+            accounts[number] = str(number)
+        return company_code, order
+
+    def name_account(self, company: str, number: int, name: str):
+        self._account(company, number)
+        if (company, number) not in self._named:
+            self._named.add((company, number))
+            self._accounts[company][number] = name
+
+    def add_entries(self, company: str, number: int, entries: Iterable[dict]):
+        """Add the entries of an account, which can be any iterable, e.g. a stream."""
+        company_code, order = self._account(company, number)
+        # bound once, this loop runs for every entry of the file
+        string, date_code = self._string, self._date_code
+        append_date, append_debit, append_credit = self._date.append, self._debit.append, self._credit.append
+        append_document, append_description = self._document.append, self._description.append
+        count = 0
+        for entry in entries:
+            get = entry.get
+            append_date(date_code(get("date")))
+            append_debit(float(get("debit", get("debet", 0)) or 0))
+            append_credit(float(get("credit", 0) or 0))
+            append_document(string(get("document_number")))
+            append_description(string(get("description")))
+            count += 1
+        self._company.extend(array("i", [company_code]) * count)
+        self._order.extend(array("i", [order]) * count)
+        self._account_number.extend(array("q", [number]) * count)
+
+    def build(self) -> "LedgerStore":
+        # each distinct date is parsed once; code -1 (missing) picks the trailing NaT
+        dates = pd.to_datetime(pd.Series(list(self._dates) + [None], dtype=object), errors="coerce")
+        date = dates.to_numpy().astype("datetime64[D]")[np.frombuffer(self._date, dtype=np.int32)]
+        company = np.frombuffer(self._company, dtype=np.int32)
+        order = np.frombuffer(self._order, dtype=np.int32)
+        # rows grouped by company, then account in ledger order, then date (stable,
+        # so entries of the same day keep their order in the file)
+        rows = np.lexsort((date, order, company))
+        columns = {
+            "company": company[rows],
+            "account_number": np.frombuffer(self._account_number, dtype=np.int64)[rows],
+            "date": date[rows],
+            "debit": np.frombuffer(self._debit, dtype=np.float64)[rows],
+            "credit": np.frombuffer(self._credit, dtype=np.float64)[rows],
+            "document_number": np.frombuffer(self._document, dtype=np.int32)[rows],
+            "description": np.frombuffer(self._description, dtype=np.int32)[rows],
+        }
+        return LedgerStore(self.companies, self._accounts, StringTable.from_strings(list(self._strings)), columns)
+
+
+class LedgerStore:
+    """
+    Columnar, read-only store of the ledger entries of all companies.
+
+    Every entry is one row of fixed-width numpy columns: ``company`` (index
+    into ``companies``), ``account_number``, ``date`` (datetime64[D], NaT when
+    missing), ``debit``, ``credit``, and ``document_number`` / ``description``
+    (indices into the ``strings`` table, -1 when missing). Rows are sorted by
+    company, account (in ledger order) and date, so the entries of a company
+    or of one of its accounts are a contiguous slice, found through an index
+    built once. Queries return views or vectorized aggregates of these slices
+    instead of walking the nested JSON.
+
+    Besides the stored columns, ``column`` derives "net" (debit - credit) and
+    "net_flow" (credit - debit).
+    """
+
+    COLUMNS = ("company", "account_number", "date", "debit", "credit", "document_number", "description")
+
+    def __init__(
+        self,
+        companies: List[str],
+        accounts: Dict[str, Dict[int, str]],
+        strings: StringTable,
+        columns: Dict[str, np.ndarray],
+    ):
+        self.companies = list(companies)
+        self.strings = strings
+        self.columns = columns
+        self._accounts = accounts
+        self._names: Dict[str, Dict[str, List[int]]] = {
+            company: self._name_index(company_accounts) for company, company_accounts in accounts.items()
+        }
+        self._company_rows: Dict[str, slice] = {}
+        self._account_rows: Dict[Tuple[str, int], slice] = {}
+        self._build_index()
+
+    @staticmethod
+    def _name_index(accounts: Dict[int, str]) -> Dict[str, List[int]]:
+        names: Dict[str, List[int]] = {}
+        for number, name in accounts.items():
+            names.setdefault(normalize_account_name(name), []).append(number)
+        return names
+
+    def _build_index(self):
+        company = self.columns["company"]
+        account_number = self.columns["account_number"]
+        n = len(company)
+        # rows where the (company, account) pair changes
+        change = np.ones(n, dtype=bool)
+        if n:
+            change[1:] = (company[1:] != company[:-1]) | (account_number[1:] != account_number[:-1])
+        starts = np.flatnonzero(change)
+        ends = np.append(starts[1:], n)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key = (self.companies[company[start]], int(account_number[start]))
+            self._account_rows[key] = slice(start, end)
+        for code, name in enumerate(self.companies):
+            start, end = np.searchsorted(company, [code, code + 1])
+            self._company_rows[name] = slice(int(start), int(end))
+
+    @classmethod
+    def from_data(cls, data: dict) -> "LedgerStore":
+        builder = LedgerBuilder()
+        for company, company_data in data.items():
+            builder.add_company(company, company_data)
+        return builder.build()
+
+    @classmethod
+    def from_json(cls, path: str) -> "LedgerStore":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_data(json.load(f))
+
+    def __contains__(self, company: str) -> bool:
+        return company in self._company_rows
+
+    def __len__(self) -> int:
+        return len(self.columns["company"])
+
+    def accounts(self, company: str) -> Dict[int, str]:
+        """Account numbers of ``company`` and their names, in ledger order."""
+        return dict(self._accounts.get(company, {}))
+
+    def find_accounts(self, company: str, name: str, exact: bool = False) -> List[int]:
+        """
+        Numbers of the accounts of ``company`` whose normalized name (lowercase,
+        spaces as underscores) equals ``name``, or contains it unless ``exact``.
+        """
+        names = self._names.get(company, {})
+        if exact:
+            return list(names.get(name, []))
+        return [number for key, numbers in names.items() if name in key for number in numbers]
+
+    def _rows(self, company: str, account_numbers: AccountNumbers = None) -> Union[slice, np.ndarray]:
+        if company not in self._company_rows:
+            raise KeyError(f"Company '{company}' not found in ledger store")
+        if account_numbers is None:
+            return self._company_rows[company]
+        if isinstance(account_numbers, (int, np.integer)):
+            return self._account_rows.get((company, int(account_numbers)), slice(0, 0))
+        slices = [self._account_rows.get((company, int(n)), slice(0, 0)) for n in account_numbers]
+        if len(slices) == 1:
+            return slices[0]
+        return np.concatenate([np.arange(s.start, s.stop) for s in slices] or [np.empty(0, dtype=np.int64)])
+
+    def column(self, name: str, company: str, account_numbers: AccountNumbers = None) -> np.ndarray:
+        """
+        Values of column ``name`` for the entries of ``company``, or of the given
+        accounts (concatenated in the given order). Stored columns of a single
+        company or account are returned as views, not copies.
+        """
+        rows = self._rows(company, account_numbers)
+        if name == "net":
+            return self.columns["debit"][rows] - self.columns["credit"][rows]
+        if name == "net_flow":
+            return self.columns["credit"][rows] - self.columns["debit"][rows]
+        return self.columns[name][rows]
+
+    def num_entries(self, company: str, account_numbers: AccountNumbers = None) -> int:
+        rows = self._rows(company, account_numbers)
+        return rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+
+    def frame(self, company: str, account_numbers: AccountNumbers = None) -> pd.DataFrame:
+        """The entries of ``company`` (or of the given accounts) as a DataFrame."""
+        rows = self._rows(company, account_numbers)
+        return pd.DataFrame(
+            {
+                "date": self.columns["date"][rows].astype("datetime64[ns]"),
+                "account_number": self.columns["account_number"][rows],
+                "debit": self.columns["debit"][rows],
+                "credit": self.columns["credit"][rows],
+                "document_number": self.strings.take(self.columns["document_number"][rows]),
+                "description": self.strings.take(self.columns["description"][rows]),
+            }
+        )
+
+    def resample(
+        self,
+        company: str,
+        account_numbers: AccountNumbers = None,
+        freq: str = "MS",
+        column: str = "net",
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.Series:
+        """
+        Sum ``column`` over periods of ``freq`` between the first and last dated
+        entry (within ``start`` and ``end``, inclusive), with zeros for periods
+        without entries. Returns an empty series if no entry matches.
+        """
+        dates = self.column("date", company, account_numbers)
+        values = self.column(column, company, account_numbers)
+        mask = ~np.isnat(dates)
+        if start is not None:
+            mask &= dates >= np.datetime64(pd.Timestamp(start).date())
+        if end is not None:
+            mask &= dates <= np.datetime64(pd.Timestamp(end).date())
+        if not mask.any():
+            return pd.Series(dtype=float)
+        series = pd.Series(values[mask], index=pd.DatetimeIndex(dates[mask].astype("datetime64[ns]")))
+        return series.resample(freq).sum()
+
+    def metric_series(
+        self,
+        company: str,
+        metric: str,
+        frequency: str = "monthly",
+        column: str = "net",
+        exact: bool = False,
+    ) -> pd.Series:
+        """
+        ``column`` of all accounts of ``company`` matching ``metric`` (see
+        ``find_accounts``), summed per "daily", "weekly" or "monthly" period.
+        The series is indexed by period (days, weeks ending on Sunday, or
+        month starts) with the frequency set on its index, and is empty if no
+        dated entry matches.
+        """
+        if frequency not in SERIES_FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{frequency}', expected one of: {', '.join(SERIES_FREQUENCIES)}")
+        accounts = self.find_accounts(company, metric, exact=exact)
+        return self.resample(company, accounts, freq=SERIES_FREQUENCIES[frequency], column=column)
+
+    def stats(self) -> dict:
+        return {
+            "companies": len(self.companies),
+            "accounts": len(self._account_rows),
+            "entries": len(self),
+            "strings": len(self.strings),
+            "bytes": int(sum(c.nbytes for c in self.columns.values())) + self.strings.nbytes,
+        }
@@ -0,0 +1,303 @@
+"""
+Streaming ingestion of NOCFO JSON files.
+
+``json.load`` materializes the whole file as nested Python objects, which
+takes several times the file size in memory before the ledger store is even
+built. The reader here walks the company -> ledger -> account -> entries
+hierarchy incrementally instead: the file is read in chunks, every entry is
+decoded on its own (with the C decoder of ``json``) and handed straight to a
+``LedgerBuilder``, and sections that are not needed (other companies, the
+journal, the reports) are skipped by scanning, without decoding them. Peak
+memory is then about the compact store plus one chunk.
+
+Compare both ways of loading a file, each in a fresh process so the peak RSS
+is its own::
+
+    python -m adapters.ledger_stream NOCFO.json [--company RetailGiant]
+"""
+
+import argparse
+import codecs
+import json
+import multiprocessing
+import os
+import re
+import resource
+import time
+from typing import Iterable, Iterator, Optional, Tuple
+
+from adapters.ledger_store import LedgerBuilder, LedgerStore
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# everything up to the next bracket outside of a string, stopping early at a
+# string cut off by the end of the buffer
+_UNTIL_BRACKET = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+_DECODER = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Pull reader over the tokens of a JSON document, refilled chunk by chunk."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.eof = False
+        self.buf = ""
+        self.pos = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def _fill(self, grow: bool = False) -> bool:
+        """Append a chunk to the unconsumed rest of the buffer; False at the end of the file."""
+        if self.eof:
+            return False
+        # a value longer than the buffer is retried on a buffer twice as large,
+        # so decoding it stays linear in its size
+        size = max(self.chunk_size, len(self.buf) - self.pos) if grow else self.chunk_size
+        chunk = self.f.read(size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+        text = self._decoder.decode(chunk, final=self.eof)
+        self.buf = self.buf[self.pos :] + text
+        self.pos = 0
+        return bool(text) or not self.eof
+
+    def _error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at byte {self.bytes_read - len(self.buf[self.pos :].encode())}")
+
+    def peek(self) -> str:
+        """The next non-whitespace character, without consuming it."""
+        while True:
+            if self.pos < len(self.buf) and self.buf[self.pos] not in " \t\n\r":
+                return self.buf[self.pos]
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise self._error("Unexpected end of JSON input")
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise self._error(f"Expected one of {chars!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # most likely cut off by the end of the buffer
+                if self._fill(grow=True):
+                    continue
+                self.pos = e.pos
+                raise self._error(e.msg) from None
+            # a number at the end of the buffer may go on in the next chunk
+            if end == len(self.buf) and self._fill(grow=True):
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Consume the next value without decoding it."""
+        if self.peek() not in "[{":
+            self.decode()
+            return
+        depth = 0
+        while True:
+            self.pos = _UNTIL_BRACKET.match(self.buf, self.pos).end()
+            if self.pos == len(self.buf) or self.buf[self.pos] == '"':
+                # the buffer ends, possibly in the middle of a string
+                if not self._fill(grow=self.pos < len(self.buf)):
+                    raise self._error("Unexpected end of JSON input")
+                continue
+            depth += 1 if self.buf[self.pos] in "[{" else -1
+            self.pos += 1
+            if depth == 0:
+                return
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the keys of the next object; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            if not isinstance(key, str):
+                raise self._error("Expected an object key")
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def items(self) -> Iterator[None]:
+        """Iterate over the items of the next array; the caller consumes each item."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
+
+    def values(self) -> Iterator:
+        for _ in self.items():
+            yield self.decode()
+
+
+def _read_account(stream: _JsonStream, builder: LedgerBuilder, company: str):
+    number = name = None
+    pending = None
+    for key in stream.keys():
+        if key == "account_number":
+            number = int(stream.decode())
+        elif key == "account_name":
+            name = stream.decode()
+        elif key == "entries" and number is not None:
+            builder.add_entries(company, number, stream.values())
+        elif key == "entries":
+            # the number comes after the entries, which then have to wait for it
+            pending = stream.decode()
+        else:
+            stream.skip()
+    if number is None:
+        raise ValueError(f"Ledger account without account_number in company '{company}'")
+    builder.name_account(company, number, name if name is not None else str(number))
+    if pending is not None:
+        builder.add_entries(company, number, pending)
+
+
+def _read_companies(stream: _JsonStream, companies: Optional[Iterable[str]]) -> Iterator[str]:
+    """Iterate over the companies, skipping those not in ``companies``, until all of them are found."""
+    wanted = set(companies) if companies is not None else None
+    for company in stream.keys():
+        if wanted is not None and company not in wanted:
+            stream.skip()
+            continue
+        yield company
+        if wanted is not None:
+            wanted.discard(company)
+            if not wanted:
+                # the rest of the file is not needed
+                return
+
+
+def _peak_rss_mb() -> float:
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_ledger(
+    path: str, companies: Optional[Iterable[str]] = None, chunk_size: int = CHUNK_SIZE
+) -> Tuple[LedgerStore, dict]:
+    """
+    Build the ``LedgerStore`` of a NOCFO JSON file without loading the file.
+
+    With ``companies``, only those companies are read, and reading stops as
+    soon as all of them are found. Returns the store and the ingestion stats:
+    bytes read, time, throughput in MB/s and the peak RSS of the process
+    (which covers its whole lifetime, not only this call).
+    """
+    builder = LedgerBuilder()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        stream = _JsonStream(f, chunk_size)
+        for company in _read_companies(stream, companies):
+            builder.add_company(company, {})
+            for key in stream.keys():
+                if key != "ledger":
+                    stream.skip()
+                    continue
+                for _ in stream.items():
+                    _read_account(stream, builder, company)
+    store = builder.build()
+    return store, ingest_stats(stream.bytes_read, time.perf_counter() - start, store)
+
+
+def stream_company(path: str, company: str, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    The raw data of one company of a NOCFO JSON file, reading the file only up
+    to the end of that company. Raises ``KeyError`` if it does not exist.
+    """
+    with open(path, "rb") as f:
+        stream = _JsonStream(f, chunk_size)
+        for _ in _read_companies(stream, [company]):
+            return stream.decode()
+    raise KeyError(company)
+
+
+def stream_company_names(path: str, chunk_size: int = CHUNK_SIZE) -> list:
+    """The companies of a NOCFO JSON file, in file order, skipping their data."""
+    names = []
+    with open(path, "rb") as f:
+        stream = _JsonStream(f, chunk_size)
+        for company in stream.keys():
+            names.append(company)
+            stream.skip()
+    return names
+
+
+def load_ledger(path: str) -> Tuple[LedgerStore, dict]:
+    """Build the ``LedgerStore`` through ``json.load``, with the same stats as ``stream_ledger``."""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = json.load(f)
+    store = LedgerStore.from_data(data)
+    return store, ingest_stats(os.path.getsize(path), time.perf_counter() - start, store)
+
+
+def ingest_stats(num_bytes: int, seconds: float, store: LedgerStore) -> dict:
+    return {
+        "bytes": num_bytes,
+        "seconds": round(seconds, 4),
+        "mb_per_s": round(num_bytes / 2**20 / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "entries": len(store),
+        "store_mb": round(store.stats()["bytes"] / 2**20, 2),
+    }
+
+
+def _measure(method: str, path: str, companies: Optional[list], results):
+    baseline = _peak_rss_mb()
+    if method == "stream":
+        _, stats = stream_ledger(path, companies)
+    else:
+        _, stats = load_ledger(path)
+    stats["baseline_rss_mb"] = round(baseline, 1)
+    results.put(stats)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m adapters.ledger_stream",
+        description="Compare streaming ingestion of a NOCFO JSON file with json.load.",
+    )
+    parser.add_argument("path")
+    parser.add_argument("--company", action="append", dest="companies", help="Only stream these companies")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{args.path}: {os.path.getsize(args.path) / 2**20:.1f} MB")
+    for method in ("json.load", "stream"):
+        results = context.Queue()
+        process = context.Process(target=_measure, args=(method, args.path, args.companies, results))
+        process.start()
+        stats = results.get()
+        process.join()
+        print(
+            f"{method:>9}: {stats['seconds']:.2f}s, {stats['mb_per_s']} MB/s, "
+            f"peak RSS {stats['peak_rss_mb']} MB (baseline {stats['baseline_rss_mb']} MB), "
+            f"{stats['entries']} entries in {stats['store_mb']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
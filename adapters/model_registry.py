@@ -0,0 +1,336 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import torch
+from chronos import BaseChronosPipeline
+from chronos.model_cache import load_manifest
+
+DEFAULT_MODEL_ID = "amazon/chronos-t5-small"
+
+RegistryKey = Tuple[str, str, str]
+
+
+class ModelWarmup:
+    """
+    Background load of one registry entry.
+
+    The pipeline itself is not held here, only the load state, so a warmed-up
+    model can still be evicted by the registry like any other entry.
+    """
+
+    def __init__(self, registry: "ModelRegistry", model_id: str, torch_dtype: Union[str, torch.dtype], device_map: str):
+        self.registry = registry
+        self.model_id = model_id
+        self.torch_dtype = torch_dtype
+        self.device_map = device_map
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def start(self):
+        self.state = "loading"
+        self.started_at = time.time()
+        thread = threading.Thread(target=self._run, name=f"chronos-warmup-{self.model_id}", daemon=True)
+        thread.start()
+
+    def _run(self):
+        try:
+            self.registry._load(self.model_id, self.torch_dtype, self.device_map)
+            self.state = "ready"
+            print(f"[MODEL REGISTRY] {self.model_id} ready after {time.time() - self.started_at:.1f}s")
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"[MODEL REGISTRY] Warm-up of {self.model_id} failed: {self.error}")
+        finally:
+            self.finished_at = time.time()
+            self._event.set()
+
+    def _result(self) -> BaseChronosPipeline:
+        if self.state == "failed":
+            raise RuntimeError(f"Loading model '{self.model_id}' failed: {self.error}")
+        return self.registry._load(self.model_id, self.torch_dtype, self.device_map)
+
+    def _timeout_error(self, timeout: Optional[float]) -> TimeoutError:
+        return TimeoutError(
+            f"Model '{self.model_id}' is still loading ({time.time() - self.started_at:.1f}s elapsed, "
+            f"waited {timeout}s). Please retry shortly."
+        )
+
+    def wait(self, timeout: Optional[float] = None) -> BaseChronosPipeline:
+        if not self._event.wait(timeout):
+            raise self._timeout_error(timeout)
+        return self._result()
+
+    async def wait_async(self, timeout: Optional[float] = None) -> BaseChronosPipeline:
+        if not await asyncio.to_thread(self._event.wait, timeout):
+            raise self._timeout_error(timeout)
+        return self._result()
+
+    def status(self) -> dict:
+        now = time.time()
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or now) - self.started_at, 3)
+        return {
+            "model_id": self.model_id,
+            "state": self.state,
+            "elapsed_seconds": elapsed,
+            "time_to_ready_seconds": elapsed if self.state == "ready" else None,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded Chronos pipelines.
+
+    Pipelines are keyed on (model id, dtype, device) so every adapter asking for
+    the same model shares one copy of the weights. When more than ``max_models``
+    pipelines are loaded, the least recently used one is evicted.
+    """
+
+    def __init__(
+        self,
+        max_models: int = 2,
+        inference_mode: Optional[str] = None,
+        mmap: bool = False,
+        model_cache: Optional[str] = None,
+    ):
+        if max_models < 1:
+            raise ValueError("max_models must be at least 1")
+        self.max_models = max_models
+        # "int8" or "bf16" for faster CPU inference, applied to every loaded model
+        self.inference_mode = inference_mode
+        # memory-map the weights of models given as local checkpoint directories
+        self.mmap = mmap
+        # offline cache filled by `python -m chronos.model_cache prefetch`; when set,
+        # models are resolved from its manifest and the Hub is never contacted
+        self.model_cache = model_cache
+        self._pipelines: "OrderedDict[RegistryKey, BaseChronosPipeline]" = OrderedDict()
+        self._warmups: Dict[RegistryKey, ModelWarmup] = {}
+        # what each loaded pipeline was loaded from and how, see ``model_info``
+        self._info: "weakref.WeakKeyDictionary[BaseChronosPipeline, dict]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_seconds: Dict[str, float] = {}
+
+    @staticmethod
+    def make_key(model_id: str, torch_dtype: Union[str, torch.dtype], device_map: str) -> RegistryKey:
+        if isinstance(torch_dtype, torch.dtype):
+            torch_dtype = str(torch_dtype).replace("torch.", "")
+        return str(model_id), str(torch_dtype), str(device_map)
+
+    def get(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        torch_dtype: Union[str, torch.dtype] = torch.float32,
+        device_map: str = "cpu",
+        timeout: Optional[float] = None,
+    ) -> BaseChronosPipeline:
+        """
+        Return the shared pipeline, loading it if needed. If a background warm-up
+        of the same model is in flight, wait at most ``timeout`` seconds for it.
+        """
+        key = self.make_key(model_id, torch_dtype, device_map)
+        with self._lock:
+            warmup = self._warmups.get(key)
+        if warmup is not None and not warmup.done:
+            return warmup.wait(timeout)
+        return self._load(model_id, torch_dtype, device_map)
+
+    def warm_up(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        torch_dtype: Union[str, torch.dtype] = torch.float32,
+        device_map: str = "cpu",
+    ) -> ModelWarmup:
+        """
+        Start loading the pipeline in a background thread and return immediately.
+        Calling this again for the same model returns the existing warm-up unless
+        it failed, in which case the load is retried.
+        """
+        key = self.make_key(model_id, torch_dtype, device_map)
+        with self._lock:
+            warmup = self._warmups.get(key)
+            if warmup is not None and warmup.state != "failed":
+                return warmup
+            warmup = ModelWarmup(self, model_id, torch_dtype, device_map)
+            self._warmups[key] = warmup
+        warmup.start()
+        return warmup
+
+    def _load(
+        self,
+        model_id: str,
+        torch_dtype: Union[str, torch.dtype],
+        device_map: str,
+    ) -> BaseChronosPipeline:
+        key = self.make_key(model_id, torch_dtype, device_map)
+
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is not None:
+                self._pipelines.move_to_end(key)
+                self.hits += 1
+                return pipeline
+
+        # Loads are serialized so two callers racing on the same key never
+        # deserialize the weights twice; cache hits above do not wait on this lock.
+        with self._load_lock:
+            with self._lock:
+                pipeline = self._pipelines.get(key)
+                if pipeline is not None:
+                    self._pipelines.move_to_end(key)
+                    self.hits += 1
+                    return pipeline
+
+            mmap = self.mmap and (self.model_cache is not None or os.path.isdir(model_id))
+            mode = f", inference_mode={self.inference_mode}" if self.inference_mode else ""
+            mode += ", mmap" if mmap else ""
+            print(f"[MODEL REGISTRY] Loading {model_id} (dtype={key[1]}, device={device_map}{mode})")
+            start = time.perf_counter()
+            pipeline = BaseChronosPipeline.from_pretrained(
+                model_id,
+                device_map=device_map,
+                torch_dtype=torch_dtype,
+                inference_mode=self.inference_mode,
+                mmap=mmap,
+                model_cache=self.model_cache,
+            )
+            self.load_seconds[key[0]] = round(time.perf_counter() - start, 3)
+            info = self._describe(pipeline, model_id, mmap)
+
+            with self._lock:
+                self._pipelines[key] = pipeline
+                self._info[pipeline] = info
+                self.loads += 1
+                while len(self._pipelines) > self.max_models:
+                    evicted_key, _ = self._pipelines.popitem(last=False)
+                    self.evictions += 1
+                    print(f"[MODEL REGISTRY] Evicted {evicted_key[0]} (dtype={evicted_key[1]}, device={evicted_key[2]})")
+
+        return pipeline
+
+    def _revision(self, pipeline: BaseChronosPipeline, model_id: str) -> Optional[str]:
+        if self.model_cache is not None:
+            entry = load_manifest(self.model_cache)["models"].get(str(model_id))
+            if entry is not None:
+                return entry["revision"]
+        if os.path.isdir(str(model_id)):
+            # local checkpoints have no revision, they change in place
+            files = sorted(path for path in Path(model_id).rglob("*") if path.is_file())
+            stamps = [(str(path), path.stat().st_size, path.stat().st_mtime_ns) for path in files]
+            return "local-" + hashlib.sha256(json.dumps(stamps).encode("utf-8")).hexdigest()[:16]
+        # the commit of the Hub snapshot the weights were loaded from
+        return getattr(getattr(pipeline.inner_model, "config", None), "_commit_hash", None)
+
+    def _describe(self, pipeline: BaseChronosPipeline, model_id: str, mmap: bool) -> dict:
+        quantized = any(hasattr(module, "_packed_params") for module in pipeline.inner_model.modules())
+        dtype = next(pipeline.inner_model.parameters()).dtype
+        return {
+            "revision": self._revision(pipeline, model_id),
+            "dtype": str(dtype).replace("torch.", ""),
+            # the mode actually in effect: "bf16" falls back to float32 on CPUs without bfloat16
+            "inference_mode": "int8" if quantized else "bf16" if dtype == torch.bfloat16 else None,
+            "mmap": mmap,
+        }
+
+    def model_info(self, pipeline: BaseChronosPipeline, model_id: str) -> dict:
+        """
+        What the forecasts of ``pipeline`` depend on besides their inputs: the
+        revision of its weights, their dtype, the inference mode and whether
+        they are memory-mapped. Pipelines that were not loaded by the registry
+        are described from the pipeline itself.
+        """
+        with self._lock:
+            info = self._info.get(pipeline)
+        if info is None:
+            info = self._describe(pipeline, model_id, mmap=False)
+            with self._lock:
+                self._info[pipeline] = info
+        return info
+
+    def is_loaded(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        torch_dtype: Union[str, torch.dtype] = torch.float32,
+        device_map: str = "cpu",
+    ) -> bool:
+        with self._lock:
+            return self.make_key(model_id, torch_dtype, device_map) in self._pipelines
+
+    def clear(self):
+        with self._lock:
+            self._pipelines.clear()
+            self._warmups = {k: w for k, w in self._warmups.items() if not w.done}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded_models": [
+                    {"model_id": k[0], "torch_dtype": k[1], "device_map": k[2]}
+                    for k in self._pipelines
+                ],
+                "max_models": self.max_models,
+                "inference_mode": self.inference_mode,
+                "mmap": self.mmap,
+                "model_cache": self.model_cache,
+                "loads": self.loads,
+                "load_seconds": dict(self.load_seconds),
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "warmups": [w.status() for w in self._warmups.values()],
+            }
+
+
+registry = ModelRegistry(
+    max_models=int(os.getenv("CHRONOS_MAX_MODELS") or 2),
+    inference_mode=os.getenv("CHRONOS_INFERENCE_MODE") or None,
+    mmap=(os.getenv("CHRONOS_MMAP_WEIGHTS") or "").lower() in ("1", "true", "yes"),
+    model_cache=os.getenv("CHRONOS_MODEL_CACHE") or None,
+)
+
+
+def get_pipeline(
+    model_id: str = DEFAULT_MODEL_ID,
+    torch_dtype: Union[str, torch.dtype] = torch.float32,
+    device_map: str = "cpu",
+    timeout: Optional[float] = None,
+) -> BaseChronosPipeline:
+    return registry.get(model_id, torch_dtype=torch_dtype, device_map=device_map, timeout=timeout)
+
+
+def warm_up(
+    model_id: str = DEFAULT_MODEL_ID,
+    torch_dtype: Union[str, torch.dtype] = torch.float32,
+    device_map: str = "cpu",
+) -> ModelWarmup:
+    return registry.warm_up(model_id, torch_dtype=torch_dtype, device_map=device_map)
+
+
+async def wait_for_pipeline(
+    model_id: str = DEFAULT_MODEL_ID,
+    torch_dtype: Union[str, torch.dtype] = torch.float32,
+    device_map: str = "cpu",
+    timeout: Optional[float] = None,
+) -> BaseChronosPipeline:
+    """Await readiness without blocking the event loop, starting a warm-up if none is running."""
+    return await registry.warm_up(model_id, torch_dtype=torch_dtype, device_map=device_map).wait_async(timeout)
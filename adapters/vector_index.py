@@ -0,0 +1,140 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+
+class VectorIndex:
+    """
+    In-process nearest-neighbour index over fixed-size embeddings, by cosine similarity.
+
+    Vectors are L2-normalized and stored as float16. With ``mode="exact"`` a
+    query is scored against every vector with batched matmuls over blocks of
+    ``block_size`` rows. With ``mode="ivf"`` the vectors are clustered into
+    ``n_lists`` k-means cells (an inverted file) and only the ``n_probe`` cells
+    closest to the query are scored, which trades a little recall for speed on
+    large indexes. Small indexes are always searched exactly.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        mode: str = "exact",
+        n_lists: Optional[int] = None,
+        n_probe: int = 4,
+        block_size: int = 65536,
+        seed: int = 0,
+    ):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown index mode: {mode}")
+        self.dim = dim
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.block_size = block_size
+        self.seed = seed
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = torch.empty((0, dim), dtype=torch.float16)
+        self._centroids: Optional[torch.Tensor] = None
+        self._lists: List[torch.Tensor] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _normalize(vectors: torch.Tensor) -> torch.Tensor:
+        vectors = vectors.to(torch.float32)
+        return vectors / vectors.norm(dim=-1, keepdim=True).clamp(min=1e-12)
+
+    def add(self, ids: Sequence[str], vectors: torch.Tensor):
+        vectors = torch.as_tensor(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of shape (n, {self.dim}), found {tuple(vectors.shape)}")
+        if len(ids) != len(vectors):
+            raise ValueError("Expected one id per vector")
+        for i, id_ in enumerate(ids, start=len(self.ids)):
+            self._positions[id_] = i
+        self.ids.extend(ids)
+        self._vectors = torch.cat([self._vectors, self._normalize(vectors).to(torch.float16)])
+        self._centroids = None
+
+    def vector(self, id_: str) -> torch.Tensor:
+        """The stored (normalized, float16) vector of ``id_``."""
+        return self._vectors[self._positions[id_]]
+
+    def clear(self):
+        self.ids = []
+        self._positions = {}
+        self._vectors = torch.empty((0, self.dim), dtype=torch.float16)
+        self._centroids = None
+        self._lists = []
+
+    def _num_lists(self) -> int:
+        return min(self.n_lists or max(1, int(math.sqrt(len(self.ids)))), len(self.ids))
+
+    def build(self, iterations: int = 10):
+        """Cluster the vectors for IVF search. Called lazily by ``search`` after ``add``."""
+        n = len(self.ids)
+        n_lists = self._num_lists()
+        vectors = self._vectors.to(torch.float32)
+        generator = torch.Generator().manual_seed(self.seed)
+        centroids = vectors[torch.randperm(n, generator=generator)[:n_lists]].clone()
+        for _ in range(iterations):
+            assignment = (vectors @ centroids.T).argmax(dim=-1)
+            sums = torch.zeros_like(centroids).index_add_(0, assignment, vectors)
+            counts = torch.bincount(assignment, minlength=n_lists).unsqueeze(-1)
+            # empty cells keep their previous centroid
+            centroids = torch.where(counts > 0, sums / counts.clamp(min=1), centroids)
+            centroids = self._normalize(centroids)
+        assignment = (vectors @ centroids.T).argmax(dim=-1)
+        self._centroids = centroids
+        self._lists = [torch.nonzero(assignment == i).squeeze(-1) for i in range(n_lists)]
+
+    def _search_exact(self, queries: torch.Tensor, k: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        best_scores = torch.full((len(queries), 0), -math.inf)
+        best_indices = torch.empty((len(queries), 0), dtype=torch.long)
+        for start in range(0, len(self.ids), self.block_size):
+            block = self._vectors[start : start + self.block_size].to(torch.float32)
+            scores = queries @ block.T
+            block_k = min(k, scores.shape[1])
+            scores, indices = scores.topk(block_k, dim=-1)
+            best_scores = torch.cat([best_scores, scores], dim=-1)
+            best_indices = torch.cat([best_indices, indices + start], dim=-1)
+            best_scores, order = best_scores.topk(min(k, best_scores.shape[1]), dim=-1)
+            best_indices = best_indices.gather(-1, order)
+        return best_scores, best_indices
+
+    def _search_ivf(self, query: torch.Tensor, k: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        cells = (query @ self._centroids.T).topk(min(self.n_probe, len(self._lists))).indices
+        candidates = torch.cat([self._lists[i] for i in cells.tolist()])
+        scores = self._vectors[candidates].to(torch.float32) @ query
+        scores, order = scores.topk(min(k, len(candidates)))
+        return scores, candidates[order]
+
+    def search(self, queries: torch.Tensor, k: int = 5) -> List[List[Tuple[str, float]]]:
+        """
+        Return, for each query vector, the ``k`` most similar ids with their cosine similarity.
+        """
+        queries = torch.as_tensor(queries)
+        if queries.ndim == 1:
+            queries = queries.unsqueeze(0)
+        if not self.ids:
+            return [[] for _ in range(len(queries))]
+        queries = self._normalize(queries)
+
+        # probing every cell would only add overhead to an exact search
+        if self.mode == "exact" or self._num_lists() <= self.n_probe:
+            scores, indices = self._search_exact(queries, k)
+            return [
+                [(self.ids[i], float(s)) for s, i in zip(row_scores.tolist(), row_indices.tolist())]
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+
+        if self._centroids is None:
+            self.build()
+        results = []
+        for query in queries:
+            scores, indices = self._search_ivf(query, k)
+            results.append([(self.ids[i], float(s)) for s, i in zip(scores.tolist(), indices.tolist())])
+        return results
@@ -0,0 +1,97 @@
+import logging
+import time
+from typing import List
+
+import torch
+import typer
+
+from chronos import ChronosBoltPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-bolt-small",
+    device: str = "cpu",
+    torch_dtype: str = "float32",
+    batch_size: int = 64,
+    short_length: int = 30,
+    long_length: int = 2048,
+    long_fractions: List[float] = [0.0, 0.05, 0.25, 0.5, 1.0],
+    prediction_length: int = 12,
+    repeats: int = 3,
+    seed: int = 0,
+):
+    """Compare Chronos-Bolt forecasts of mixed-length batches with and without length buckets.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-bolt-small"
+        HuggingFace ID of the Chronos-Bolt model or local path
+    device : str, optional, default = "cpu"
+        Device on which inference will be performed
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_size : int, optional, default = 64
+        Number of series forecast per call
+    short_length : int, optional, default = 30
+        Length of the short series, e.g., a few years of monthly ledger totals
+    long_length : int, optional, default = 2048
+        Length of the long series
+    long_fractions : List[float], optional
+        Fractions of long series in the batch to benchmark
+    prediction_length : int, optional, default = 12
+        Forecast horizon
+    repeats : int, optional, default = 3
+        Timed repetitions per configuration, the best one is reported
+    seed : int, optional, default = 0
+        Seed for the synthetic series
+    """
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        chronos_model_id,
+        device_map=device,
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    length_bucket_ratio = pipeline.length_bucket_ratio
+    generator = torch.Generator().manual_seed(seed)
+
+    print(
+        f"{'long_fraction':>13} {'padded [s]':>11} {'bucketed [s]':>13} {'speedup':>8} {'max abs diff':>13}"
+    )
+    for long_fraction in long_fractions:
+        num_long = round(long_fraction * batch_size)
+        context = [
+            100
+            + 10
+            * torch.randn(
+                long_length if i < num_long else short_length, generator=generator
+            )
+            for i in range(batch_size)
+        ]
+
+        timings = {}
+        outputs = {}
+        for mode, ratio in [("padded", None), ("bucketed", length_bucket_ratio)]:
+            pipeline.length_bucket_ratio = ratio
+            pipeline.predict(context[:1], prediction_length=prediction_length)
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[mode] = pipeline.predict(
+                    context, prediction_length=prediction_length
+                )
+                best = min(best, time.perf_counter() - start)
+            timings[mode] = best
+        pipeline.length_bucket_ratio = length_bucket_ratio
+
+        diff = (outputs["padded"] - outputs["bucketed"]).abs().max().item()
+        print(
+            f"{long_fraction:>13.2f} {timings['padded']:>11.3f} {timings['bucketed']:>13.3f} "
+            f"{timings['padded'] / timings['bucketed']:>7.2f}x {diff:>13.2e}"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
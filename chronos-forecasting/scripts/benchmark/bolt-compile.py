@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import List
+
+import torch
+import typer
+
+from chronos import ChronosBoltPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def best_latency(
+    pipeline: ChronosBoltPipeline,
+    context: torch.Tensor,
+    prediction_length: int,
+    repeats: int,
+) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        pipeline.predict(context, prediction_length=prediction_length)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-bolt-small",
+    torch_dtype: str = "float32",
+    batch_sizes: List[int] = [1, 8, 32],
+    context_length: int = 512,
+    prediction_length: int = 64,
+    compile_mode: str = "default",
+    repeats: int = 10,
+):
+    """Compare per-batch CPU latency of Chronos-Bolt with eager and compiled forward passes.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-bolt-small"
+        HuggingFace ID of the Chronos-Bolt model or local path
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_sizes : List[int], optional
+        Number of series forecast per call
+    context_length : int, optional, default = 512
+        Length of the synthetic context series
+    prediction_length : int, optional, default = 64
+        Forecast horizon
+    compile_mode : str, optional, default = "default"
+        ``mode`` argument of ``torch.compile``
+    repeats : int, optional, default = 10
+        Timed repetitions per configuration, the best one is reported
+    """
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        chronos_model_id,
+        device_map="cpu",
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    contexts = {
+        batch_size: 100 + 10 * torch.randn(batch_size, context_length)
+        for batch_size in batch_sizes
+    }
+
+    eager = {}
+    for batch_size, context in contexts.items():
+        pipeline.predict(context, prediction_length=prediction_length)
+        eager[batch_size] = best_latency(pipeline, context, prediction_length, repeats)
+
+    pipeline.compile(mode=compile_mode)
+    print(
+        f"{'batch_size':>10} {'compile [s]':>12} {'eager [ms]':>11} {'compiled [ms]':>14} {'speedup':>8}"
+    )
+    for batch_size, context in contexts.items():
+        # the first call compiles the forward pass for this shape
+        start = time.perf_counter()
+        pipeline.predict(context, prediction_length=prediction_length)
+        compile_seconds = time.perf_counter() - start
+        compiled = best_latency(pipeline, context, prediction_length, repeats)
+        print(
+            f"{batch_size:>10} {compile_seconds:>12.1f} {1e3 * eager[batch_size]:>11.1f} "
+            f"{1e3 * compiled:>14.1f} {eager[batch_size] / compiled:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
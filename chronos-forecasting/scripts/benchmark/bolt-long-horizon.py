@@ -0,0 +1,100 @@
+import logging
+import time
+from typing import List, Optional
+
+import torch
+import typer
+
+from chronos import ChronosBoltPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-bolt-small",
+    device: str = "cpu",
+    torch_dtype: str = "float32",
+    batch_size: int = 32,
+    context_length: int = 512,
+    prediction_lengths: List[int] = [64, 256, 512, 1024],
+    renormalize_tolerance: Optional[float] = None,
+    repeats: int = 3,
+):
+    """Compare chunked and incremental long-horizon rollouts of ChronosBoltPipeline.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-bolt-small"
+        HuggingFace ID of the Chronos-Bolt model or local path
+    device : str, optional, default = "cpu"
+        Device on which inference will be performed
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_size : int, optional, default = 32
+        Number of series forecast per call
+    context_length : int, optional, default = 512
+        Length of the synthetic context series
+    prediction_lengths : List[int], optional
+        Horizons to benchmark
+    renormalize_tolerance : Optional[float], optional
+        Overrides ``ChronosBoltPipeline.renormalize_tolerance``
+    repeats : int, optional, default = 3
+        Timed repetitions per configuration, the best one is reported
+    """
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        chronos_model_id,
+        device_map=device,
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    if renormalize_tolerance is not None:
+        pipeline.renormalize_tolerance = renormalize_tolerance
+    t = torch.arange(context_length, dtype=torch.float32)
+    context = torch.stack(
+        [
+            100
+            + 10 * torch.sin(2 * torch.pi * t / 12 + i)
+            + torch.randn(context_length)
+            for i in range(batch_size)
+        ]
+    )
+
+    # warm-up, so that one-off initialization is not attributed to the first mode
+    pipeline.predict(context, prediction_length=1)
+
+    print(
+        f"{'prediction_length':>17} {'chunked [s]':>12} {'incremental [s]':>16} "
+        f"{'speedup':>8} {'max rel diff':>13}"
+    )
+    for prediction_length in prediction_lengths:
+        timings = {}
+        outputs = {}
+        for mode in ["chunked", "incremental"]:
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[mode] = pipeline.predict(
+                    context,
+                    prediction_length=prediction_length,
+                    long_horizon=mode,
+                )
+                best = min(best, time.perf_counter() - start)
+            timings[mode] = best
+        diff = (
+            (
+                (outputs["chunked"] - outputs["incremental"]).abs()
+                / outputs["chunked"].abs()
+            )
+            .max()
+            .item()
+        )
+        print(
+            f"{prediction_length:>17} {timings['chunked']:>12.3f} "
+            f"{timings['incremental']:>16.3f} "
+            f"{timings['chunked'] / timings['incremental']:>7.2f}x {diff:>13.2e}"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import List
+
+import torch
+import typer
+
+from chronos import ChronosPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-t5-small",
+    device: str = "cpu",
+    torch_dtype: str = "float32",
+    batch_size: int = 8,
+    context_length: int = 512,
+    num_samples: int = 20,
+    prediction_lengths: List[int] = [64, 128, 256, 512],
+    repeats: int = 3,
+):
+    """Compare chunked and incremental long-horizon rollouts of ChronosPipeline.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-t5-small"
+        HuggingFace ID of the Chronos model or local path
+    device : str, optional, default = "cpu"
+        Device on which inference will be performed
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_size : int, optional, default = 8
+        Number of series forecast per call
+    context_length : int, optional, default = 512
+        Length of the synthetic context series
+    num_samples : int, optional, default = 20
+        Number of sample paths per series
+    prediction_lengths : List[int], optional
+        Horizons to benchmark
+    repeats : int, optional, default = 3
+        Timed repetitions per configuration, the best one is reported
+    """
+    pipeline = ChronosPipeline.from_pretrained(
+        chronos_model_id,
+        device_map=device,
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    t = torch.arange(context_length, dtype=torch.float32)
+    context = torch.stack(
+        [
+            100
+            + 10 * torch.sin(2 * torch.pi * t / 12 + i)
+            + torch.randn(context_length)
+            for i in range(batch_size)
+        ]
+    )
+
+    # warm-up, so that one-off initialization is not attributed to the first mode
+    pipeline.predict(context, prediction_length=1, num_samples=num_samples)
+
+    print(
+        f"{'prediction_length':>17} {'chunked [s]':>12} {'incremental [s]':>16} {'speedup':>8}"
+    )
+    for prediction_length in prediction_lengths:
+        timings = {}
+        for mode in ["chunked", "incremental"]:
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                pipeline.predict(
+                    context,
+                    prediction_length=prediction_length,
+                    num_samples=num_samples,
+                    long_horizon=mode,
+                )
+                best = min(best, time.perf_counter() - start)
+            timings[mode] = best
+        print(
+            f"{prediction_length:>17} {timings['chunked']:>12.3f} "
+            f"{timings['incremental']:>16.3f} "
+            f"{timings['chunked'] / timings['incremental']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
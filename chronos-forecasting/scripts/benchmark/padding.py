@@ -0,0 +1,84 @@
+import timeit
+from typing import List
+
+import numpy as np
+import torch
+import typer
+
+from chronos.utils import left_pad_and_stack_1D
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def concat_left_pad_and_stack_1D(tensors: List[torch.Tensor]) -> torch.Tensor:
+    # The previous implementation: one padding tensor and one concat per
+    # series, then a stack copying everything once more.
+    max_len = max(len(c) for c in tensors)
+    padded = []
+    for c in tensors:
+        padding = torch.full(
+            size=(max_len - len(c),), fill_value=torch.nan, device=c.device
+        )
+        padded.append(torch.concat((padding, c), dim=-1))
+    return torch.stack(padded)
+
+
+@app.command()
+def main(
+    num_series: int = 10_000,
+    min_length: int = 16,
+    max_length: int = 2048,
+    context_length: int = 512,
+    number: int = 5,
+    seed: int = 0,
+):
+    """Benchmark left-padding and stacking of series with uneven lengths.
+
+    Parameters
+    ----------
+    num_series : int, optional, default = 10_000
+        Number of series in the batch
+    min_length : int, optional, default = 16
+        Shortest series length
+    max_length : int, optional, default = 2048
+        Longest series length
+    context_length : int, optional, default = 512
+        Truncation length for the ``max_length`` rows, as a model context length
+    number : int, optional, default = 5
+        Calls per timing
+    seed : int, optional, default = 0
+        Seed for the series lengths and values
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(min_length, max_length + 1, size=num_series)
+    arrays = [rng.standard_normal(n).astype(np.float32) for n in lengths]
+    tensors = [torch.from_numpy(a) for a in arrays]
+    lists = [a.tolist() for a in arrays]
+
+    cases = {
+        "tensors, previous": lambda: concat_left_pad_and_stack_1D(tensors),
+        "tensors, previous + slice": lambda: concat_left_pad_and_stack_1D(tensors)[
+            :, -context_length:
+        ],
+        "tensors": lambda: left_pad_and_stack_1D(tensors),
+        "tensors, max_length": lambda: left_pad_and_stack_1D(
+            tensors, max_length=context_length
+        ),
+        "numpy": lambda: left_pad_and_stack_1D(arrays),
+        "numpy, max_length": lambda: left_pad_and_stack_1D(
+            arrays, max_length=context_length
+        ),
+        "lists, previous": lambda: concat_left_pad_and_stack_1D(
+            [torch.tensor(x) for x in lists]
+        ),
+        "lists": lambda: left_pad_and_stack_1D(lists),
+    }
+
+    print(f"{'input':>26} {'time [ms]':>10}")
+    for name, fn in cases.items():
+        elapsed = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"{name:>26} {1e3 * elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,81 @@
+import timeit
+from typing import List
+
+import torch
+import typer
+
+from chronos.utils import sample_quantiles
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def torch_quantiles(samples: torch.Tensor, quantile_levels: List[float]):
+    # The extraction in ChronosPipeline.predict_quantiles before the quantile engine
+    samples = samples.swapaxes(1, 2)
+    mean = samples.mean(dim=-1)
+    quantiles = torch.quantile(
+        samples, q=torch.tensor(quantile_levels, dtype=samples.dtype), dim=-1
+    ).permute(1, 2, 0)
+    return quantiles, mean
+
+
+@app.command()
+def main(
+    batch_size: int = 32,
+    prediction_length: int = 64,
+    num_samples: List[int] = [20, 100, 1000, 10000],
+    quantile_levels: List[float] = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9],
+    number: int = 10,
+):
+    """Compare quantile extraction from sample paths: torch.quantile vs. the quantile engine.
+
+    Parameters
+    ----------
+    batch_size : int, optional, default = 32
+        Number of series
+    prediction_length : int, optional, default = 64
+        Number of forecast steps
+    num_samples : List[int], optional
+        Numbers of sample paths per series to benchmark
+    quantile_levels : List[float], optional
+        Quantile levels to extract
+    number : int, optional, default = 10
+        Calls per timing
+    """
+    methods = ["sort", "select", "histogram"]
+    print(
+        f"{'num_samples':>11} {'torch.quantile [ms]':>19} "
+        + " ".join(f"{m + ' [ms]':>14}" for m in methods)
+        + f" {'histogram max err':>17}"
+    )
+    for n in num_samples:
+        samples = 100 + 10 * torch.randn(batch_size, n, prediction_length)
+        baseline = min(
+            timeit.repeat(
+                lambda: torch_quantiles(samples, quantile_levels),
+                number=number,
+                repeat=3,
+            )
+        )
+        timings = [
+            min(
+                timeit.repeat(
+                    lambda: sample_quantiles(samples, quantile_levels, method=method),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            for method in methods
+        ]
+        expected, _ = torch_quantiles(samples, quantile_levels)
+        approximate, _ = sample_quantiles(samples, quantile_levels, method="histogram")
+        error = (approximate - expected).abs().max().item()
+        print(
+            f"{n:>11} {1e3 * baseline / number:>19.3f} "
+            + " ".join(f"{1e3 * t / number:>14.3f}" for t in timings)
+            + f" {error:>17.4f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
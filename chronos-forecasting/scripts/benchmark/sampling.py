@@ -0,0 +1,123 @@
+import logging
+import multiprocessing as mp
+import resource
+import time
+from typing import List
+
+import torch
+import typer
+
+from chronos import ChronosPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def run_decoding(
+    queue,
+    chronos_model_id: str,
+    device: str,
+    torch_dtype: str,
+    decoding: str,
+    batch_size: int,
+    context_length: int,
+    num_samples: int,
+    prediction_length: int,
+):
+    # Each decoding mode runs in a fresh process, so that the peak resident
+    # memory reported on CPU is not polluted by the other mode.
+    pipeline = ChronosPipeline.from_pretrained(
+        chronos_model_id,
+        device_map=device,
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    context = 100 + 10 * torch.randn(batch_size, context_length)
+    pipeline.predict(context[:1], prediction_length=1, num_samples=1)
+
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    pipeline.predict(
+        context,
+        prediction_length=prediction_length,
+        num_samples=num_samples,
+        decoding=decoding,
+    )
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+    elapsed = time.perf_counter() - start
+
+    if device.startswith("cuda"):
+        peak_mb = torch.cuda.max_memory_allocated() / 2**20
+    else:
+        peak_mb = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb
+        ) / 2**10
+    queue.put((elapsed, peak_mb))
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-t5-small",
+    device: str = "cpu",
+    torch_dtype: str = "float32",
+    batch_sizes: List[int] = [1, 8, 32],
+    context_length: int = 512,
+    num_samples: int = 20,
+    prediction_length: int = 64,
+):
+    """Compare sample-path decoding through ``generate`` with shared-encoder decoding.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-t5-small"
+        HuggingFace ID of the Chronos model or local path
+    device : str, optional, default = "cpu"
+        Device on which inference will be performed
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_sizes : List[int], optional
+        Number of series forecast per call
+    context_length : int, optional, default = 512
+        Length of the synthetic context series
+    num_samples : int, optional, default = 20
+        Number of sample paths per series
+    prediction_length : int, optional, default = 64
+        Number of decoded steps per sample path
+    """
+    ctx = mp.get_context("spawn")
+    print(
+        f"{'batch_size':>10} {'decoding':>15} {'tokens/s':>10} {'peak memory [MiB]':>18}"
+    )
+    for batch_size in batch_sizes:
+        for decoding in ["generate", "shared_encoder"]:
+            queue = ctx.Queue()
+            process = ctx.Process(
+                target=run_decoding,
+                args=(
+                    queue,
+                    chronos_model_id,
+                    device,
+                    torch_dtype,
+                    decoding,
+                    batch_size,
+                    context_length,
+                    num_samples,
+                    prediction_length,
+                ),
+            )
+            process.start()
+            elapsed, peak_mb = queue.get()
+            process.join()
+
+            tokens_per_second = batch_size * num_samples * prediction_length / elapsed
+            print(
+                f"{batch_size:>10} {decoding:>15} {tokens_per_second:>10.0f} {peak_mb:>18.1f}"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
@@ -0,0 +1,95 @@
+import logging
+import os
+import time
+from typing import List, Optional
+
+import torch
+import typer
+
+from chronos import BaseChronosPipeline, ChronosPipeline, ShardedExecutor
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def best_time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@app.command()
+def main(
+    chronos_model_id: str = "amazon/chronos-bolt-small",
+    torch_dtype: str = "float32",
+    batch_size: int = 64,
+    context_length: int = 512,
+    prediction_length: int = 64,
+    num_samples: int = 20,
+    cores: Optional[List[int]] = None,
+    backend: str = "thread",
+    repeats: int = 3,
+):
+    """Compare a single predict call using N intra-op threads with N single-threaded shards.
+
+    Parameters
+    ----------
+    chronos_model_id : str, optional, default = "amazon/chronos-bolt-small"
+        HuggingFace ID of the Chronos or Chronos-Bolt model or local path
+    torch_dtype : str, optional, default = "float32"
+        Model's dtype
+    batch_size : int, optional, default = 64
+        Number of series forecast per call
+    context_length : int, optional, default = 512
+        Length of the synthetic context series
+    prediction_length : int, optional, default = 64
+        Forecast horizon
+    num_samples : int, optional, default = 20
+        Number of sample paths per series, for Chronos models
+    cores : List[int], optional
+        Core counts to benchmark, by default powers of two up to the number of CPUs
+    backend : str, optional, default = "thread"
+        Worker backend of the sharded executor, "thread" or "process"
+    repeats : int, optional, default = 3
+        Timed repetitions per configuration, the best one is reported
+    """
+    cpu_count = os.cpu_count() or 1
+    if not cores:
+        cores = [2**i for i in range(cpu_count.bit_length()) if 2**i <= cpu_count]
+
+    pipeline = BaseChronosPipeline.from_pretrained(
+        chronos_model_id,
+        device_map="cpu",
+        torch_dtype=getattr(torch, torch_dtype),
+    )
+    predict_kwargs: dict = dict(prediction_length=prediction_length)
+    if isinstance(pipeline, ChronosPipeline):
+        predict_kwargs["num_samples"] = num_samples
+    context = 100 + 10 * torch.randn(batch_size, context_length)
+    pipeline.predict(context[:1], **predict_kwargs)
+
+    print(
+        f"{'cores':>5} {'single call [series/s]':>23} {'sharded [series/s]':>19} {'speedup':>8}"
+    )
+    for n in cores:
+        torch.set_num_threads(n)
+        single = best_time(lambda: pipeline.predict(context, **predict_kwargs), repeats)
+        torch.set_num_threads(1)
+        with ShardedExecutor(
+            pipeline, num_workers=n, threads_per_worker=1, backend=backend
+        ) as executor:
+            executor.predict(context, **predict_kwargs)
+            sharded = best_time(
+                lambda: executor.predict(context, **predict_kwargs), repeats
+            )
+        print(
+            f"{n:>5} {batch_size / single:>23.1f} {batch_size / sharded:>19.1f} "
+            f"{single / sharded:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    app()
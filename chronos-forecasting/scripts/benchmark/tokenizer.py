@@ -0,0 +1,109 @@
+import timeit
+from typing import List
+
+import torch
+import typer
+
+from chronos import ChronosConfig, MeanScaleUniformBins
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+def unfused_context_input_transform(tokenizer: MeanScaleUniformBins, context):
+    # The tokenization path before the fused implementation: separate
+    # temporaries for the mask, the scaled context and the EOS column.
+    config = tokenizer.config
+    context = context.to(dtype=torch.float32)
+    attention_mask = ~torch.isnan(context)
+    scale = torch.nansum(torch.abs(context) * attention_mask, dim=-1) / torch.nansum(
+        attention_mask, dim=-1
+    )
+    scale[~(scale > 0)] = 1.0
+    token_ids = (
+        torch.bucketize(context / scale.unsqueeze(-1), tokenizer.boundaries, right=True)
+        + config.n_special_tokens
+    )
+    token_ids.clamp_(0, config.n_tokens - 1)
+    token_ids[~attention_mask] = config.pad_token_id
+
+    batch_size = token_ids.shape[0]
+    token_ids = torch.concat(
+        (token_ids, torch.full((batch_size, 1), config.eos_token_id)), dim=1
+    )
+    attention_mask = torch.concat(
+        (attention_mask, torch.full((batch_size, 1), True)), dim=1
+    )
+    return token_ids, attention_mask, scale
+
+
+@app.command()
+def main(
+    batch_sizes: List[int] = [1, 16, 256, 4096],
+    context_lengths: List[int] = [64, 256, 512],
+    n_tokens: int = 4096,
+    missing_fraction: float = 0.1,
+    number: int = 20,
+):
+    """Micro-benchmark the MeanScaleUniformBins context tokenization.
+
+    Parameters
+    ----------
+    batch_sizes : List[int], optional
+        Batch sizes to benchmark
+    context_lengths : List[int], optional
+        Context lengths to benchmark
+    n_tokens : int, optional, default = 4096
+        Vocabulary size, as in the official Chronos models
+    missing_fraction : float, optional, default = 0.1
+        Fraction of context values replaced with NaN
+    number : int, optional, default = 20
+        Calls per timing
+    """
+    config = ChronosConfig(
+        tokenizer_class="MeanScaleUniformBins",
+        tokenizer_kwargs=dict(low_limit=-15.0, high_limit=15.0),
+        n_tokens=n_tokens,
+        n_special_tokens=2,
+        pad_token_id=0,
+        eos_token_id=1,
+        use_eos_token=True,
+        model_type="seq2seq",
+        context_length=max(context_lengths),
+        prediction_length=64,
+        num_samples=20,
+        temperature=1.0,
+        top_k=50,
+        top_p=1.0,
+    )
+    tokenizer = config.create_tokenizer()
+
+    print(
+        f"{'batch_size':>10} {'context_length':>14} {'unfused [ms]':>13} {'fused [ms]':>11} {'speedup':>8}"
+    )
+    for context_length in context_lengths:
+        for batch_size in batch_sizes:
+            context = 100 * torch.randn(batch_size, context_length)
+            context[torch.rand_like(context) < missing_fraction] = torch.nan
+
+            unfused = min(
+                timeit.repeat(
+                    lambda: unfused_context_input_transform(tokenizer, context),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            fused = min(
+                timeit.repeat(
+                    lambda: tokenizer.context_input_transform(context),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            print(
+                f"{batch_size:>10} {context_length:>14} {1e3 * unfused / number:>13.3f} "
+                f"{1e3 * fused / number:>11.3f} {unfused / fused:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,6 +1,7 @@
 import logging
+import time
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Tuple
 
 import datasets
 import numpy as np
@@ -23,6 +24,7 @@ from chronos import (
 )
 
 app = typer.Typer(pretty_exceptions_enable=False)
+logger = logging.getLogger("Chronos Evaluation")
 
 
 def to_gluonts_univariate(hf_dataset: datasets.Dataset):
@@ -120,6 +122,53 @@ def generate_forecasts(
     return forecasts
 
 
+def evaluate_backtest(
+    pipeline: BaseChronosPipeline,
+    backtest_config: dict,
+    batch_size: int,
+    **predict_kwargs,
+) -> Tuple[dict, float]:
+    """
+    Forecast and evaluate one backtest config. Returns the MASE and WQL
+    metrics and the time spent generating forecasts, in seconds.
+    """
+    dataset_name = backtest_config["name"]
+    prediction_length = backtest_config["prediction_length"]
+
+    logger.info(f"Loading {dataset_name}")
+    test_data = load_and_split_dataset(backtest_config=backtest_config)
+
+    logger.info(
+        f"Generating forecasts for {dataset_name} "
+        f"({len(test_data.input)} time series)"
+    )
+    start = time.perf_counter()
+    forecasts = generate_forecasts(
+        test_data.input,
+        pipeline=pipeline,
+        prediction_length=prediction_length,
+        batch_size=batch_size,
+        **predict_kwargs,
+    )
+    elapsed = time.perf_counter() - start
+
+    logger.info(f"Evaluating forecasts for {dataset_name}")
+    metrics = (
+        evaluate_forecasts(
+            forecasts,
+            test_data=test_data,
+            metrics=[
+                MASE(),
+                MeanWeightedSumQuantileLoss(np.arange(0.1, 1.0, 0.1)),
+            ],
+            batch_size=5000,
+        )
+        .reset_index(drop=True)
+        .to_dict(orient="records")
+    )
+    return metrics[0], elapsed
+
+
 @app.command()
 def main(
     config_path: Path,
@@ -132,6 +181,7 @@ def main(
     temperature: Optional[float] = None,
     top_k: Optional[int] = None,
     top_p: Optional[float] = None,
+    inference_mode: Optional[str] = None,
 ):
     """Evaluate Chronos models.
 
@@ -170,6 +220,8 @@ def main(
         Top-K sampling, by default None
     top_p : Optional[float], optional, default = 1.0
         Top-p sampling, by default None
+    inference_mode : Optional[str], optional, default = None
+        CPU inference mode applied after loading, "int8" or "bf16"
     """
     if isinstance(torch_dtype, str):
         torch_dtype = getattr(torch, torch_dtype)
@@ -180,6 +232,7 @@ def main(
         chronos_model_id,
         device_map=device,
         torch_dtype=torch_dtype,
+        inference_mode=inference_mode,
     )
 
     if isinstance(pipeline, ChronosPipeline):
@@ -198,40 +251,9 @@ def main(
 
     result_rows = []
     for config in backtest_configs:
-        dataset_name = config["name"]
-        prediction_length = config["prediction_length"]
-
-        logger.info(f"Loading {dataset_name}")
-        test_data = load_and_split_dataset(backtest_config=config)
-
-        logger.info(
-            f"Generating forecasts for {dataset_name} "
-            f"({len(test_data.input)} time series)"
-        )
-        forecasts = generate_forecasts(
-            test_data.input,
-            pipeline=pipeline,
-            prediction_length=prediction_length,
-            batch_size=batch_size,
-            **predict_kwargs,
-        )
-
-        logger.info(f"Evaluating forecasts for {dataset_name}")
-        metrics = (
-            evaluate_forecasts(
-                forecasts,
-                test_data=test_data,
-                metrics=[
-                    MASE(),
-                    MeanWeightedSumQuantileLoss(np.arange(0.1, 1.0, 0.1)),
-                ],
-                batch_size=5000,
-            )
-            .reset_index(drop=True)
-            .to_dict(orient="records")
-        )
+        metrics, _ = evaluate_backtest(pipeline, config, batch_size, **predict_kwargs)
         result_rows.append(
-            {"dataset": dataset_name, "model": chronos_model_id, **metrics[0]}
+            {"dataset": config["name"], "model": chronos_model_id, **metrics}
         )
 
     # Save results to a CSV file
@@ -248,6 +270,5 @@ def main(
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    logger = logging.getLogger("Chronos Evaluation")
     logger.setLevel(logging.INFO)
     app()
@@ -0,0 +1,128 @@
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import torch
+import typer
+import yaml
+from evaluate import evaluate_backtest, logger
+from scipy.stats import gmean
+
+from chronos import BaseChronosPipeline, ChronosPipeline
+
+app = typer.Typer(pretty_exceptions_enable=False)
+
+
+@app.command()
+def main(
+    config_path: Path,
+    metrics_path: Path,
+    chronos_model_id: str = "amazon/chronos-t5-small",
+    inference_modes: List[str] = ["float32", "bf16", "int8"],
+    batch_size: int = 32,
+    num_samples: int = 20,
+    num_threads: Optional[int] = None,
+):
+    """Compare accuracy (MASE, WQL) and latency of CPU inference modes.
+
+    Each mode is evaluated on the same backtest configs as ``evaluate.py``.
+    Per-dataset results are saved to ``metrics_path``, and a summary with the
+    geometric mean of each metric relative to the first mode and the total
+    forecasting time is printed.
+
+    Parameters
+    ----------
+    config_path : Path
+        Path to the evaluation config. See ./configs/.
+    metrics_path : Path
+        Path to the CSV file where per-dataset metrics will be saved.
+    chronos_model_id : str, optional, default = "amazon/chronos-t5-small"
+        HuggingFace ID of the Chronos model or local path
+    inference_modes : List[str], optional
+        Modes to compare: "float32" (no inference mode), "bf16" or "int8"
+    batch_size : int, optional, default = 32
+        Batch size for inference
+    num_samples : int, optional, default = 20
+        Number of samples to draw when using the original Chronos models
+    num_threads : Optional[int], optional
+        Number of CPU threads used by torch, by default torch's default
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+
+    with open(config_path) as fp:
+        backtest_configs = yaml.safe_load(fp)
+
+    result_rows = []
+    for inference_mode in inference_modes:
+        pipeline = BaseChronosPipeline.from_pretrained(
+            chronos_model_id,
+            device_map="cpu",
+            torch_dtype=torch.float32,
+            inference_mode=None if inference_mode == "float32" else inference_mode,
+        )
+        predict_kwargs = (
+            dict(num_samples=num_samples)
+            if isinstance(pipeline, ChronosPipeline)
+            else {}
+        )
+        for config in backtest_configs:
+            # fixed seed, so that modes differ only by numerics
+            torch.manual_seed(0)
+            metrics, seconds = evaluate_backtest(
+                pipeline, config, batch_size, **predict_kwargs
+            )
+            result_rows.append(
+                {
+                    "dataset": config["name"],
+                    "model": chronos_model_id,
+                    "inference_mode": inference_mode,
+                    **metrics,
+                    "forecast_seconds": seconds,
+                }
+            )
+
+    results_df = (
+        pd.DataFrame(result_rows)
+        .rename(
+            {"MASE[0.5]": "MASE", "mean_weighted_sum_quantile_loss": "WQL"},
+            axis="columns",
+        )
+        .sort_values(by=["dataset", "inference_mode"])
+    )
+    results_df.to_csv(metrics_path, index=False)
+
+    scores = results_df.pivot(
+        index="dataset", columns="inference_mode", values=["MASE", "WQL"]
+    )
+    reference = inference_modes[0]
+    summary = pd.DataFrame(
+        {
+            "relative MASE": [
+                gmean(scores["MASE"][mode] / scores["MASE"][reference])
+                for mode in inference_modes
+            ],
+            "relative WQL": [
+                gmean(scores["WQL"][mode] / scores["WQL"][reference])
+                for mode in inference_modes
+            ],
+            "forecast seconds": [
+                results_df.loc[
+                    results_df["inference_mode"] == mode, "forecast_seconds"
+                ].sum()
+                for mode in inference_modes
+            ],
+        },
+        index=pd.Index(inference_modes, name="inference_mode"),
+    )
+    summary["speedup"] = (
+        summary["forecast seconds"].iloc[0] / summary["forecast seconds"]
+    )
+    print(summary.to_string(float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+    app()
@@ -10,6 +10,8 @@ from .chronos import (
     MeanScaleUniformBins,
 )
 from .chronos_bolt import ChronosBoltConfig, ChronosBoltPipeline
+from .embedding_store import EmbeddingStore
+from .sharding import ShardedExecutor
 
 __all__ = [
     "BaseChronosPipeline",
@@ -21,4 +23,6 @@ __all__ = [
     "MeanScaleUniformBins",
     "ChronosBoltConfig",
     "ChronosBoltPipeline",
+    "EmbeddingStore",
+    "ShardedExecutor",
 ]
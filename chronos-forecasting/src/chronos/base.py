@@ -5,16 +5,28 @@
 # Original source:
 # https://github.com/autogluon/autogluon/blob/f57beb26cb769c6e0d484a6af2b89eab8aee73a8/timeseries/src/autogluon/timeseries/models/chronos/pipeline/base.py
 
+import logging
 from enum import Enum
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Sequence, Tuple, Union
 
 import torch
+import torch.nn as nn
 
 if TYPE_CHECKING:
     from transformers import PreTrainedModel
 
-from .utils import left_pad_and_stack_1D
+from .utils import left_pad_and_stack_1D, length_buckets
+
+logger = logging.getLogger(__file__)
+
+
+def cpu_supports_bf16() -> bool:
+    """
+    Whether the CPU has native bfloat16 matmul support (AVX512-BF16 or AMX).
+    """
+    checks = ("_is_avx512_bf16_supported", "_is_amx_tile_supported")
+    return any(getattr(torch.cpu, check, lambda: False)() for check in checks)
 
 
 class ForecastType(Enum):
@@ -37,6 +49,10 @@ class PipelineRegistry(type):
 class BaseChronosPipeline(metaclass=PipelineRegistry):
     forecast_type: ForecastType
     dtypes = {"bfloat16": torch.bfloat16, "float32": torch.float32}
+    # Series in a list context whose lengths (after truncation to the context
+    # length) differ by more than this factor are forecast in separate batches,
+    # so short series are not padded to the longest one. None disables this.
+    length_bucket_ratio: Optional[float] = 4.0
 
     def __init__(self, inner_model: "PreTrainedModel"):
         """
@@ -48,18 +64,73 @@ class BaseChronosPipeline(metaclass=PipelineRegistry):
         # for easy access to the inner HF-style model
         self.inner_model = inner_model
 
+    @property
+    def context_length(self) -> Optional[int]:
+        """
+        Number of most recent time steps the model looks at, or None if
+        the context is not truncated.
+        """
+        return None
+
     def _prepare_and_validate_context(
         self, context: Union[torch.Tensor, List[torch.Tensor]]
     ):
+        # Series are truncated to the context length before padding, so the
+        # batch takes at most (batch_size, context_length) memory whatever
+        # the length of the input series.
         if isinstance(context, list):
-            context = left_pad_and_stack_1D(context)
+            context = left_pad_and_stack_1D(context, max_length=self.context_length)
         assert isinstance(context, torch.Tensor)
         if context.ndim == 1:
             context = context.unsqueeze(0)
         assert context.ndim == 2
+        if self.context_length is not None:
+            context = context[..., -self.context_length :]
 
         return context
 
+    def _length_buckets(
+        self, context: Union[torch.Tensor, List[torch.Tensor]]
+    ) -> Optional[List[List[int]]]:
+        """
+        Indices of the length buckets of a list context, or None if the
+        context should be forecast as a single batch.
+        """
+        if not isinstance(context, list) or self.length_bucket_ratio is None:
+            return None
+        lengths = [len(c) for c in context]
+        if self.context_length is not None:
+            lengths = [min(n, self.context_length) for n in lengths]
+        buckets = length_buckets(lengths, max_ratio=self.length_bucket_ratio)
+        return buckets if len(buckets) > 1 else None
+
+    def _predict_length_buckets(
+        self,
+        context: List[torch.Tensor],
+        buckets: List[List[int]],
+        **predict_kwargs,
+    ) -> torch.Tensor:
+        """
+        Call ``predict`` once per length bucket and put the forecasts back
+        in the order of ``context``. A list of per-series ``generator`` is
+        split along with the series.
+        """
+        predictions = None
+        generator = predict_kwargs.pop("generator", None)
+        for bucket in buckets:
+            if isinstance(generator, Sequence):
+                predict_kwargs["generator"] = [generator[i] for i in bucket]
+            elif generator is not None:
+                predict_kwargs["generator"] = generator
+            prediction = self.predict([context[i] for i in bucket], **predict_kwargs)
+            if predictions is None:
+                predictions = prediction.new_empty(
+                    (len(context),) + prediction.shape[1:]
+                )
+            predictions[bucket] = prediction
+        assert predictions is not None
+        return predictions
+
     def predict(
         self,
         context: Union[torch.Tensor, List[torch.Tensor]],
@@ -124,6 +195,41 @@ class BaseChronosPipeline(metaclass=PipelineRegistry):
         """
         raise NotImplementedError()
 
+    def apply_inference_mode(self, inference_mode: Literal["int8", "bf16"]):
+        """
+        Prepare the model for faster inference on CPU, in place.
+
+        Parameters
+        ----------
+        inference_mode
+            "int8" applies dynamic int8 quantization to all linear layers:
+            weights are stored as int8 and activations are quantized on the
+            fly, which shrinks the linear weights by 4x and uses int8 matmul
+            kernels. It requires a float32 model on CPU. "bf16" casts the
+            model to bfloat16 if the CPU supports bfloat16 natively, and
+            otherwise keeps the model as it is, with a warning.
+        """
+        if inference_mode == "int8":
+            parameter = next(self.inner_model.parameters())
+            if parameter.device.type != "cpu" or parameter.dtype != torch.float32:
+                raise ValueError(
+                    "int8 inference mode requires a float32 model on cpu, "
+                    f"found {parameter.dtype} on {parameter.device}"
+                )
+            torch.ao.quantization.quantize_dynamic(
+                self.inner_model, {nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        elif inference_mode == "bf16":
+            if cpu_supports_bf16():
+                self.inner_model.to(torch.bfloat16)
+            else:
+                logger.warning(
+                    "This CPU has no native bfloat16 support, keeping the model in "
+                    f"{next(self.inner_model.parameters()).dtype}"
+                )
+        else:
+            raise ValueError(f"Unknown inference mode: {inference_mode}")
+
     @classmethod
     def from_pretrained(
         cls,
@@ -134,14 +240,29 @@ class BaseChronosPipeline(metaclass=PipelineRegistry):
         """
         Load the model, either from a local path or from the HuggingFace Hub.
         Supports the same arguments as ``AutoConfig`` and ``AutoModel``
-        from ``transformers``.
+        from ``transformers``, an optional ``inference_mode`` ("int8" or
+        "bf16") applied after loading, see ``apply_inference_mode``, and
+        ``mmap=True`` to memory-map the weights of a local checkpoint instead
+        of reading them into memory, see ``chronos.mmap_loading``.
+
+        With ``model_cache`` set to a cache directory filled by
+        ``python -m chronos.model_cache prefetch``, the model is resolved
+        from the cache manifest only, without contacting the Hub, see
+        ``chronos.model_cache``.
         """
         from transformers import AutoConfig
 
+        from .model_cache import resolve_pretrained
+
         torch_dtype = kwargs.get("torch_dtype", "auto")
         if torch_dtype != "auto" and isinstance(torch_dtype, str):
             kwargs["torch_dtype"] = cls.dtypes[torch_dtype]
 
+        pretrained_model_name_or_path = resolve_pretrained(
+            pretrained_model_name_or_path, kwargs
+        )
+        inference_mode = kwargs.pop("inference_mode", None)
+        mmap = kwargs.pop("mmap", False)
         config = AutoConfig.from_pretrained(pretrained_model_name_or_path, **kwargs)
         is_valid_config = hasattr(config, "chronos_pipeline_class") or hasattr(
             config, "chronos_config"
@@ -160,5 +281,9 @@ class BaseChronosPipeline(metaclass=PipelineRegistry):
             )
 
         return class_.from_pretrained(  # type: ignore[attr-defined]
-            pretrained_model_name_or_path, *model_args, **kwargs
+            pretrained_model_name_or_path,
+            *model_args,
+            inference_mode=inference_mode,
+            mmap=mmap,
+            **kwargs,
         )
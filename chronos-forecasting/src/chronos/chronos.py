@@ -5,7 +5,7 @@
 
 import logging
 from dataclasses import dataclass
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -16,10 +16,13 @@ from transformers import (
     GenerationConfig,
     PreTrainedModel,
 )
+from transformers.cache_utils import DynamicCache, EncoderDecoderCache
+from transformers.modeling_outputs import BaseModelOutput
 
 import chronos
 from chronos.base import BaseChronosPipeline, ForecastType
-from chronos.utils import left_pad_and_stack_1D
+from chronos.mmap_loading import load_model_mmap, resolve_mmap
+from chronos.utils import masked_mean_pool, sample_quantiles
 
 logger = logging.getLogger(__file__)
 
@@ -171,48 +174,85 @@ class MeanScaleUniformBins(ChronosTokenizer):
                 torch.tensor([1e20], device=self.centers.device),
             )
         )
+        self.low_limit = low_limit
+        self.bin_width = (
+            (high_limit - low_limit) / (len(self.centers) - 1)
+            if len(self.centers) > 1
+            else None
+        )
+
+    def _bucketize(self, values: torch.Tensor, out: torch.Tensor) -> torch.Tensor:
+        """
+        Same as ``torch.bucketize(values, self.boundaries, right=True, out=out)``.
+
+        The bin centers are equally spaced, so the bucket is computed arithmetically
+        and then corrected by at most one position against the actual boundaries,
+        which is much cheaper than a binary search over thousands of boundaries.
+        """
+        if self.bin_width is None:
+            return torch.bucketize(values, self.boundaries, right=True, out=out)
+
+        num_boundaries = len(self.boundaries)
+        estimate = (
+            ((values - self.low_limit) / self.bin_width)
+            .add_(1.5)
+            .floor_()
+            .clamp_(1, num_boundaries - 1)
+        )
+        out.copy_(estimate)
+        out.add_((values >= self.boundaries[out]).long())
+        out.sub_((values < self.boundaries[out - 1]).long())
+        return out
 
     def _input_transform(
-        self, context: torch.Tensor, scale: Optional[torch.Tensor] = None
+        self,
+        context: torch.Tensor,
+        scale: Optional[torch.Tensor] = None,
+        append_eos: bool = False,
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Compute scale, token ids and attention mask in a single pass.
+
+        The outputs, including the EOS column when ``append_eos`` is set,
+        are allocated once and filled in place, instead of materializing
+        intermediate masks and concatenating the EOS token afterwards.
+        """
         context = context.to(dtype=torch.float32)
-        attention_mask = ~torch.isnan(context)
+        batch_size, length = context.shape
+        width = length + int(append_eos)
+
+        token_ids = torch.empty(
+            (batch_size, width), dtype=torch.long, device=context.device
+        )
+        attention_mask = torch.empty(
+            (batch_size, width), dtype=torch.bool, device=context.device
+        )
+        observed_ids = token_ids[:, :length]
+        observed_mask = attention_mask[:, :length]
+
+        # NaN is the only value that does not compare equal to itself
+        torch.eq(context, context, out=observed_mask)
+        values = torch.where(observed_mask, context, 0.0)
 
         if scale is None:
-            scale = torch.nansum(
-                torch.abs(context) * attention_mask, dim=-1
-            ) / torch.nansum(attention_mask, dim=-1)
+            scale = values.abs().sum(dim=-1) / observed_mask.sum(dim=-1)
             scale[~(scale > 0)] = 1.0
 
-        scaled_context = context / scale.unsqueeze(dim=-1)
-        token_ids = (
-            torch.bucketize(
-                input=scaled_context,
-                boundaries=self.boundaries,
-                # buckets are open to the right, see:
-                # https://pytorch.org/docs/2.1/generated/torch.bucketize.html#torch-bucketize
-                right=True,
-            )
-            + self.config.n_special_tokens
+        values.div_(scale.unsqueeze(dim=-1))
+        # buckets are open to the right, see:
+        # https://pytorch.org/docs/2.1/generated/torch.bucketize.html#torch-bucketize
+        self._bucketize(values, out=observed_ids)
+        observed_ids.add_(self.config.n_special_tokens).clamp_(
+            0, self.config.n_tokens - 1
         )
+        observed_ids.masked_fill_(observed_mask.logical_not(), self.config.pad_token_id)
 
-        token_ids.clamp_(0, self.config.n_tokens - 1)
-
-        token_ids[~attention_mask] = self.config.pad_token_id
+        if append_eos:
+            token_ids[:, length:] = self.config.eos_token_id
+            attention_mask[:, length:] = True
 
         return token_ids, attention_mask, scale
 
-    def _append_eos_token(
-        self, token_ids: torch.Tensor, attention_mask: torch.Tensor
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
-        batch_size = token_ids.shape[0]
-        eos_tokens = torch.full((batch_size, 1), fill_value=self.config.eos_token_id)
-        token_ids = torch.concat((token_ids, eos_tokens), dim=1)
-        eos_mask = torch.full((batch_size, 1), fill_value=True)
-        attention_mask = torch.concat((attention_mask, eos_mask), dim=1)
-
-        return token_ids, attention_mask
-
     def context_input_transform(
         self, context: torch.Tensor
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
@@ -221,14 +261,11 @@ class MeanScaleUniformBins(ChronosTokenizer):
         if length > self.config.context_length:
             context = context[..., -self.config.context_length :]
 
-        token_ids, attention_mask, scale = self._input_transform(context=context)
-
-        if self.config.use_eos_token and self.config.model_type == "seq2seq":
-            token_ids, attention_mask = self._append_eos_token(
-                token_ids=token_ids, attention_mask=attention_mask
-            )
-
-        return token_ids, attention_mask, scale
+        return self._input_transform(
+            context=context,
+            append_eos=self.config.use_eos_token
+            and self.config.model_type == "seq2seq",
+        )
 
     def label_input_transform(
         self, label: torch.Tensor, scale: torch.Tensor
@@ -236,12 +273,9 @@ class MeanScaleUniformBins(ChronosTokenizer):
         length = label.shape[-1]
 
         assert length == self.config.prediction_length
-        token_ids, attention_mask, _ = self._input_transform(context=label, scale=scale)
-
-        if self.config.use_eos_token:
-            token_ids, attention_mask = self._append_eos_token(
-                token_ids=token_ids, attention_mask=attention_mask
-            )
+        token_ids, attention_mask, _ = self._input_transform(
+            context=label, scale=scale, append_eos=self.config.use_eos_token
+        )
 
         return token_ids, attention_mask
 
@@ -320,6 +354,8 @@ class ChronosModel(nn.Module):
         temperature: Optional[float] = None,
         top_k: Optional[int] = None,
         top_p: Optional[float] = None,
+        decoding: Literal["generate", "shared_encoder"] = "generate",
+        generator: Optional[Union[torch.Generator, Sequence[torch.Generator]]] = None,
     ) -> torch.Tensor:
         """
         Predict future sample tokens for the given token sequences.
@@ -327,7 +363,9 @@ class ChronosModel(nn.Module):
         Arguments ``prediction_length``, ``num_samples``, ``temperature``,
         ``top_k``, ``top_p`` can be used to customize the model inference,
         and default to the corresponding attributes in ``self.config`` if
-        not provided.
+        not provided. With ``decoding="generate"`` sample paths are drawn
+        through ``transformers``' ``generate``, with ``"shared_encoder"``
+        they are drawn by ``self.sample``, from ``generator`` if given.
 
         Returns
         -------
@@ -346,6 +384,24 @@ class ChronosModel(nn.Module):
         if top_p is None:
             top_p = self.config.top_p
 
+        if decoding == "shared_encoder":
+            return self.sample(
+                input_ids,
+                attention_mask,
+                prediction_length=prediction_length,
+                num_samples=num_samples,
+                temperature=temperature,
+                top_k=top_k,
+                top_p=top_p,
+                generator=generator,
+            )
+        if decoding != "generate":
+            raise ValueError(f"Unknown decoding mode: {decoding}")
+        if generator is not None:
+            raise ValueError(
+                'A generator is only supported with decoding="shared_encoder"'
+            )
+
         assert hasattr(self.model, "generate")
 
         preds = self.model.generate(
@@ -373,6 +429,139 @@ class ChronosModel(nn.Module):
 
         return preds.reshape(input_ids.size(0), num_samples, -1)
 
+    @torch.no_grad()
+    def sample(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        prediction_length: int,
+        num_samples: int,
+        temperature: float,
+        top_k: int,
+        top_p: float,
+        generator: Optional[Union[torch.Generator, Sequence[torch.Generator]]] = None,
+    ) -> torch.Tensor:
+        """
+        Draw sample paths with a lightweight decoding loop.
+
+        The encoder runs once per series and its output is shared by all
+        ``num_samples`` paths of that series, which are then decoded together
+        as one batch of size ``batch_size * num_samples`` using the decoder's
+        key/value cache. Sampling follows ``generate``: the EOS token is
+        suppressed, then temperature, top-k and top-p are applied in this order.
+
+        ``generator`` is either one random generator for the whole batch or
+        one per series. With one per series, the samples of a series only
+        depend on its own generator, not on the other series of the batch.
+
+        Returns
+        -------
+        samples
+            A tensor of integers, shaped (batch_size, num_samples, prediction_length),
+            containing forecasted sample paths.
+        """
+        assert (
+            self.config.model_type == "seq2seq"
+        ), "Shared-encoder decoding is only supported for encoder-decoder models"
+
+        batch_size = input_ids.size(0)
+        if isinstance(generator, Sequence) and len(generator) != batch_size:
+            raise ValueError(
+                f"Expected one generator per series ({batch_size}), found {len(generator)}"
+            )
+        encoder_hidden_states = self.encode(
+            input_ids=input_ids, attention_mask=attention_mask
+        )
+        encoder_outputs = BaseModelOutput(
+            last_hidden_state=encoder_hidden_states.repeat_interleave(
+                num_samples, dim=0
+            )
+        )
+        attention_mask = attention_mask.repeat_interleave(num_samples, dim=0)
+
+        decoder_input_ids = torch.full(
+            (batch_size * num_samples, 1),
+            fill_value=self.model.config.decoder_start_token_id,
+            dtype=torch.long,
+            device=input_ids.device,
+        )
+        past_key_values = EncoderDecoderCache(DynamicCache(), DynamicCache())
+        samples = torch.empty(
+            (batch_size * num_samples, prediction_length),
+            dtype=torch.long,
+            device=input_ids.device,
+        )
+
+        for step in range(prediction_length):
+            outputs = self.model(
+                encoder_outputs=encoder_outputs,
+                attention_mask=attention_mask,
+                decoder_input_ids=decoder_input_ids,
+                past_key_values=past_key_values,
+                use_cache=True,
+            )
+            past_key_values = outputs.past_key_values
+            next_tokens = sample_next_token(
+                outputs.logits[:, -1, :],
+                temperature=temperature,
+                top_k=top_k,
+                top_p=top_p,
+                suppress_token_id=self.config.eos_token_id,
+                generator=generator,
+            )
+            samples[:, step] = next_tokens
+            decoder_input_ids = next_tokens.unsqueeze(-1)
+
+        return samples.reshape(batch_size, num_samples, prediction_length)
+
+
+def sample_next_token(
+    logits: torch.Tensor,
+    temperature: float = 1.0,
+    top_k: Optional[int] = None,
+    top_p: Optional[float] = None,
+    suppress_token_id: Optional[int] = None,
+    generator: Optional[Union[torch.Generator, Sequence[torch.Generator]]] = None,
+) -> torch.Tensor:
+    """
+    Sample one token per row of ``logits``, shaped (batch_size, vocab_size).
+
+    ``suppress_token_id`` is never sampled. Temperature scaling, top-k and
+    top-p (nucleus) filtering are applied in the same order as ``generate``.
+    ``generator`` is one random generator, or a sequence of them that split
+    the rows into equal consecutive groups, each drawn from its own generator.
+    """
+    logits = logits.to(torch.float32, copy=True)
+    if suppress_token_id is not None:
+        logits[:, suppress_token_id] = -float("inf")
+    if temperature != 1.0:
+        logits = logits / temperature
+
+    vocab_size = logits.shape[-1]
+    if top_k is not None and 0 < top_k < vocab_size:
+        kth_largest = torch.topk(logits, top_k, dim=-1).values[:, -1:]
+        logits = logits.masked_fill(logits < kth_largest, -float("inf"))
+
+    if top_p is not None and top_p < 1.0:
+        sorted_logits, sorted_indices = torch.sort(logits, descending=False)
+        cumulative_probs = sorted_logits.softmax(dim=-1).cumsum(dim=-1)
+        sorted_to_remove = cumulative_probs <= (1 - top_p)
+        # always keep the most likely token
+        sorted_to_remove[:, -1] = False
+        to_remove = sorted_to_remove.scatter(1, sorted_indices, sorted_to_remove)
+        logits = logits.masked_fill(to_remove, -float("inf"))
+
+    probs = logits.softmax(dim=-1)
+    if isinstance(generator, Sequence):
+        groups = probs.split(probs.shape[0] // len(generator))
+        return torch.cat(
+            [
+                torch.multinomial(group, num_samples=1, generator=group_generator)
+                for group, group_generator in zip(groups, generator)
+            ]
+        ).squeeze(-1)
+    return torch.multinomial(probs, num_samples=1, generator=generator).squeeze(-1)
+
 
 class ChronosPipeline(BaseChronosPipeline):
     """
@@ -399,17 +588,9 @@ class ChronosPipeline(BaseChronosPipeline):
         self.tokenizer = tokenizer
         self.model = model
 
-    def _prepare_and_validate_context(
-        self, context: Union[torch.Tensor, List[torch.Tensor]]
-    ):
-        if isinstance(context, list):
-            context = left_pad_and_stack_1D(context)
-        assert isinstance(context, torch.Tensor)
-        if context.ndim == 1:
-            context = context.unsqueeze(0)
-        assert context.ndim == 2
-
-        return context
+    @property
+    def context_length(self) -> int:
+        return self.model.config.context_length
 
     @torch.no_grad()
     def embed(
@@ -447,6 +628,52 @@ class ChronosPipeline(BaseChronosPipeline):
         ).cpu()
         return embeddings, tokenizer_state
 
+    @torch.no_grad()
+    def embed_pooled(
+        self,
+        context: Union[torch.Tensor, List[torch.Tensor]],
+        pooling: Literal["mean", "last"] = "mean",
+        dtype: torch.dtype = torch.float16,
+    ) -> torch.Tensor:
+        """
+        Get one fixed-size encoder embedding per time series.
+
+        Parameters
+        ----------
+        context
+            Input series, as in ``embed``.
+        pooling
+            How the per-token encoder embeddings are reduced. With "mean"
+            (default), they are averaged over the observed time steps. With
+            "last", the embedding of the last token is used, i.e., of the EOS
+            token if the model uses one.
+        dtype
+            Data type of the returned embeddings, float16 by default.
+
+        Returns
+        -------
+        embeddings
+            Tensor of shape (batch_size, d_model) on the cpu.
+        """
+        context_tensor = self._prepare_and_validate_context(context=context)
+        token_ids, attention_mask, _ = self.tokenizer.context_input_transform(
+            context_tensor
+        )
+        embeddings = self.model.encode(
+            input_ids=token_ids.to(self.model.device),
+            attention_mask=attention_mask.to(self.model.device),
+        )
+
+        if pooling == "mean":
+            if self.model.config.use_eos_token:
+                attention_mask[:, -1] = False
+            pooled = masked_mean_pool(embeddings, attention_mask)
+        elif pooling == "last":
+            pooled = embeddings[:, -1]
+        else:
+            raise ValueError(f"Unknown pooling: {pooling}")
+        return pooled.to(device="cpu", dtype=dtype)
+
     def predict(  # type: ignore[override]
         self,
         context: Union[torch.Tensor, List[torch.Tensor]],
@@ -456,6 +683,9 @@ class ChronosPipeline(BaseChronosPipeline):
         top_k: Optional[int] = None,
         top_p: Optional[float] = None,
         limit_prediction_length: bool = False,
+        long_horizon: Literal["chunked", "incremental"] = "chunked",
+        decoding: Literal["generate", "shared_encoder"] = "generate",
+        generator: Optional[Union[torch.Generator, Sequence[torch.Generator]]] = None,
     ) -> torch.Tensor:
         """
         Get forecasts for the given time series.
@@ -482,6 +712,24 @@ class ChronosPipeline(BaseChronosPipeline):
             built-in prediction length from the model. False by
             default. When true, fail loudly if longer predictions
             are requested, otherwise longer predictions are allowed.
+        long_horizon
+            How predictions longer than the built-in prediction length
+            are rolled out. With "chunked" (default), the context is
+            extended with the median forecast, re-tokenized and encoded
+            again for every chunk. With "incremental", each sample path
+            is decoded in a single pass over the whole horizon: the
+            encoder runs once and the decoder reuses its key/value cache,
+            so the cost grows linearly with ``prediction_length``.
+        decoding
+            How sample paths are drawn. "generate" (default) uses
+            ``transformers``' ``generate`` with ``num_return_sequences``.
+            "shared_encoder" encodes each series once and decodes all of
+            its sample paths against the shared encoder output in a
+            lightweight sampling loop (encoder-decoder models only).
+        generator
+            Random generator to draw the samples from, or one generator per
+            series, so that the forecast of a series does not depend on the
+            other series of the batch. Requires ``decoding="shared_encoder"``.
 
         Returns
         -------
@@ -489,6 +737,22 @@ class ChronosPipeline(BaseChronosPipeline):
             Tensor of sample forecasts, of shape
             (batch_size, num_samples, prediction_length).
         """
+        buckets = self._length_buckets(context)
+        if buckets is not None:
+            return self._predict_length_buckets(
+                context,
+                buckets,
+                prediction_length=prediction_length,
+                num_samples=num_samples,
+                temperature=temperature,
+                top_k=top_k,
+                top_p=top_p,
+                limit_prediction_length=limit_prediction_length,
+                long_horizon=long_horizon,
+                decoding=decoding,
+                generator=generator,
+            )
+
         context_tensor = self._prepare_and_validate_context(context=context)
 
         if prediction_length is None:
@@ -504,8 +768,18 @@ class ChronosPipeline(BaseChronosPipeline):
                 raise ValueError(msg)
             logger.warning(msg)
 
+        if long_horizon not in ("chunked", "incremental"):
+            raise ValueError(f"Unknown long_horizon mode: {long_horizon}")
+
         predictions = []
         remaining = prediction_length
+        # In incremental mode the whole horizon is a single chunk, so the encoder
+        # output and the decoder cache are shared by all steps of a sample path.
+        max_chunk_length = (
+            prediction_length
+            if long_horizon == "incremental"
+            else self.model.config.prediction_length
+        )
 
         while remaining > 0:
             token_ids, attention_mask, scale = self.tokenizer.context_input_transform(
@@ -514,11 +788,13 @@ class ChronosPipeline(BaseChronosPipeline):
             samples = self.model(
                 token_ids.to(self.model.device),
                 attention_mask.to(self.model.device),
-                min(remaining, self.model.config.prediction_length),
+                min(remaining, max_chunk_length),
                 num_samples,
                 temperature,
                 top_k,
                 top_p,
+                decoding,
+                generator,
             )
             prediction = self.tokenizer.output_transform(
                 samples.to(scale.device), scale
@@ -541,22 +817,26 @@ class ChronosPipeline(BaseChronosPipeline):
         context: Union[torch.Tensor, List[torch.Tensor]],
         prediction_length: Optional[int] = None,
         quantile_levels: List[float] = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9],
+        quantile_method: Literal["sort", "select", "histogram"] = "sort",
         **predict_kwargs,
     ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
         Refer to the base method (``BaseChronosPipeline.predict_quantiles``).
+
+        Additional parameters
+        ---------------------
+        quantile_method
+            How quantiles are extracted from the sample paths, see
+            ``chronos.utils.sample_quantiles``. "sort" (default) and "select"
+            are exact; "histogram" is an approximate sketch meant for very
+            large ``num_samples``.
         """
-        prediction_samples = (
-            self.predict(context, prediction_length=prediction_length, **predict_kwargs)
-            .detach()
-            .swapaxes(1, 2)
+        prediction_samples = self.predict(
+            context, prediction_length=prediction_length, **predict_kwargs
+        ).detach()
+        quantiles, mean = sample_quantiles(
+            prediction_samples, quantile_levels, method=quantile_method
         )
-        mean = prediction_samples.mean(dim=-1)
-        quantiles = torch.quantile(
-            prediction_samples,
-            q=torch.tensor(quantile_levels, dtype=prediction_samples.dtype),
-            dim=-1,
-        ).permute(1, 2, 0)
 
         return quantiles, mean
 
@@ -565,9 +845,22 @@ class ChronosPipeline(BaseChronosPipeline):
         """
         Load the model, either from a local path or from the HuggingFace Hub.
         Supports the same arguments as ``AutoConfig`` and ``AutoModel``
-        from ``transformers``.
+        from ``transformers``, an optional ``inference_mode`` (see
+        ``BaseChronosPipeline.apply_inference_mode``) and ``mmap`` to
+        memory-map the weights of a local checkpoint (see
+        ``chronos.mmap_loading.load_model_mmap``). With ``model_cache``, the
+        model is resolved from that offline cache directory (see
+        ``chronos.model_cache``).
         """
-
+        # imported here so that ``python -m chronos.model_cache`` runs cleanly
+        from chronos.model_cache import resolve_pretrained
+
+        if not args:
+            # the path given by keyword, e.g. from ``BaseChronosPipeline``
+            args = (kwargs.pop("pretrained_model_name_or_path"),)
+        args = (resolve_pretrained(args[0], kwargs),) + args[1:]
+        inference_mode = kwargs.pop("inference_mode", None)
+        mmap = resolve_mmap(kwargs.pop("mmap", False))
         config = AutoConfig.from_pretrained(*args, **kwargs)
 
         assert hasattr(config, "chronos_config"), "Not a Chronos config file"
@@ -575,12 +868,25 @@ class ChronosPipeline(BaseChronosPipeline):
         chronos_config = ChronosConfig(**config.chronos_config)
 
         if chronos_config.model_type == "seq2seq":
-            inner_model = AutoModelForSeq2SeqLM.from_pretrained(*args, **kwargs)
+            model_class = AutoModelForSeq2SeqLM
         else:
             assert chronos_config.model_type == "causal"
-            inner_model = AutoModelForCausalLM.from_pretrained(*args, **kwargs)
+            model_class = AutoModelForCausalLM
+
+        if mmap:
+            inner_model = load_model_mmap(
+                lambda: model_class.from_config(config),
+                args[0],
+                torch_dtype=kwargs.get("torch_dtype"),
+                device=kwargs.get("device_map"),
+            )
+        else:
+            inner_model = model_class.from_pretrained(*args, **kwargs)
 
-        return cls(
+        pipeline = cls(
             tokenizer=chronos_config.create_tokenizer(),
             model=ChronosModel(config=chronos_config, model=inner_model),
         )
+        if inference_mode is not None:
+            pipeline.apply_inference_mode(inference_mode)
+        return pipeline
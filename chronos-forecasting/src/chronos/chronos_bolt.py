@@ -9,7 +9,7 @@ import copy
 import logging
 import warnings
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from typing import Callable, List, Literal, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -24,6 +24,8 @@ from transformers.models.t5.modeling_t5 import (
 from transformers.utils import ModelOutput
 
 from .base import BaseChronosPipeline, ForecastType
+from .mmap_loading import load_model_mmap, resolve_mmap
+from .utils import length_buckets, masked_mean_pool
 
 logger = logging.getLogger(__file__)
 
@@ -250,7 +252,6 @@ class ChronosBoltModelForForecasting(T5PreTrainedModel):
             else torch.isnan(context).logical_not().to(context.dtype)
         )
 
-        batch_size, _ = context.shape
         if context.shape[-1] > self.chronos_config.context_length:
             context = context[..., -self.chronos_config.context_length :]
             mask = mask[..., -self.chronos_config.context_length :]
@@ -258,7 +259,26 @@ class ChronosBoltModelForForecasting(T5PreTrainedModel):
         # scaling
         context, loc_scale = self.instance_norm(context)
 
-        # the scaling op above is done in 32-bit precision,
+        input_embeds, attention_mask = self.embed_patches(context, mask)
+        hidden_states, input_embeds, attention_mask = self.encode_embeds(
+            input_embeds, attention_mask
+        )
+        return hidden_states, loc_scale, input_embeds, attention_mask
+
+    def embed_patches(
+        self, context: torch.Tensor, mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Patch and embed an instance-normalized context.
+
+        Returns
+        -------
+        input_embeds, attention_mask
+            Patch embeddings of shape (batch_size, num_patches, d_model), and
+            the attention mask of the patches, 1 where a patch holds at least
+            one observed value, of shape (batch_size, num_patches).
+        """
+        # the scaling op is done in 32-bit precision,
         # then the context is moved to model's dtype
         context = context.to(self.dtype)
         mask = mask.to(self.dtype)
@@ -275,8 +295,22 @@ class ChronosBoltModelForForecasting(T5PreTrainedModel):
             patched_mask.sum(dim=-1) > 0
         )  # (batch_size, patched_seq_length)
 
-        input_embeds = self.input_patch_embedding(patched_context)
+        return self.input_patch_embedding(patched_context), attention_mask
+
+    def encode_embeds(
+        self, input_embeds: torch.Tensor, attention_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Run the encoder over patch embeddings, after appending the [REG]
+        token if the model uses one.
 
+        Returns
+        -------
+        hidden_states, input_embeds, attention_mask
+            The encoder output, and the encoder inputs and attention mask
+            including the [REG] token.
+        """
+        batch_size = input_embeds.shape[0]
         if self.chronos_config.use_reg_token:
             # Append [REG]
             reg_input_ids = torch.full(
@@ -299,7 +333,7 @@ class ChronosBoltModelForForecasting(T5PreTrainedModel):
             inputs_embeds=input_embeds,
         )
 
-        return encoder_outputs[0], loc_scale, input_embeds, attention_mask
+        return encoder_outputs[0], input_embeds, attention_mask
 
     def forward(
         self,
@@ -427,15 +461,27 @@ class ChronosBoltModelForForecasting(T5PreTrainedModel):
 class ChronosBoltPipeline(BaseChronosPipeline):
     forecast_type: ForecastType = ForecastType.QUANTILES
     default_context_length: int = 2048
+    # With long_horizon="incremental", the instance-norm statistics are reused
+    # across chunks until those of the current window differ from them by more
+    # than this fraction of the scale.
+    renormalize_tolerance: float = 0.05
+    # Number of time steps the encoder sees with long_horizon="incremental",
+    # capped at the model context length. None keeps the width of the context.
+    incremental_window: Optional[int] = None
 
     def __init__(self, model: ChronosBoltModelForForecasting):
         super().__init__(inner_model=model)  # type: ignore
         self.model = model
+        self._compiled_forward: Optional[Callable[[torch.Tensor], torch.Tensor]] = None
 
     @property
     def quantiles(self) -> List[float]:
         return self.model.config.chronos_config["quantiles"]
 
+    @property
+    def context_length(self) -> int:
+        return self.model.config.chronos_config["context_length"]
+
     @torch.no_grad()
     def embed(
         self, context: Union[torch.Tensor, List[torch.Tensor]]
@@ -461,11 +507,6 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             and the extra 1 is for the [REG] token (if used by the model).
         """
         context_tensor = self._prepare_and_validate_context(context=context)
-        model_context_length = self.model.config.chronos_config["context_length"]
-
-        if context_tensor.shape[-1] > model_context_length:
-            context_tensor = context_tensor[..., -model_context_length:]
-
         context_tensor = context_tensor.to(
             device=self.model.device,
             dtype=torch.float32,
@@ -476,11 +517,62 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             loc_scale[1].squeeze(-1).cpu(),
         )
 
+    @torch.no_grad()
+    def embed_pooled(
+        self,
+        context: Union[torch.Tensor, List[torch.Tensor]],
+        pooling: Literal["mean", "last", "reg"] = "mean",
+        dtype: torch.dtype = torch.float16,
+    ) -> torch.Tensor:
+        """
+        Get one fixed-size encoder embedding per time series.
+
+        Parameters
+        ----------
+        context
+            Input series, as in ``embed``.
+        pooling
+            How the per-patch encoder embeddings are reduced. With "mean"
+            (default), they are averaged over the patches holding at least one
+            observed value. With "last", the embedding of the last patch is used.
+            With "reg", the embedding of the [REG] token is used, which requires
+            a model trained with it.
+        dtype
+            Data type of the returned embeddings, float16 by default.
+
+        Returns
+        -------
+        embeddings
+            Tensor of shape (batch_size, d_model) on the cpu.
+        """
+        context_tensor = self._prepare_and_validate_context(context=context)
+        context_tensor = context_tensor.to(
+            device=self.model.device, dtype=torch.float32
+        )
+        embeddings, _, _, attention_mask = self.model.encode(context=context_tensor)
+        num_reg = int(self.model.chronos_config.use_reg_token)
+        num_patches = embeddings.shape[1] - num_reg
+
+        if pooling == "mean":
+            pooled = masked_mean_pool(
+                embeddings[:, :num_patches], attention_mask[:, :num_patches] > 0
+            )
+        elif pooling == "last":
+            pooled = embeddings[:, num_patches - 1]
+        elif pooling == "reg":
+            if not num_reg:
+                raise ValueError("This model was not trained with a [REG] token")
+            pooled = embeddings[:, -1]
+        else:
+            raise ValueError(f"Unknown pooling: {pooling}")
+        return pooled.to(device="cpu", dtype=dtype)
+
     def predict(  # type: ignore[override]
         self,
         context: Union[torch.Tensor, List[torch.Tensor]],
         prediction_length: Optional[int] = None,
         limit_prediction_length: bool = False,
+        long_horizon: Literal["chunked", "incremental"] = "chunked",
     ) -> torch.Tensor:
         """
         Get forecasts for the given time series.
@@ -494,6 +586,20 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             built-in prediction length from the model. False by
             default. When true, fail loudly if longer predictions
             are requested, otherwise longer predictions are allowed.
+        long_horizon
+            How predictions longer than the built-in prediction length
+            are rolled out. With "chunked" (default), the context is
+            extended with the median forecast, then normalized, patched
+            and embedded again for every chunk. With "incremental", the
+            instance-norm statistics are reused across chunks while they
+            stay within ``renormalize_tolerance`` of those of the current
+            window, so only the patches of each new chunk are embedded and
+            appended to the previous patch embeddings. The window slides by
+            whole patches instead of growing, and keeps the width of the
+            context (or ``incremental_window``), so the cost grows linearly
+            with ``prediction_length``. Forecasts are close to, but not the
+            same as, the "chunked" ones. The compiled forward pass (see
+            ``compile``) is not used in this mode.
 
         Returns
         -------
@@ -509,9 +615,10 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             When limit_prediction_length is True and the prediction_length is
             greater than model's trainig prediction_length.
         """
+        # Truncated to the model context length here, so batches with very long
+        # context do not take up large amounts of GPU memory unnecessarily.
         context_tensor = self._prepare_and_validate_context(context=context)
 
-        model_context_length = self.model.config.chronos_config["context_length"]
         model_prediction_length = self.model.config.chronos_config["prediction_length"]
         if prediction_length is None:
             prediction_length = model_prediction_length
@@ -526,14 +633,126 @@ class ChronosBoltPipeline(BaseChronosPipeline):
                 raise ValueError(msg)
             warnings.warn(msg)
 
+        if long_horizon not in ("chunked", "incremental"):
+            raise ValueError(f"Unknown long_horizon mode: {long_horizon}")
+
+        # Series of very different lengths are forecast in separate buckets,
+        # each trimmed to its own length, so the encoder does not attend over
+        # patches that are padding for most of the batch.
+        predictions = None
+        for indices, length in self._plan_length_buckets(context_tensor):
+            bucket_context = context_tensor[..., -length:]
+            if indices is None:
+                return self._rollout(bucket_context, prediction_length, long_horizon)
+            prediction = self._rollout(
+                bucket_context[indices], prediction_length, long_horizon
+            )
+            if predictions is None:
+                predictions = prediction.new_empty(
+                    (len(context_tensor),) + prediction.shape[1:]
+                )
+            predictions[indices] = prediction
+        assert predictions is not None
+        return predictions
+
+    def _plan_length_buckets(
+        self, context: torch.Tensor
+    ) -> List[Tuple[Optional[torch.Tensor], int]]:
+        """
+        Split a left-padded context batch into buckets of similar observed length.
+
+        The observed length of a series runs from its first non-NaN value to the
+        end of the context, rounded up to a multiple of the input patch size so
+        that trimming the context does not change how it is patched. Within a
+        bucket, observed lengths differ by at most ``length_bucket_ratio``.
+
+        Returns
+        -------
+        plan
+            One ``(indices, length)`` pair per bucket: the batch rows of the
+            bucket (None for the whole batch) and the number of trailing time
+            steps to keep for it.
+        """
+        width = context.shape[-1]
+        patch_size = self.model.chronos_config.input_patch_size
+        observed = torch.isnan(context).logical_not()
+        # index of the first observed value, ``width`` for fully missing rows
+        first_observed = torch.where(
+            observed.any(dim=-1), observed.to(torch.int8).argmax(dim=-1), width
+        )
+        lengths = (width - first_observed + patch_size - 1) // patch_size * patch_size
+        lengths = lengths.clamp(min=patch_size).clamp(max=width).tolist()
+
+        if self.length_bucket_ratio is None:
+            return [(None, width)]
+        buckets = length_buckets(lengths, max_ratio=self.length_bucket_ratio)
+        if len(buckets) == 1:
+            return [(None, max(lengths))]
+        return [
+            (torch.tensor(bucket), max(lengths[i] for i in bucket))
+            for bucket in buckets
+        ]
+
+    def compile(self, **compile_kwargs):
+        """
+        Compile the forward pass of the model with ``torch.compile``, for
+        lower per-batch latency in ``predict``.
+
+        The forward pass is compiled with static shapes: each new context
+        width (one per length bucket, see ``_plan_length_buckets``) and batch
+        size triggers a compilation, and batches are padded with empty series
+        to the next power of two so that few batch sizes occur. Compiling
+        takes seconds to minutes per shape, so this pays off for long-running
+        services that forecast many batches of similar shapes.
+
+        Parameters
+        ----------
+        compile_kwargs
+            Extra keyword arguments for ``torch.compile``, e.g., ``mode`` or
+            ``backend``.
+        """
+        model = self.model.eval()
+
+        def quantile_forward(context: torch.Tensor) -> torch.Tensor:
+            return model(context=context).quantile_preds
+
+        self._compiled_forward = torch.compile(
+            quantile_forward, dynamic=False, **compile_kwargs
+        )
+
+    def _forward(self, context: torch.Tensor) -> torch.Tensor:
+        if self._compiled_forward is None:
+            return self.model(context=context).quantile_preds
+
+        batch_size = context.shape[0]
+        padded_size = 1 << (batch_size - 1).bit_length()
+        if padded_size > batch_size:
+            padding = context.new_full(
+                (padded_size - batch_size, context.shape[-1]), torch.nan
+            )
+            context = torch.cat([context, padding])
+        return self._compiled_forward(context)[:batch_size]
+
+    def _rollout(
+        self,
+        context_tensor: torch.Tensor,
+        prediction_length: int,
+        long_horizon: str = "chunked",
+    ) -> torch.Tensor:
+        chronos_config = self.model.chronos_config
+        model_prediction_length = chronos_config.prediction_length
+        if (
+            long_horizon == "incremental"
+            and prediction_length > model_prediction_length
+            # new chunks must be made of whole, non-overlapping patches
+            and chronos_config.input_patch_size == chronos_config.input_patch_stride
+            and model_prediction_length % chronos_config.input_patch_size == 0
+        ):
+            return self._rollout_incremental(context_tensor, prediction_length)
+
         predictions = []
         remaining = prediction_length
 
-        # We truncate the context here because otherwise batches with very long
-        # context could take up large amounts of GPU memory unnecessarily.
-        if context_tensor.shape[-1] > model_context_length:
-            context_tensor = context_tensor[..., -model_context_length:]
-
         # TODO: We unroll the forecast of Chronos Bolt greedily with the full forecast
         # horizon that the model was trained with (i.e., 64). This results in variance collapsing
         # every 64 steps.
@@ -543,9 +762,7 @@ class ChronosBoltPipeline(BaseChronosPipeline):
         )
         while remaining > 0:
             with torch.no_grad():
-                prediction = self.model(
-                    context=context_tensor,
-                ).quantile_preds.to(context_tensor)
+                prediction = self._forward(context_tensor).to(context_tensor)
 
             predictions.append(prediction)
             remaining -= prediction.shape[-1]
@@ -562,6 +779,93 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             dtype=torch.float32, device="cpu"
         )
 
+    @torch.no_grad()
+    def _rollout_incremental(
+        self, context_tensor: torch.Tensor, prediction_length: int
+    ) -> torch.Tensor:
+        model = self.model
+        patch_size = model.chronos_config.input_patch_size
+        # the window slides by whole patches and keeps the width of the
+        # original context, so every chunk costs the same
+        window_length = min(
+            self.incremental_window or context_tensor.shape[-1],
+            model.chronos_config.context_length,
+        )
+        max_patches = -(-window_length // patch_size)
+        window_length = max_patches * patch_size
+        central_idx = torch.abs(torch.tensor(self.quantiles) - 0.5).argmin()
+
+        window = context_tensor.to(device=model.device, dtype=torch.float32)
+        window = window[..., -window_length:]
+        normalized, loc_scale = model.instance_norm(window)
+        input_embeds, attention_mask = model.embed_patches(
+            normalized, torch.isnan(window).logical_not()
+        )
+
+        predictions = []
+        remaining = prediction_length
+        while True:
+            hidden_states, _, encoder_mask = model.encode_embeds(
+                input_embeds, attention_mask
+            )
+            sequence_output = model.decode(input_embeds, encoder_mask, hidden_states)
+            prediction = model.output_patch_embedding(sequence_output).to(torch.float32)
+            batch_size = prediction.shape[0]
+            prediction = model.instance_norm.inverse(
+                prediction.view(batch_size, -1), loc_scale
+            ).view(batch_size, model.num_quantiles, -1)
+            predictions.append(prediction)
+            remaining -= prediction.shape[-1]
+
+            if remaining <= 0:
+                break
+
+            central_prediction = prediction[:, central_idx]
+            window = torch.cat([window, central_prediction], dim=-1)[
+                ..., -window_length:
+            ]
+            _, (loc, scale) = model.instance_norm(window)
+            if self._statistics_drifted(loc_scale, (loc, scale)):
+                # re-normalize and embed the whole window, as "chunked" does
+                normalized, loc_scale = model.instance_norm(window)
+                input_embeds, attention_mask = model.embed_patches(
+                    normalized, torch.isnan(window).logical_not()
+                )
+                continue
+
+            # only the patches of the new chunk are embedded, with the
+            # statistics the previous patches were normalized with
+            normalized, _ = model.instance_norm(central_prediction, loc_scale)
+            new_embeds, new_mask = model.embed_patches(
+                normalized, torch.ones_like(normalized)
+            )
+            input_embeds = torch.cat([input_embeds, new_embeds], dim=1)[
+                :, -max_patches:
+            ]
+            attention_mask = torch.cat([attention_mask, new_mask], dim=1)[
+                :, -max_patches:
+            ]
+
+        return torch.cat(predictions, dim=-1)[..., :prediction_length].to(
+            dtype=torch.float32, device="cpu"
+        )
+
+    def _statistics_drifted(
+        self,
+        loc_scale: Tuple[torch.Tensor, torch.Tensor],
+        new_loc_scale: Tuple[torch.Tensor, torch.Tensor],
+    ) -> bool:
+        # the reused statistics are valid while the instance-norm statistics of
+        # the current window stay within ``renormalize_tolerance`` of them,
+        # relative to the reused scale
+        loc, scale = loc_scale
+        new_loc, new_scale = new_loc_scale
+        tolerance = self.renormalize_tolerance
+        return bool(
+            ((new_loc - loc).abs() > tolerance * scale).any()
+            or ((new_scale - scale).abs() > tolerance * scale).any()
+        )
+
     def predict_quantiles(
         self,
         context: Union[torch.Tensor, List[torch.Tensor]],
@@ -621,9 +925,24 @@ class ChronosBoltPipeline(BaseChronosPipeline):
         """
         Load the model, either from a local path or from the HuggingFace Hub.
         Supports the same arguments as ``AutoConfig`` and ``AutoModel``
-        from ``transformers``.
+        from ``transformers``, an optional ``inference_mode`` (see
+        ``BaseChronosPipeline.apply_inference_mode``), ``torch_compile``
+        to compile the model forward pass (see ``compile``) and ``mmap`` to
+        memory-map the weights of a local checkpoint (see
+        ``chronos.mmap_loading.load_model_mmap``). With ``model_cache``, the
+        model is resolved from that offline cache directory (see
+        ``chronos.model_cache``).
         """
-
+        # imported here so that ``python -m chronos.model_cache`` runs cleanly
+        from .model_cache import resolve_pretrained
+
+        if not args:
+            # the path given by keyword, e.g. from ``BaseChronosPipeline``
+            args = (kwargs.pop("pretrained_model_name_or_path"),)
+        args = (resolve_pretrained(args[0], kwargs),) + args[1:]
+        inference_mode = kwargs.pop("inference_mode", None)
+        torch_compile = kwargs.pop("torch_compile", False)
+        mmap = resolve_mmap(kwargs.pop("mmap", False))
         config = AutoConfig.from_pretrained(*args, **kwargs)
         assert hasattr(config, "chronos_config"), "Not a Chronos config file"
 
@@ -636,5 +955,18 @@ class ChronosBoltPipeline(BaseChronosPipeline):
             )
             class_ = ChronosBoltModelForForecasting
 
-        model = class_.from_pretrained(*args, **kwargs)
-        return cls(model=model)
+        if mmap:
+            model = load_model_mmap(
+                lambda: class_(config),
+                args[0],
+                torch_dtype=kwargs.get("torch_dtype"),
+                device=kwargs.get("device_map"),
+            )
+        else:
+            model = class_.from_pretrained(*args, **kwargs)
+        pipeline = cls(model=model)
+        if inference_mode is not None:
+            pipeline.apply_inference_mode(inference_mode)
+        if torch_compile:
+            pipeline.compile()
+        return pipeline
@@ -0,0 +1,414 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import bisect
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+
+from .base import BaseChronosPipeline
+from .chronos import ChronosPipeline
+from .chronos_bolt import ChronosBoltPipeline
+from .utils import masked_mean_pool
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    # exactly one of ``embedding`` and ``offset`` is set, depending on
+    # whether the entry is held in memory or was spilled to disk
+    embedding: Optional[torch.Tensor]
+    offset: Optional[int]
+    shape: Tuple[int, ...]
+    state: Tuple[torch.Tensor, ...]
+
+    @property
+    def nbytes(self) -> int:
+        return math.prod(self.shape) * 4
+
+
+class EmbeddingStore:
+    """
+    Cache of encoder embeddings for a Chronos or Chronos-Bolt pipeline.
+
+    Embeddings are cached per series together with its tokenizer state (the
+    scale for ``ChronosPipeline``, ``loc_scale`` for ``ChronosBoltPipeline``),
+    under a fingerprint of the part of the series the model looks at; only
+    the series missing from the cache are embedded, in one batch. Series can
+    be given a key, e.g., a company and account number: when the series behind
+    a key changes, for instance because ledger entries were appended, only
+    that entry is recomputed and the stale one is dropped. Series without a
+    key are cached by fingerprint only and age out of the cache.
+
+    Embeddings are kept in memory up to ``max_memory_mb``. Beyond that, the
+    least recently used ones are dropped or, if ``spill_path`` is given,
+    written to that file and read back through a memory map when needed. The
+    space of spilled entries that are dropped or invalidated is reused for
+    later spills, and the file shrinks when its tail is freed, so it stays
+    about the size of the spilled entries that are still cached.
+
+    Parameters
+    ----------
+    pipeline
+        The pipeline whose ``embed`` method is cached.
+    max_memory_mb
+        Memory budget for in-memory embeddings, in MiB.
+    spill_path
+        Optional file to spill embeddings to when the memory budget is
+        exceeded. The file is truncated when the store is created.
+    """
+
+    def __init__(
+        self,
+        pipeline: BaseChronosPipeline,
+        max_memory_mb: float = 256,
+        spill_path: Optional[Union[str, os.PathLike]] = None,
+    ):
+        if not isinstance(pipeline, (ChronosPipeline, ChronosBoltPipeline)):
+            raise ValueError(f"Unsupported pipeline: {type(pipeline).__name__}")
+        self.pipeline = pipeline
+        self.max_memory_bytes = int(max_memory_mb * 2**20)
+        self.spill_path = spill_path
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._keys: Dict[str, str] = {}
+        self._key_refs: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self._spill_bytes = 0
+        # free extents of the spill file, as sorted (offset, nbytes) pairs,
+        # and the end of the part of the file in use
+        self._free: List[Tuple[int, int]] = []
+        self._spill_end = 0
+        self._lock = threading.Lock()
+        if spill_path is not None:
+            open(spill_path, "wb").close()
+
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.spills = 0
+        self.evictions = 0
+
+    def fingerprint(self, series: torch.Tensor) -> str:
+        """
+        Fingerprint of a 1D series, covering only the values the model looks at.
+        """
+        series = torch.as_tensor(series).to(device="cpu", dtype=torch.float32)
+        context_length = self.pipeline.context_length
+        if context_length is not None:
+            series = series[-context_length:]
+        return hashlib.sha256(series.contiguous().numpy().tobytes()).hexdigest()
+
+    def _num_positions(self, length: int) -> int:
+        # number of trailing encoder positions that belong to a series of the
+        # given length when it is left-padded into a batch
+        context_length = self.pipeline.context_length
+        if context_length is not None:
+            length = min(length, context_length)
+        if isinstance(self.pipeline, ChronosPipeline):
+            return length + int(self.pipeline.tokenizer.config.use_eos_token)
+        chronos_config = self.pipeline.model.chronos_config
+        num_patches = math.ceil(length / chronos_config.input_patch_size)
+        return num_patches + int(chronos_config.use_reg_token)
+
+    def embed(
+        self,
+        context: Sequence[torch.Tensor],
+        keys: Optional[Sequence[str]] = None,
+    ) -> Tuple[torch.Tensor, Union[torch.Tensor, Tuple[torch.Tensor, ...]]]:
+        """
+        Get encoder embeddings for the given series, computing only those
+        that are not cached yet.
+
+        Parameters
+        ----------
+        context
+            List of 1D series.
+        keys
+            Optional stable identifiers of the series, one per series. A cached
+            entry whose key now refers to different values is invalidated.
+
+        Returns
+        -------
+        embeddings, tokenizer_state
+            As returned by the ``embed`` method of the pipeline. Embeddings are
+            left-padded with zeros to the longest series, instead of holding
+            encoder outputs for padding positions.
+        """
+        results = self._lookup(context, keys)
+        max_positions = max(result[0].shape[0] for result in results)
+        d_model = results[0][0].shape[-1]
+        stacked = torch.zeros((len(results), max_positions, d_model))
+        for i, (embedding, _) in enumerate(results):
+            stacked[i, max_positions - embedding.shape[0] :] = embedding
+        states = tuple(
+            torch.stack([result[1][k] for result in results])
+            for k in range(len(results[0][1]))
+        )
+        if isinstance(self.pipeline, ChronosPipeline):
+            return stacked, states[0]
+        return stacked, states
+
+    def embed_pooled(
+        self,
+        context: Sequence[torch.Tensor],
+        keys: Optional[Sequence[str]] = None,
+        pooling: Literal["mean", "last", "reg"] = "mean",
+        dtype: torch.dtype = torch.float16,
+    ) -> torch.Tensor:
+        """
+        Get one fixed-size encoder embedding per series, pooled from the
+        cached embeddings as the ``embed_pooled`` method of the pipeline
+        pools them, computing only those that are not cached yet.
+
+        Parameters
+        ----------
+        context
+            List of 1D series.
+        keys
+            Optional stable identifiers of the series, as in ``embed``.
+        pooling
+            "mean", "last" or, for Chronos-Bolt models trained with a [REG]
+            token, "reg", see the ``embed_pooled`` method of the pipeline.
+        dtype
+            Data type of the returned embeddings, float16 by default.
+
+        Returns
+        -------
+        embeddings
+            Tensor of shape (batch_size, d_model).
+        """
+        context = [torch.as_tensor(c) for c in context]
+        results = self._lookup(context, keys)
+        pooled = [
+            self._pool(series, embedding, pooling)
+            for series, (embedding, _) in zip(context, results)
+        ]
+        return torch.stack(pooled).to(dtype)
+
+    def _pool(
+        self, series: torch.Tensor, embedding: torch.Tensor, pooling: str
+    ) -> torch.Tensor:
+        context_length = self.pipeline.context_length
+        if context_length is not None:
+            series = series[-context_length:]
+        observed = ~torch.isnan(series.to(torch.float32))
+        if isinstance(self.pipeline, ChronosPipeline):
+            num_special = int(self.pipeline.tokenizer.config.use_eos_token)
+            if pooling == "last":
+                return embedding[-1]
+        else:
+            chronos_config = self.pipeline.model.chronos_config
+            num_special = int(chronos_config.use_reg_token)
+            # patches are left-padded to whole patches, and observed if any
+            # of their values is
+            patch_size = chronos_config.input_patch_size
+            padding = observed.new_zeros(-len(observed) % patch_size)
+            observed = torch.cat([padding, observed]).view(-1, patch_size).any(-1)
+            if pooling == "last":
+                return embedding[-1 - num_special]
+            if pooling == "reg":
+                if not num_special:
+                    raise ValueError("This model was not trained with a [REG] token")
+                return embedding[-1]
+        if pooling != "mean":
+            raise ValueError(f"Unknown pooling: {pooling}")
+        positions = embedding[: embedding.shape[0] - num_special]
+        return masked_mean_pool(positions.unsqueeze(0), observed.unsqueeze(0))[0]
+
+    def _lookup(
+        self,
+        context: Sequence[torch.Tensor],
+        keys: Optional[Sequence[str]],
+    ) -> List[Tuple[torch.Tensor, Tuple[torch.Tensor, ...]]]:
+        # the embedding and tokenizer state of each series, from the cache
+        # or computed in one batch for the series missing from it
+        if keys is not None and len(keys) != len(context):
+            raise ValueError("Expected one key per series")
+        context = [torch.as_tensor(c) for c in context]
+        fingerprints = [self.fingerprint(c) for c in context]
+
+        if keys is not None:
+            for key, fingerprint in zip(keys, fingerprints):
+                self._update_key(key, fingerprint)
+
+        results: List[Optional[Tuple[torch.Tensor, Tuple[torch.Tensor, ...]]]] = [
+            self._get(fingerprint) for fingerprint in fingerprints
+        ]
+
+        missing: Dict[str, List[int]] = {}
+        for i, (fingerprint, result) in enumerate(zip(fingerprints, results)):
+            if result is None:
+                missing.setdefault(fingerprint, []).append(i)
+
+        if missing:
+            rows = [indices[0] for indices in missing.values()]
+            embeddings, state = self.pipeline.embed([context[i] for i in rows])
+            state = state if isinstance(state, tuple) else (state,)
+            for j, (fingerprint, indices) in enumerate(missing.items()):
+                num_positions = self._num_positions(len(context[indices[0]]))
+                embedding = embeddings[j, embeddings.shape[1] - num_positions :]
+                embedding = embedding.to(torch.float32).clone()
+                row_state = tuple(s[j].clone() for s in state)
+                self._put(fingerprint, embedding, row_state)
+                for i in indices:
+                    results[i] = (embedding, row_state)
+        return results  # type: ignore[return-value]
+
+    def _update_key(self, key: str, fingerprint: str):
+        with self._lock:
+            previous = self._keys.get(key)
+            if previous == fingerprint:
+                return
+            self._keys[key] = fingerprint
+            self._key_refs[fingerprint] = self._key_refs.get(fingerprint, 0) + 1
+            if previous is not None:
+                self._release(previous)
+
+    def invalidate(self, key: str):
+        """Drop the cached embedding of the series behind ``key``."""
+        with self._lock:
+            fingerprint = self._keys.pop(key, None)
+            if fingerprint is not None:
+                self._release(fingerprint)
+
+    def _release(self, fingerprint: str):
+        # the entry is only dropped once no other key refers to the same values
+        self._key_refs[fingerprint] -= 1
+        if self._key_refs[fingerprint] == 0:
+            del self._key_refs[fingerprint]
+            if fingerprint in self._entries:
+                self._drop(fingerprint)
+                self.invalidations += 1
+
+    def _drop(self, fingerprint: str):
+        entry = self._entries.pop(fingerprint, None)
+        if entry is None:
+            return
+        if entry.embedding is not None:
+            self._memory_bytes -= entry.nbytes
+        else:
+            self._spill_bytes -= entry.nbytes
+            self._free_extent(entry.offset, entry.nbytes)
+
+    def _allocate(self, nbytes: int) -> int:
+        # best fit among the free extents, else the end of the file
+        best = None
+        for i, (offset, size) in enumerate(self._free):
+            if size >= nbytes and (best is None or size < self._free[best][1]):
+                best = i
+        if best is None:
+            offset = self._spill_end
+            self._spill_end += nbytes
+            return offset
+        offset, size = self._free.pop(best)
+        if size > nbytes:
+            bisect.insort(self._free, (offset + nbytes, size - nbytes))
+        return offset
+
+    def _free_extent(self, offset: int, nbytes: int):
+        i = bisect.bisect(self._free, (offset, nbytes))
+        # merge with the adjacent free extents
+        if i < len(self._free) and offset + nbytes == self._free[i][0]:
+            nbytes += self._free.pop(i)[1]
+        if i > 0 and sum(self._free[i - 1]) == offset:
+            offset, size = self._free.pop(i - 1)
+            nbytes += size
+            i -= 1
+        if offset + nbytes == self._spill_end:
+            self._spill_end = offset
+            os.truncate(self.spill_path, offset)
+        else:
+            self._free.insert(i, (offset, nbytes))
+
+    def _get(
+        self, fingerprint: str
+    ) -> Optional[Tuple[torch.Tensor, Tuple[torch.Tensor, ...]]]:
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            if entry.embedding is not None:
+                self.hits += 1
+                return entry.embedding, entry.state
+            self.spill_hits += 1
+            # read under the lock, as the extent is reused once the entry is dropped
+            mapped = np.memmap(
+                self.spill_path,
+                dtype=np.float32,
+                mode="r",
+                offset=entry.offset,
+                shape=entry.shape,
+            )
+            return torch.from_numpy(np.array(mapped)), entry.state
+
+    def _put(
+        self,
+        fingerprint: str,
+        embedding: torch.Tensor,
+        state: Tuple[torch.Tensor, ...],
+    ):
+        with self._lock:
+            self._drop(fingerprint)
+            entry = _Entry(fingerprint, embedding, None, tuple(embedding.shape), state)
+            self._entries[fingerprint] = entry
+            self._memory_bytes += entry.nbytes
+            self._enforce_budget()
+
+    def _enforce_budget(self):
+        for fingerprint in list(self._entries):
+            if self._memory_bytes <= self.max_memory_bytes:
+                break
+            entry = self._entries[fingerprint]
+            if entry.embedding is None:
+                continue
+            if self.spill_path is None:
+                self._drop(fingerprint)
+                self.evictions += 1
+                continue
+            entry.offset = self._allocate(entry.nbytes)
+            with open(self.spill_path, "r+b") as f:
+                f.seek(entry.offset)
+                f.write(entry.embedding.numpy().tobytes())
+            self._spill_bytes += entry.nbytes
+            self._memory_bytes -= entry.nbytes
+            entry.embedding = None
+            self.spills += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._key_refs.clear()
+            self._memory_bytes = 0
+            self._spill_bytes = 0
+            self._free.clear()
+            self._spill_end = 0
+            if self.spill_path is not None:
+                open(self.spill_path, "wb").close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "keys": len(self._keys),
+                "memory_bytes": self._memory_bytes,
+                "spill_bytes": self._spill_bytes,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "spills": self.spills,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,195 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import logging
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__file__)
+
+# ``torch.load(mmap=True)`` and ``load_state_dict(assign=True)``
+MIN_TORCH_VERSION = (2, 1)
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def mmap_supported() -> bool:
+    """Whether the installed PyTorch supports memory-mapped loading."""
+    match = re.match(r"(\d+)\.(\d+)", str(torch.__version__))
+    return match is not None and tuple(map(int, match.groups())) >= MIN_TORCH_VERSION
+
+
+def resolve_mmap(mmap: bool) -> bool:
+    """
+    The ``mmap`` option of ``from_pretrained``: falls back to regular loading,
+    with a warning, when the installed PyTorch does not support memory mapping.
+    """
+    if mmap and not mmap_supported():
+        logger.warning(
+            f"{_unsupported_message()}; loading the weights into memory instead"
+        )
+        return False
+    return mmap
+
+
+def _unsupported_message() -> str:
+    required = ".".join(map(str, MIN_TORCH_VERSION))
+    return (
+        f"Memory-mapped loading requires torch>={required}, found {torch.__version__}"
+    )
+
+
+def _check_torch_version():
+    if not mmap_supported():
+        raise RuntimeError(_unsupported_message())
+
+
+def _checkpoint_files(checkpoint_dir: Path) -> List[Path]:
+    for index_name in ("model.safetensors.index.json", "pytorch_model.bin.index.json"):
+        index_path = checkpoint_dir / index_name
+        if index_path.exists():
+            weight_map = json.loads(index_path.read_text())["weight_map"]
+            return [checkpoint_dir / name for name in sorted(set(weight_map.values()))]
+    for name in ("model.safetensors", "pytorch_model.bin"):
+        if (checkpoint_dir / name).exists():
+            return [checkpoint_dir / name]
+    raise ValueError(f"No model checkpoint found in {checkpoint_dir}")
+
+
+def _mmap_safetensors(path: Path) -> Dict[str, torch.Tensor]:
+    with open(path, "rb") as f:
+        # a private (copy-on-write) mapping: pages are shared with the page
+        # cache, and with other processes mapping the file, until written to
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    (header_size,) = struct.unpack("<Q", buffer[:8])
+    header = json.loads(buffer[8 : 8 + header_size])
+    header.pop("__metadata__", None)
+
+    state_dict = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        if start == end:
+            tensor = torch.empty(0, dtype=dtype)
+        else:
+            tensor = torch.frombuffer(
+                buffer,
+                dtype=dtype,
+                count=(end - start) // dtype.itemsize,
+                offset=8 + header_size + start,
+            )
+        state_dict[name] = tensor.reshape(info["shape"])
+    return state_dict
+
+
+def load_state_dict_mmap(checkpoint_dir: Union[str, Path]) -> Dict[str, torch.Tensor]:
+    """
+    Memory-map the weights of a local checkpoint directory.
+
+    Tensors of safetensors files are views on a copy-on-write mapping of the
+    file, so no weight is read before it is first used, and processes mapping
+    the same file share its pages in the page cache. PyTorch (``.bin``)
+    checkpoints are loaded with ``torch.load(mmap=True)``. Sharded
+    checkpoints are supported through their index file.
+
+    Parameters
+    ----------
+    checkpoint_dir
+        Directory with ``model.safetensors``, ``pytorch_model.bin`` or a
+        sharded checkpoint.
+
+    Returns
+    -------
+    state_dict
+        Tensors by parameter name.
+    """
+    _check_torch_version()
+    checkpoint_dir = Path(checkpoint_dir)
+    if not checkpoint_dir.is_dir():
+        raise ValueError(
+            f"Memory-mapped loading requires a local checkpoint directory, found {checkpoint_dir}"
+        )
+    state_dict: Dict[str, torch.Tensor] = {}
+    for path in _checkpoint_files(checkpoint_dir):
+        if path.suffix == ".safetensors":
+            state_dict.update(_mmap_safetensors(path))
+        else:
+            state_dict.update(
+                torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+            )
+    return state_dict
+
+
+def load_model_mmap(
+    model_factory: Callable[[], nn.Module],
+    checkpoint_dir: Union[str, Path],
+    torch_dtype: Optional[Union[str, torch.dtype]] = None,
+    device: Optional[Union[str, torch.device]] = None,
+) -> nn.Module:
+    """
+    Build a model with its parameters on the meta device and bind the
+    memory-mapped tensors of ``checkpoint_dir`` to it without copying.
+
+    Loading then costs parsing the checkpoint header instead of reading
+    and deserializing the weights; pages are read on first use. Casting to a
+    different ``torch_dtype`` or moving to a ``device`` other than the CPU
+    copies the weights, which gives up these savings. Requires PyTorch 2.1
+    or later; ``from_pretrained(mmap=True)`` falls back to regular loading on
+    older versions, see ``resolve_mmap``.
+
+    Parameters
+    ----------
+    model_factory
+        Creates the model from its config, e.g. ``lambda: cls(config)``.
+        Called under ``accelerate.init_empty_weights``, so parameters are
+        allocated on the meta device; buffers are created as usual.
+    checkpoint_dir
+        Local checkpoint directory, see ``load_state_dict_mmap``.
+    torch_dtype
+        Optional dtype to cast the model to; "auto" or None keeps the
+        dtype of the checkpoint.
+    device
+        Optional device to move the model to.
+
+    Returns
+    -------
+    model
+        The model, in eval mode.
+    """
+    from accelerate import init_empty_weights
+
+    with init_empty_weights():
+        model = model_factory()
+    state_dict = load_state_dict_mmap(checkpoint_dir)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()
+
+    missing = [name for name, p in model.named_parameters() if p.is_meta]
+    if missing:
+        raise ValueError(
+            f"Checkpoint in {checkpoint_dir} is missing parameters: {', '.join(missing)}"
+        )
+    if torch_dtype not in (None, "auto"):
+        model.to(torch_dtype)
+    if device is not None and torch.device(device).type != "cpu":
+        model.to(device)
+    return model.eval()
@@ -0,0 +1,264 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Offline cache of Chronos checkpoints.
+
+``prefetch`` downloads models (or copies local checkpoints) into a cache
+directory and records every file's size and SHA-256 in ``manifest.json``.
+``resolve`` maps a model id to its cached directory using the manifest
+alone, without any call to the HuggingFace Hub, so ``from_pretrained(...,
+model_cache=cache_dir)`` works on machines without network access.
+
+Pre-fetch from the command line with::
+
+    python -m chronos.model_cache prefetch amazon/chronos-t5-small amazon/chronos-bolt-small --cache-dir /models
+    python -m chronos.model_cache verify --cache-dir /models
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+CHECKPOINT_PATTERNS = [
+    "config.json",
+    "generation_config.json",
+    "*.safetensors",
+    "*.safetensors.index.json",
+]
+FALLBACK_PATTERNS = ["pytorch_model.bin", "pytorch_model.bin.index.json", "*.bin"]
+
+
+def _sha256(path: Path, chunk_size: int = 2**20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_subdir(model_id: str) -> str:
+    return model_id.strip("/").replace("/", "--")
+
+
+def load_manifest(cache_dir: Union[str, Path]) -> dict:
+    """Return the manifest of ``cache_dir``, or an empty one if there is none."""
+    manifest_path = Path(cache_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"version": MANIFEST_VERSION, "models": {}}
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"Unsupported model cache manifest version: {manifest.get('version')}"
+        )
+    return manifest
+
+
+def _write_manifest(cache_dir: Path, manifest: dict):
+    # write and rename, so readers never see a partially written manifest
+    tmp_path = cache_dir / f".{MANIFEST_NAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, cache_dir / MANIFEST_NAME)
+
+
+def _fetch(model_id: str, target: Path, revision: Optional[str]) -> Optional[str]:
+    if Path(model_id).is_dir():
+        shutil.copytree(model_id, target, dirs_exist_ok=True)
+        return None
+
+    from huggingface_hub import HfApi, snapshot_download
+
+    info = HfApi().model_info(model_id, revision=revision)
+    files = {sibling.rfilename for sibling in info.siblings or []}
+    has_safetensors = any(name.endswith(".safetensors") for name in files)
+    snapshot_download(
+        model_id,
+        revision=info.sha,
+        local_dir=target,
+        allow_patterns=CHECKPOINT_PATTERNS
+        + ([] if has_safetensors else FALLBACK_PATTERNS),
+    )
+    return info.sha
+
+
+def prefetch(
+    model_ids: List[str],
+    cache_dir: Union[str, Path],
+    revision: Optional[str] = None,
+) -> dict:
+    """
+    Download models into ``cache_dir`` and record them in its manifest.
+
+    Only the files needed for inference are fetched: the configs and the
+    safetensors weights, or the PyTorch weights for models without
+    safetensors. Models given as local directories are copied. Models
+    already in the manifest are fetched again, which updates them to the
+    latest (or the given) revision.
+
+    Parameters
+    ----------
+    model_ids
+        HuggingFace model ids or local checkpoint directories.
+    cache_dir
+        Cache directory, created if needed.
+    revision
+        Optional branch, tag or commit to fetch, for all models.
+
+    Returns
+    -------
+    manifest
+        The updated manifest.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(cache_dir)
+
+    for model_id in model_ids:
+        subdir = _cache_subdir(model_id)
+        target = cache_dir / subdir
+        start = time.perf_counter()
+        # fetch next to the cached copy and swap, so a failed fetch keeps the
+        # old copy and files removed upstream do not linger in the cache
+        partial = cache_dir / f".{subdir}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        commit = _fetch(model_id, partial, revision)
+        shutil.rmtree(target, ignore_errors=True)
+        partial.rename(target)
+
+        config = json.loads((target / "config.json").read_text())
+        files = {
+            str(path.relative_to(target)): {
+                "size": path.stat().st_size,
+                "sha256": _sha256(path),
+            }
+            for path in sorted(target.rglob("*"))
+            if path.is_file() and ".cache" not in path.relative_to(target).parts
+        }
+        manifest["models"][model_id] = {
+            "path": subdir,
+            "revision": commit,
+            "pipeline_class": config.get("chronos_pipeline_class", "ChronosPipeline"),
+            "torch_dtype": config.get("torch_dtype"),
+            "size": sum(f["size"] for f in files.values()),
+            "files": files,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        _write_manifest(cache_dir, manifest)
+        print(
+            f"{model_id}: {len(files)} files, "
+            f"{manifest['models'][model_id]['size'] / 2**20:.1f} MB "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+    return manifest
+
+
+def verify(
+    model_id: str, cache_dir: Union[str, Path], check_hashes: bool = True
+) -> List[str]:
+    """
+    Compare the cached files of ``model_id`` with the manifest and return
+    the problems found (an empty list if there are none). Without
+    ``check_hashes``, only presence and sizes of the files are checked.
+    """
+    cache_dir = Path(cache_dir)
+    entry = load_manifest(cache_dir)["models"].get(model_id)
+    if entry is None:
+        return [f"{model_id} is not in the manifest"]
+    problems = []
+    model_dir = cache_dir / entry["path"]
+    for name, expected in entry["files"].items():
+        path = model_dir / name
+        if not path.is_file():
+            problems.append(f"{name} is missing")
+        elif path.stat().st_size != expected["size"]:
+            problems.append(
+                f"{name} has size {path.stat().st_size}, expected {expected['size']}"
+            )
+        elif check_hashes and _sha256(path) != expected["sha256"]:
+            problems.append(f"{name} does not match its SHA-256")
+    return problems
+
+
+def resolve(
+    model_id: Union[str, Path],
+    cache_dir: Union[str, Path],
+    check_hashes: bool = False,
+) -> Path:
+    """
+    Return the cached checkpoint directory of ``model_id``.
+
+    Only the manifest and the file system are consulted, never the Hub.
+    The presence and size of every file are checked, and their hashes too
+    with ``check_hashes``; any mismatch raises a ``ValueError``.
+    """
+    model_id = str(model_id)
+    cache_dir = Path(cache_dir)
+    models = load_manifest(cache_dir)["models"]
+    if model_id not in models:
+        raise ValueError(
+            f"Model {model_id} is not in the model cache at {cache_dir}; "
+            f"cached models: {', '.join(sorted(models)) or 'none'}"
+        )
+    problems = verify(model_id, cache_dir, check_hashes=check_hashes)
+    if problems:
+        raise ValueError(f"Cached model {model_id} is corrupted: {'; '.join(problems)}")
+    return cache_dir / models[model_id]["path"]
+
+
+def resolve_pretrained(
+    pretrained_model_name_or_path: Union[str, Path], kwargs: Dict
+) -> Union[str, Path]:
+    """
+    Apply the ``model_cache`` option of ``from_pretrained``: pop it from
+    ``kwargs`` and, if set, return the cached directory of the model and
+    forbid downloads. Otherwise, return the model unchanged.
+    """
+    model_cache = kwargs.pop("model_cache", None)
+    if model_cache is None:
+        return pretrained_model_name_or_path
+    kwargs["local_files_only"] = True
+    return resolve(pretrained_model_name_or_path, model_cache)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m chronos.model_cache",
+        description="Pre-fetch Chronos models into an offline cache directory.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prefetch_parser = subparsers.add_parser(
+        "prefetch", help="Download models and record them in the manifest"
+    )
+    prefetch_parser.add_argument("model_ids", nargs="+")
+    prefetch_parser.add_argument("--cache-dir", required=True)
+    prefetch_parser.add_argument("--revision", default=None)
+    verify_parser = subparsers.add_parser(
+        "verify", help="Check the cached files against the manifest"
+    )
+    verify_parser.add_argument("model_ids", nargs="*")
+    verify_parser.add_argument("--cache-dir", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "prefetch":
+        prefetch(args.model_ids, args.cache_dir, revision=args.revision)
+        return
+
+    model_ids = args.model_ids or sorted(load_manifest(args.cache_dir)["models"])
+    failed = False
+    for model_id in model_ids:
+        problems = verify(model_id, args.cache_dir)
+        print(f"{model_id}: {'; '.join(problems) or 'ok'}")
+        failed = failed or bool(problems)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import itertools
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+import torch
+
+from .base import BaseChronosPipeline
+
+# Pipelines of the process pools, inherited by the forked workers.
+_FORKED_PIPELINES: Dict[int, BaseChronosPipeline] = {}
+_executor_ids = itertools.count()
+
+
+def _run_in_process(
+    executor_id: int, method: str, context: Any, predict_kwargs: dict
+) -> Any:
+    pipeline = _FORKED_PIPELINES[executor_id]
+    return getattr(pipeline, method)(context, **predict_kwargs)
+
+
+class ShardedExecutor:
+    """
+    Run ``predict`` and ``predict_quantiles`` of a pipeline on a pool of
+    workers, each with its own budget of torch threads.
+
+    A single call on a small batch does not keep many cores busy, since
+    intra-op parallelism over small tensors is mostly overhead. The executor
+    instead splits the batch into one shard per worker, forecasts the shards
+    concurrently, each worker using ``threads_per_worker`` intra-op threads,
+    and puts the results back together in the order of the input. Series of
+    a list context are assigned to shards by length, so every shard pads its
+    series to a similar length.
+
+    With ``backend="thread"``, the workers are threads sharing the pipeline.
+    With ``backend="process"``, they are processes forked when the executor
+    is created, which share the model weights read-only through copy-on-write
+    memory; this avoids contention on the Python interpreter between shards,
+    at the cost of pickling inputs and outputs.
+
+    Parameters
+    ----------
+    pipeline
+        The pipeline to run.
+    num_workers
+        Number of workers, by default the number of CPUs.
+    threads_per_worker
+        Intra-op threads of each worker, by default the number of CPUs
+        divided by ``num_workers``.
+    backend
+        "thread" (default) or "process". "process" requires the "fork"
+        start method, i.e., Linux.
+    min_shard_size
+        Smallest number of series per shard. Batches with fewer than twice
+        as many series are forecast directly, without the pool.
+    """
+
+    def __init__(
+        self,
+        pipeline: BaseChronosPipeline,
+        num_workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        backend: Literal["thread", "process"] = "thread",
+        min_shard_size: int = 1,
+    ):
+        cpu_count = os.cpu_count() or 1
+        self.pipeline = pipeline
+        self.num_workers = num_workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(
+            1, cpu_count // self.num_workers
+        )
+        self.backend = backend
+        self.min_shard_size = min_shard_size
+        self._id = next(_executor_ids)
+
+        self._pool: Executor
+        if backend == "thread":
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.num_workers,
+                thread_name_prefix="chronos-shard",
+                initializer=torch.set_num_threads,
+                initargs=(self.threads_per_worker,),
+            )
+        elif backend == "process":
+            if "fork" not in mp.get_all_start_methods():
+                raise ValueError("The process backend requires the fork start method")
+            _FORKED_PIPELINES[self._id] = pipeline
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=mp.get_context("fork"),
+                initializer=torch.set_num_threads,
+                initargs=(self.threads_per_worker,),
+            )
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+
+    def __enter__(self) -> "ShardedExecutor":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        _FORKED_PIPELINES.pop(self._id, None)
+
+    def _shards(
+        self, context: Union[torch.Tensor, List[torch.Tensor]]
+    ) -> List[List[int]]:
+        batch_size = len(context)
+        num_shards = min(self.num_workers, batch_size // self.min_shard_size)
+        if num_shards <= 1:
+            return [list(range(batch_size))]
+        if isinstance(context, list):
+            order = sorted(range(batch_size), key=lambda i: len(context[i]))
+        else:
+            order = list(range(batch_size))
+        shard_size = math.ceil(batch_size / num_shards)
+        return [
+            order[start : start + shard_size]
+            for start in range(0, batch_size, shard_size)
+        ]
+
+    def _run(
+        self,
+        method: str,
+        context: Union[torch.Tensor, List[torch.Tensor]],
+        predict_kwargs: dict,
+    ) -> Tuple[torch.Tensor, ...]:
+        if isinstance(context, torch.Tensor) and context.ndim == 1:
+            context = context.unsqueeze(0)
+        shards = self._shards(context)
+        if len(shards) == 1:
+            result = getattr(self.pipeline, method)(context, **predict_kwargs)
+            return result if isinstance(result, tuple) else (result,)
+
+        futures = []
+        for shard in shards:
+            if isinstance(context, list):
+                shard_context: Any = [context[i] for i in shard]
+            else:
+                shard_context = context[shard]
+            if self.backend == "thread":
+                future = self._pool.submit(
+                    getattr(self.pipeline, method), shard_context, **predict_kwargs
+                )
+            else:
+                future = self._pool.submit(
+                    _run_in_process, self._id, method, shard_context, predict_kwargs
+                )
+            futures.append(future)
+
+        outputs: Optional[List[torch.Tensor]] = None
+        for shard, future in zip(shards, futures):
+            result = future.result()
+            result = result if isinstance(result, tuple) else (result,)
+            if outputs is None:
+                outputs = [r.new_empty((len(context),) + r.shape[1:]) for r in result]
+            for output, r in zip(outputs, result):
+                output[shard] = r
+        assert outputs is not None
+        return tuple(outputs)
+
+    def predict(
+        self,
+        context: Union[torch.Tensor, List[torch.Tensor]],
+        **predict_kwargs,
+    ) -> torch.Tensor:
+        """
+        Same as ``predict`` of the pipeline, with the batch split across workers.
+        """
+        (predictions,) = self._run("predict", context, predict_kwargs)
+        return predictions
+
+    def predict_quantiles(
+        self,
+        context: Union[torch.Tensor, List[torch.Tensor]],
+        **predict_kwargs,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Same as ``predict_quantiles`` of the pipeline, with the batch split
+        across workers.
+        """
+        quantiles, mean = self._run("predict_quantiles", context, predict_kwargs)
+        return quantiles, mean
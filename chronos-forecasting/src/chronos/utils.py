@@ -2,19 +2,247 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-from typing import List
+from typing import List, Literal, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import torch
 
+Series1D = Union[torch.Tensor, np.ndarray, Sequence[float]]
 
-def left_pad_and_stack_1D(tensors: List[torch.Tensor]) -> torch.Tensor:
-    max_len = max(len(c) for c in tensors)
-    padded = []
+
+def left_pad_and_stack_1D(
+    tensors: Sequence[Series1D], max_length: Optional[int] = None
+) -> torch.Tensor:
+    """
+    Stack 1D series of different lengths into a ``(batch, max_len)`` tensor,
+    left-padded with NaN.
+
+    The output is allocated once and every series is copied into its
+    right-aligned slice, without per-series padding tensors.
+
+    Parameters
+    ----------
+    tensors
+        Series to stack, as 1D torch tensors, 1D numpy arrays or lists of floats.
+    max_length
+        If given, only the last ``max_length`` values of each series are kept,
+        so long series are truncated during the copy.
+
+    Returns
+    -------
+    padded
+        Tensor of shape ``(len(tensors), max_len)``. Its dtype is float32, or
+        a wider floating dtype if one of the inputs has it. If any input is a
+        torch tensor, the output lives on the device of the first one.
+    """
+    if len(tensors) == 0:
+        raise ValueError("Expected at least one series to stack")
+
+    lengths = [len(c) for c in tensors]
+    if max_length is not None:
+        lengths = [min(n, max_length) for n in lengths]
+    max_len = max(lengths)
+
+    dtype = torch.float32
+    device = None
     for c in tensors:
-        assert isinstance(c, torch.Tensor)
-        assert c.ndim == 1
-        padding = torch.full(
-            size=(max_len - len(c),), fill_value=torch.nan, device=c.device
+        if isinstance(c, torch.Tensor):
+            assert c.ndim == 1
+            dtype = torch.promote_types(dtype, c.dtype)
+            if device is None:
+                device = c.device
+        elif isinstance(c, np.ndarray):
+            assert c.ndim == 1
+            dtype = torch.promote_types(dtype, torch.from_numpy(c[:0]).dtype)
+
+    if device is None or device.type == "cpu":
+        # Fill a numpy buffer: slice assignment there has far less per-row
+        # overhead than tensor indexing, converts lists element-wise, and CPU
+        # tensors are read through zero-copy ``.numpy()`` views.
+        padded = np.full(
+            (len(tensors), max_len),
+            np.nan,
+            dtype=torch.empty(0, dtype=dtype).numpy().dtype,
         )
-        padded.append(torch.concat((padding, c), dim=-1))
-    return torch.stack(padded)
+        for row, (c, n) in enumerate(zip(tensors, lengths)):
+            if n == 0:
+                continue
+            if isinstance(c, torch.Tensor):
+                # numpy has no bfloat16, upcast those series to the output dtype
+                c = c.detach().cpu()
+                c = c.to(dtype if c.dtype == torch.bfloat16 else c.dtype)
+                c = c.numpy()
+            padded[row, max_len - n :] = c[len(c) - n :]
+        return torch.from_numpy(padded)
+
+    padded = torch.full(
+        (len(tensors), max_len), fill_value=torch.nan, dtype=dtype, device=device
+    )
+    for row, (c, n) in enumerate(zip(tensors, lengths)):
+        if n == 0:
+            continue
+        if not isinstance(c, torch.Tensor):
+            c = torch.as_tensor(np.asarray(c[len(c) - n :]))
+        padded[row, max_len - n :] = c[len(c) - n :]
+    return padded
+
+
+def length_buckets(lengths: Sequence[int], max_ratio: float = 4.0) -> List[List[int]]:
+    """
+    Group series indices so that, within each group, the longest series is at
+    most ``max_ratio`` times as long as the shortest one.
+
+    Parameters
+    ----------
+    lengths
+        Length of each series.
+    max_ratio
+        Largest allowed ratio between the longest and the shortest series of
+        a group. Series of length zero are grouped with the shortest series.
+
+    Returns
+    -------
+    buckets
+        Lists of indices into ``lengths``, longest series first. Applying this
+        function to the lengths of a single bucket returns a single bucket.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    buckets: List[List[int]] = []
+    longest = None
+    for i in order:
+        if longest is None or (lengths[i] > 0 and lengths[i] * max_ratio < longest):
+            buckets.append([])
+            longest = lengths[i]
+        buckets[-1].append(i)
+    return buckets
+
+
+def masked_mean_pool(embeddings: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    """
+    Average ``(batch, positions, d_model)`` embeddings over the positions where
+    ``mask`` is true, in float32. Rows without any such position pool to zero.
+    """
+    weights = mask.to(device=embeddings.device, dtype=torch.float32).unsqueeze(-1)
+    pooled = (embeddings.to(torch.float32) * weights).sum(dim=1)
+    return pooled / weights.sum(dim=1).clamp(min=1.0)
+
+
+def sample_quantiles(
+    samples: torch.Tensor,
+    quantile_levels: Sequence[float],
+    method: Literal["sort", "select", "histogram"] = "sort",
+    num_bins: int = 1024,
+    chunk_size: int = 256,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Compute quantiles and mean of sample paths over the sample dimension.
+
+    With ``method="sort"`` (default) or ``method="select"``, the result is the
+    same as ``torch.quantile`` with linear interpolation. "sort" sorts the
+    samples once, with numpy's vectorized sort on CPU, and gathers all levels
+    and the interpolation neighbours from the sorted tensor. "select" picks
+    only the needed order statistics with ``kthvalue``, one call per rank,
+    which only pays off for one or two levels on accelerators. "histogram" is an approximate
+    sketch for very large numbers of samples: samples are counted into
+    ``num_bins`` equal-width bins between their minimum and maximum, in chunks
+    of ``chunk_size`` samples, and quantiles are interpolated within bins, so
+    the error is at most ``(max - min) / num_bins`` and the working memory
+    does not grow with the number of samples.
+
+    Parameters
+    ----------
+    samples
+        Tensor of shape (batch_size, num_samples, prediction_length).
+    quantile_levels
+        Quantile levels to compute, in [0, 1].
+    method
+        One of "sort", "select" or "histogram".
+    num_bins
+        Number of histogram bins, used with ``method="histogram"``.
+    chunk_size
+        Number of samples counted at once, used with ``method="histogram"``.
+
+    Returns
+    -------
+    quantiles
+        Tensor of shape (batch_size, prediction_length, num_quantiles).
+    mean
+        Tensor of shape (batch_size, prediction_length).
+    """
+    levels = torch.tensor(quantile_levels, dtype=torch.float64)
+    if levels.numel() == 0 or levels.min() < 0 or levels.max() > 1:
+        raise ValueError("Quantile levels must be in [0, 1]")
+    num_samples = samples.shape[1]
+    mean = samples.mean(dim=1)
+
+    if method == "histogram":
+        return _histogram_quantiles(samples, levels, num_bins, chunk_size), mean
+
+    # rank positions and interpolation weights, as in torch.quantile
+    positions = levels * (num_samples - 1)
+    lower = positions.floor().long()
+    upper = positions.ceil().long()
+    weights = (positions - lower).to(device=samples.device, dtype=samples.dtype)
+
+    # work on a contiguous (batch_size, prediction_length, num_samples) layout,
+    # so that sorting and selection run over contiguous rows
+    samples = samples.transpose(1, 2).contiguous()
+    if method == "sort":
+        if samples.device.type == "cpu" and samples.dtype in (
+            torch.float32,
+            torch.float64,
+        ):
+            # numpy's vectorized sort is much faster than torch.sort on CPU
+            sorted_samples = torch.from_numpy(np.sort(samples.numpy(), axis=-1))
+        else:
+            sorted_samples = samples.sort(dim=-1).values
+        lower_values = sorted_samples[..., lower.to(samples.device)]
+        upper_values = sorted_samples[..., upper.to(samples.device)]
+    elif method == "select":
+        ranks = sorted(set(lower.tolist()) | set(upper.tolist()))
+        selected = {rank: samples.kthvalue(rank + 1, dim=-1).values for rank in ranks}
+        lower_values = torch.stack([selected[rank] for rank in lower.tolist()], dim=-1)
+        upper_values = torch.stack([selected[rank] for rank in upper.tolist()], dim=-1)
+    else:
+        raise ValueError(f"Unknown quantile method: {method}")
+
+    return torch.lerp(lower_values, upper_values, weights), mean
+
+
+def _histogram_quantiles(
+    samples: torch.Tensor,
+    levels: torch.Tensor,
+    num_bins: int,
+    chunk_size: int,
+) -> torch.Tensor:
+    batch_size, num_samples, prediction_length = samples.shape
+    low = samples.amin(dim=1, keepdim=True)
+    width = (samples.amax(dim=1, keepdim=True) - low) / num_bins
+
+    counts = torch.zeros(
+        (batch_size, num_bins, prediction_length),
+        dtype=torch.int32,
+        device=samples.device,
+    )
+    ones = torch.ones((), dtype=torch.int32, device=samples.device)
+    for start in range(0, num_samples, chunk_size):
+        chunk = samples[:, start : start + chunk_size]
+        bins = ((chunk - low) / width).nan_to_num_(0.0).clamp_(0, num_bins - 1).long()
+        counts.scatter_add_(1, bins, ones.expand(bins.shape))
+
+    # rank of each level, located in the cumulative counts and interpolated
+    # uniformly within its bin
+    cumulative = counts.cumsum(dim=1).transpose(1, 2).to(samples.dtype).contiguous()
+    targets = (levels * (num_samples - 1)).to(
+        device=samples.device, dtype=samples.dtype
+    )
+    targets = targets.expand(batch_size, prediction_length, -1).contiguous()
+    bins = torch.searchsorted(cumulative, targets, right=True).clamp_(max=num_bins - 1)
+    before = torch.where(
+        bins > 0,
+        cumulative.gather(-1, (bins - 1).clamp(min=0)),
+        torch.zeros((), dtype=samples.dtype, device=samples.device),
+    )
+    in_bin = cumulative.gather(-1, bins) - before
+    fraction = ((targets - before + 0.5) / in_bin).clamp_(0, 1)
+    return low.transpose(1, 2) + (bins + fraction) * width.transpose(1, 2)
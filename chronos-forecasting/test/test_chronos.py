@@ -12,6 +12,7 @@ from chronos import (
     ChronosPipeline,
     MeanScaleUniformBins,
 )
+from chronos.chronos import sample_next_token
 from test.util import validate_tensor
 
 
@@ -19,6 +20,15 @@ def test_base_chronos_pipeline_loads_from_huggingface():
     BaseChronosPipeline.from_pretrained("amazon/chronos-t5-tiny", device_map="cpu")
 
 
+@pytest.mark.parametrize("load", [BaseChronosPipeline, ChronosPipeline])
+def test_pipeline_loads_with_path_keyword(load):
+    pipeline = load.from_pretrained(
+        pretrained_model_name_or_path=Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+    )
+    assert isinstance(pipeline, ChronosPipeline)
+
+
 @pytest.mark.parametrize("n_numerical_tokens", [5, 10, 27])
 @pytest.mark.parametrize("n_special_tokens", [2, 5, 13])
 def test_tokenizer_consistency(n_numerical_tokens: int, n_special_tokens: int):
@@ -166,6 +176,152 @@ def test_tokenizer_random_data(use_eos_token: bool):
     assert samples.shape == (2, 10, 4)
 
 
+def reference_input_transform(tokenizer, context, scale=None, append_eos=False):
+    # straightforward (allocation-heavy) implementation of MeanScaleUniformBins
+    config = tokenizer.config
+    context = context.to(dtype=torch.float32)
+    attention_mask = ~torch.isnan(context)
+
+    if scale is None:
+        scale = torch.nansum(
+            torch.abs(context) * attention_mask, dim=-1
+        ) / torch.nansum(attention_mask, dim=-1)
+        scale[~(scale > 0)] = 1.0
+
+    token_ids = (
+        torch.bucketize(context / scale.unsqueeze(-1), tokenizer.boundaries, right=True)
+        + config.n_special_tokens
+    )
+    token_ids.clamp_(0, config.n_tokens - 1)
+    token_ids[~attention_mask] = config.pad_token_id
+
+    if append_eos:
+        batch_size = token_ids.shape[0]
+        token_ids = torch.concat(
+            (token_ids, torch.full((batch_size, 1), config.eos_token_id)), dim=1
+        )
+        attention_mask = torch.concat(
+            (attention_mask, torch.full((batch_size, 1), True)), dim=1
+        )
+
+    return token_ids, attention_mask, scale
+
+
+@pytest.mark.parametrize("use_eos_token", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+@pytest.mark.parametrize("context_length", [1, 16, 512])
+def test_tokenizer_matches_reference(
+    use_eos_token: bool, batch_size: int, context_length: int
+):
+    config = ChronosConfig(
+        tokenizer_class="MeanScaleUniformBins",
+        tokenizer_kwargs=dict(low_limit=-15.0, high_limit=15.0),
+        n_tokens=4096,
+        n_special_tokens=2,
+        pad_token_id=0,
+        eos_token_id=1,
+        use_eos_token=use_eos_token,
+        model_type="seq2seq",
+        context_length=context_length,
+        prediction_length=context_length,
+        num_samples=20,
+        temperature=1.0,
+        top_k=50,
+        top_p=1.0,
+    )
+    tokenizer = config.create_tokenizer()
+
+    context = 100 * torch.randn(size=(batch_size, context_length))
+    context[torch.rand_like(context) < 0.2] = torch.nan
+    context[0, :] = torch.nan  # fully missing series falls back to scale 1
+    if batch_size > 1:
+        context[1, :] = 0.0
+
+    token_ids, attention_mask, scale = tokenizer.context_input_transform(context)
+    ref_token_ids, ref_attention_mask, ref_scale = reference_input_transform(
+        tokenizer, context, append_eos=use_eos_token
+    )
+    assert torch.equal(token_ids, ref_token_ids)
+    assert torch.equal(attention_mask, ref_attention_mask)
+    assert torch.equal(scale, ref_scale)
+
+    label = 100 * torch.randn(size=(batch_size, context_length))
+    label_ids, label_mask = tokenizer.label_input_transform(label, scale)
+    ref_label_ids, ref_label_mask, _ = reference_input_transform(
+        tokenizer, label, scale=scale, append_eos=use_eos_token
+    )
+    assert torch.equal(label_ids, ref_label_ids)
+    assert torch.equal(label_mask, ref_label_mask)
+
+
+@pytest.mark.parametrize("n_tokens", [10, 4096])
+def test_tokenizer_bucketize_matches_torch(n_tokens: int):
+    tokenizer = MeanScaleUniformBins(
+        low_limit=-15.0,
+        high_limit=15.0,
+        config=ChronosConfig(
+            tokenizer_class="MeanScaleUniformBins",
+            tokenizer_kwargs={"low_limit": -15.0, "high_limit": 15.0},
+            n_tokens=n_tokens,
+            n_special_tokens=2,
+            pad_token_id=0,
+            eos_token_id=1,
+            use_eos_token=True,
+            model_type="seq2seq",
+            context_length=16,
+            prediction_length=4,
+            num_samples=1,
+            temperature=1.0,
+            top_k=50,
+            top_p=1.0,
+        ),
+    )
+    inner = tokenizer.boundaries[1:-1]
+    values = torch.cat(
+        [
+            inner,
+            torch.nextafter(inner, torch.tensor(-torch.inf)),
+            torch.nextafter(inner, torch.tensor(torch.inf)),
+            tokenizer.centers,
+            40 * torch.rand(10_000) - 20,
+            torch.tensor([-1e22, -1e20, 1e20, 1e22, -torch.inf, torch.inf]),
+        ]
+    )
+    out = torch.empty_like(values, dtype=torch.long)
+    tokenizer._bucketize(values, out=out)
+    assert torch.equal(
+        out, torch.bucketize(values, boundaries=tokenizer.boundaries, right=True)
+    )
+
+
+def test_pipeline_predict_truncates_and_buckets_uneven_context():
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+    )
+    context_length = pipeline.context_length
+    context = [
+        10 * torch.rand(50 * context_length) + 10,
+        10 * torch.rand(20) + 10,
+        10 * torch.rand(context_length) + 10,
+    ]
+
+    # long series are truncated before padding
+    context_tensor = pipeline._prepare_and_validate_context(context)
+    validate_tensor(context_tensor, (3, context_length), dtype=torch.float32)
+    assert torch.equal(context_tensor[0], context[0][-context_length:])
+    assert pipeline._length_buckets(context) == [[0, 2], [1]]
+
+    samples = pipeline.predict(context, prediction_length=3, num_samples=7)
+    validate_tensor(samples, (3, 7, 3), dtype=torch.float32)
+
+    # greedy decoding makes forecasts independent of how the batch is split
+    samples = pipeline.predict(context, prediction_length=3, num_samples=1, top_k=1)
+    for series, series_samples in zip(context, samples):
+        expected = pipeline.predict(series, prediction_length=3, num_samples=1, top_k=1)
+        assert torch.allclose(series_samples, expected[0])
+
+
 @pytest.mark.parametrize("model_dtype", [torch.float32, torch.bfloat16])
 @pytest.mark.parametrize("input_dtype", [torch.float32, torch.bfloat16, torch.int64])
 def test_pipeline_predict(model_dtype: torch.dtype, input_dtype: torch.dtype):
@@ -234,6 +390,168 @@ def test_pipeline_predict(model_dtype: torch.dtype, input_dtype: torch.dtype):
     validate_tensor(samples, shape=(1, 7, 65), dtype=torch.float32)
 
 
+@pytest.mark.parametrize("long_horizon", ["chunked", "incremental"])
+@pytest.mark.parametrize("prediction_length", [3, 65, 130])
+def test_pipeline_predict_long_horizon(long_horizon: str, prediction_length: int):
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        torch_dtype=torch.float32,
+    )
+    context = 10 * torch.rand(size=(4, 16)) + 10
+
+    samples = pipeline.predict(
+        context,
+        num_samples=7,
+        prediction_length=prediction_length,
+        long_horizon=long_horizon,
+    )
+    validate_tensor(samples, shape=(4, 7, prediction_length), dtype=torch.float32)
+
+    with pytest.raises(ValueError):
+        pipeline.predict(context, prediction_length=3, long_horizon="unknown")
+
+
+def test_pipeline_predict_long_horizon_modes_agree_within_model_horizon():
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        torch_dtype=torch.float32,
+    )
+    context = 10 * torch.rand(size=(4, 16)) + 10
+
+    torch.manual_seed(0)
+    chunked = pipeline.predict(
+        context, num_samples=7, prediction_length=12, long_horizon="chunked"
+    )
+    torch.manual_seed(0)
+    incremental = pipeline.predict(
+        context, num_samples=7, prediction_length=12, long_horizon="incremental"
+    )
+
+    assert torch.equal(chunked, incremental)
+
+
+@pytest.mark.parametrize("model_dtype", [torch.float32, torch.bfloat16])
+@pytest.mark.parametrize("prediction_length", [3, 65])
+def test_pipeline_predict_shared_encoder_decoding(
+    model_dtype: torch.dtype, prediction_length: int
+):
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        torch_dtype=model_dtype,
+    )
+    context = 10 * torch.rand(size=(4, 16)) + 10
+
+    samples = pipeline.predict(
+        context,
+        num_samples=12,
+        prediction_length=prediction_length,
+        decoding="shared_encoder",
+    )
+    validate_tensor(samples, shape=(4, 12, prediction_length), dtype=torch.float32)
+
+    samples = pipeline.predict(
+        list(context),
+        num_samples=12,
+        prediction_length=prediction_length,
+        decoding="shared_encoder",
+    )
+    validate_tensor(samples, shape=(4, 12, prediction_length), dtype=torch.float32)
+
+
+def test_shared_encoder_decoding_matches_generate():
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        torch_dtype=torch.float32,
+    )
+    context = 10 * torch.rand(size=(3, 20)) + 10
+
+    # top_k=1 makes sampling deterministic
+    generated = pipeline.predict(
+        context, num_samples=4, prediction_length=10, top_k=1, decoding="generate"
+    )
+    shared = pipeline.predict(
+        context,
+        num_samples=4,
+        prediction_length=10,
+        top_k=1,
+        decoding="shared_encoder",
+    )
+    assert torch.equal(generated, shared)
+
+    # with the same seed, both paths draw the same sample paths
+    torch.manual_seed(42)
+    generated = pipeline.predict(
+        context, num_samples=8, prediction_length=10, decoding="generate"
+    )
+    torch.manual_seed(42)
+    shared = pipeline.predict(
+        context, num_samples=8, prediction_length=10, decoding="shared_encoder"
+    )
+    assert torch.equal(generated, shared)
+
+
+@pytest.mark.parametrize("long_horizon", ["chunked", "incremental"])
+def test_per_series_generators_do_not_depend_on_the_batch(long_horizon: str):
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        torch_dtype=torch.float32,
+    )
+    context = 10 * torch.rand(size=(3, 20)) + 10
+    kwargs = dict(
+        num_samples=6,
+        prediction_length=70,
+        long_horizon=long_horizon,
+        decoding="shared_encoder",
+    )
+
+    batched = pipeline.predict(
+        context,
+        generator=[torch.Generator().manual_seed(seed) for seed in (1, 2, 3)],
+        **kwargs,
+    )
+    for i, seed in enumerate((1, 2, 3)):
+        alone = pipeline.predict(
+            context[i : i + 1],
+            generator=[torch.Generator().manual_seed(seed)],
+            **kwargs,
+        )
+        assert torch.equal(alone[0], batched[i])
+
+    with pytest.raises(ValueError, match="one generator per series"):
+        pipeline.predict(context, generator=[torch.Generator()], **kwargs)
+    with pytest.raises(ValueError, match="only supported"):
+        pipeline.predict(
+            context, num_samples=2, prediction_length=3, generator=torch.Generator()
+        )
+
+
+def test_sample_next_token():
+    logits = torch.tensor(
+        [
+            [0.0, 5.0, 1.0, 2.0],
+            [3.0, 0.0, 4.0, 1.0],
+        ]
+    )
+
+    greedy = sample_next_token(logits, top_k=1)
+    assert greedy.tolist() == [1, 2]
+
+    suppressed = sample_next_token(logits, top_k=1, suppress_token_id=1)
+    assert suppressed.tolist() == [3, 2]
+
+    nucleus = sample_next_token(logits, temperature=0.5, top_p=0.01)
+    assert nucleus.tolist() == [1, 2]
+
+    samples = sample_next_token(logits.repeat(100, 1), top_k=2)
+    assert set(samples[0::2].tolist()) <= {1, 3}
+    assert set(samples[1::2].tolist()) <= {0, 2}
+
+
 @pytest.mark.parametrize("model_dtype", [torch.float32, torch.bfloat16])
 @pytest.mark.parametrize("input_dtype", [torch.float32, torch.bfloat16, torch.int64])
 @pytest.mark.parametrize("prediction_length", [3, 65])
@@ -295,6 +613,26 @@ def test_pipeline_predict_quantiles(
     validate_tensor(mean, (1, prediction_length), dtype=torch.float32)
 
 
+@pytest.mark.parametrize("inference_mode", ["int8", "bf16"])
+def test_pipeline_inference_mode(inference_mode: str):
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+        inference_mode=inference_mode,
+    )
+    if inference_mode == "int8":
+        assert not any(
+            type(module) is torch.nn.Linear for module in pipeline.model.modules()
+        )
+    samples = pipeline.predict(
+        10 * torch.rand(size=(4, 16)) + 10, prediction_length=5, num_samples=3
+    )
+    validate_tensor(samples, (4, 3, 5), dtype=torch.float32)
+
+    with pytest.raises(ValueError):
+        pipeline.apply_inference_mode("int4")
+
+
 @pytest.mark.parametrize("model_dtype", [torch.float32, torch.bfloat16])
 @pytest.mark.parametrize("input_dtype", [torch.float32, torch.bfloat16, torch.int64])
 def test_pipeline_embed(model_dtype: torch.dtype, input_dtype: torch.dtype):
@@ -332,6 +670,32 @@ def test_pipeline_embed(model_dtype: torch.dtype, input_dtype: torch.dtype):
     validate_tensor(scale, shape=(1,), dtype=torch.float32)
 
 
+def test_pipeline_embed_pooled():
+    pipeline = ChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-model",
+        device_map="cpu",
+    )
+    d_model = pipeline.model.model.config.d_model
+    context = 10 * torch.rand(size=(4, 16)) + 10
+    context[1, :6] = torch.nan
+    num_special = 1 if pipeline.model.config.use_eos_token else 0
+
+    embedding, _ = pipeline.embed(context)
+
+    pooled = pipeline.embed_pooled(context)
+    validate_tensor(pooled, shape=(4, d_model), dtype=torch.float16)
+    observed = embedding[:, : embedding.shape[1] - num_special]
+    assert torch.allclose(pooled[0].float(), observed[0].mean(dim=0), atol=1e-3)
+    assert torch.allclose(pooled[1].float(), observed[1, 6:].mean(dim=0), atol=1e-3)
+
+    pooled = pipeline.embed_pooled(list(context), pooling="last", dtype=torch.float32)
+    validate_tensor(pooled, shape=(4, d_model), dtype=torch.float32)
+    assert torch.allclose(pooled, embedding[:, -1], atol=1e-6)
+
+    with pytest.raises(ValueError):
+        pipeline.embed_pooled(context, pooling="reg")
+
+
 @pytest.mark.parametrize("n_tokens", [10, 1000, 10000])
 def test_tokenizer_number_of_buckets(n_tokens):
     config = ChronosConfig(
@@ -15,6 +15,16 @@ def test_base_chronos_pipeline_loads_from_huggingface():
     BaseChronosPipeline.from_pretrained("amazon/chronos-bolt-tiny", device_map="cpu")
 
 
+@pytest.mark.parametrize("load", [BaseChronosPipeline, ChronosBoltPipeline])
+def test_pipeline_loads_with_path_keyword(load):
+    pipeline = load.from_pretrained(
+        pretrained_model_name_or_path=Path(__file__).parent
+        / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    assert isinstance(pipeline, ChronosBoltPipeline)
+
+
 @pytest.mark.parametrize("torch_dtype", [torch.float32, torch.bfloat16])
 @pytest.mark.parametrize("input_dtype", [torch.float32, torch.bfloat16, torch.int64])
 def test_pipeline_predict(torch_dtype: torch.dtype, input_dtype: torch.dtype):
@@ -132,6 +142,67 @@ def test_pipeline_predict_quantiles(
     validate_tensor(mean, (1, prediction_length), dtype=torch.float32)
 
 
+def test_pipeline_predict_truncates_and_buckets_uneven_context():
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    context_length = pipeline.context_length
+    context = [
+        10 * torch.rand(50 * context_length) + 10,
+        10 * torch.rand(20) + 10,
+        10 * torch.rand(context_length) + 10,
+        10 * torch.rand(32) + 10,
+    ]
+
+    # long series are truncated before padding
+    context_tensor = pipeline._prepare_and_validate_context(context)
+    validate_tensor(context_tensor, (4, context_length), dtype=torch.float32)
+    assert torch.equal(context_tensor[0], context[0][-context_length:])
+    plan = pipeline._plan_length_buckets(context_tensor)
+    assert [(indices.tolist(), length) for indices, length in plan] == [
+        ([0, 2], context_length),
+        ([1, 3], 32),  # observed lengths rounded up to the patch size of 16
+    ]
+
+    quantiles = pipeline.predict(context, prediction_length=3)
+    validate_tensor(quantiles, (4, len(pipeline.quantiles), 3), dtype=torch.float32)
+    for series, series_quantiles in zip(context, quantiles):
+        expected = pipeline.predict(series[-context_length:], prediction_length=3)
+        assert torch.allclose(series_quantiles, expected[0], atol=1e-5)
+
+    pipeline.length_bucket_ratio = None
+    assert pipeline._plan_length_buckets(context_tensor) == [(None, context_length)]
+    unbucketed = pipeline.predict(context, prediction_length=3)
+    assert torch.allclose(quantiles, unbucketed, atol=1e-5)
+
+
+def test_plan_length_buckets_trims_padding_of_short_batches():
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    context = torch.full((3, 200), torch.nan)
+    context[0, -40:] = 1.0
+    context[1, -33:] = 2.0
+    context[1, -20] = torch.nan  # gaps inside the series do not shorten it
+
+    # a single bucket is still trimmed to its longest observed length
+    assert pipeline._plan_length_buckets(context) == [(None, 48)]
+
+    quantiles = pipeline.predict(context, prediction_length=3)
+    expected = pipeline.predict(context[:, -48:], prediction_length=3)
+    assert torch.allclose(quantiles, expected)
+
+    # with long horizons, every bucket is rolled out on its own
+    context[2, :] = torch.arange(200.0)
+    quantiles = pipeline.predict(context, prediction_length=70)
+    validate_tensor(quantiles, (3, len(pipeline.quantiles), 70), dtype=torch.float32)
+    for series, series_quantiles in zip(context, quantiles):
+        expected = pipeline.predict(series, prediction_length=70)
+        assert torch.allclose(series_quantiles, expected[0], atol=1e-5)
+
+
 @pytest.mark.parametrize("model_dtype", [torch.float32, torch.bfloat16])
 @pytest.mark.parametrize("input_dtype", [torch.float32, torch.bfloat16, torch.int64])
 def test_pipeline_embed(model_dtype: torch.dtype, input_dtype: torch.dtype):
@@ -176,6 +247,154 @@ def test_pipeline_embed(model_dtype: torch.dtype, input_dtype: torch.dtype):
     validate_tensor(loc_scale[1], shape=(1,), dtype=torch.float32)
 
 
+def test_pipeline_embed_pooled():
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    d_model = pipeline.model.config.d_model
+    context = 10 * torch.rand(size=(4, 48)) + 10
+    context[1, :20] = torch.nan  # the first patch is fully missing
+
+    embedding, _ = pipeline.embed(context)
+    assert pipeline.model.chronos_config.use_reg_token
+
+    pooled = pipeline.embed_pooled(context)
+    validate_tensor(pooled, shape=(4, d_model), dtype=torch.float16)
+    assert torch.allclose(pooled[0].float(), embedding[0, :-1].mean(dim=0), atol=1e-3)
+    assert torch.allclose(pooled[1].float(), embedding[1, 1:-1].mean(dim=0), atol=1e-3)
+
+    pooled = pipeline.embed_pooled(list(context), pooling="last", dtype=torch.float32)
+    assert torch.allclose(pooled, embedding[:, -2], atol=1e-6)
+
+    pooled = pipeline.embed_pooled(context, pooling="reg", dtype=torch.float32)
+    assert torch.allclose(pooled, embedding[:, -1], atol=1e-6)
+
+
+def test_pipeline_int8_inference_mode():
+    pipeline = BaseChronosPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+        inference_mode="int8",
+    )
+    assert isinstance(pipeline, ChronosBoltPipeline)
+    assert not any(
+        type(module) is torch.nn.Linear for module in pipeline.model.modules()
+    )
+    quantiles, mean = pipeline.predict_quantiles(
+        10 * torch.rand(size=(4, 48)) + 10, prediction_length=7
+    )
+    validate_tensor(quantiles, (4, 7, 9), dtype=torch.float32)
+    validate_tensor(mean, (4, 7), dtype=torch.float32)
+
+    with pytest.raises(ValueError):
+        BaseChronosPipeline.from_pretrained(
+            Path(__file__).parent / "dummy-chronos-bolt-model",
+            device_map="cpu",
+            torch_dtype=torch.bfloat16,
+            inference_mode="int8",
+        )
+
+
+def test_pipeline_compile_matches_eager():
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    context = 10 * torch.rand(size=(5, 48)) + 10
+    context[1, :30] = torch.nan
+    expected = pipeline.predict(context, prediction_length=80)
+
+    # the "eager" backend goes through graph capture without code generation
+    pipeline.compile(backend="eager")
+    compiled = pipeline.predict(context, prediction_length=80)
+
+    assert torch.allclose(compiled, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("context_length", [100, 600])
+def test_pipeline_incremental_long_horizon(context_length: int):
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    generator = torch.Generator().manual_seed(0)
+    t = torch.arange(float(context_length))
+    context = torch.stack(
+        [
+            10
+            + torch.sin(t / 7)
+            + 0.1 * torch.randn(context_length, generator=generator),
+            50 + torch.cos(t / 5) + torch.randn(context_length, generator=generator),
+        ]
+    )
+    context[1, :20] = torch.nan
+    chunked = pipeline.predict(context, prediction_length=300)
+
+    incremental = pipeline.predict(
+        context, prediction_length=300, long_horizon="incremental"
+    )
+    validate_tensor(incremental, (2, 9, 300), dtype=torch.float32)
+
+    # with the window of the chunked rollout and re-normalizing at every
+    # chunk, the incremental rollout is the same computation
+    pipeline.incremental_window = pipeline.context_length
+    pipeline.renormalize_tolerance = 0.0
+    incremental = pipeline.predict(
+        context, prediction_length=300, long_horizon="incremental"
+    )
+    assert torch.allclose(incremental, chunked, atol=1e-4)
+
+    # statistics of a stationary context are reused for the whole horizon
+    pipeline.renormalize_tolerance = float("inf")
+    incremental = pipeline.predict(
+        context, prediction_length=300, long_horizon="incremental"
+    )
+    assert torch.allclose(incremental, chunked, rtol=0.05)
+
+    with pytest.raises(ValueError):
+        pipeline.predict(context, prediction_length=300, long_horizon="unknown")
+
+
+@pytest.mark.parametrize("context_length", [48, 100])
+def test_pipeline_incremental_long_horizon_default_window(context_length: int):
+    pipeline = ChronosBoltPipeline.from_pretrained(
+        Path(__file__).parent / "dummy-chronos-bolt-model",
+        device_map="cpu",
+    )
+    assert pipeline.incremental_window is None
+    generator = torch.Generator().manual_seed(0)
+    context = 10 + torch.rand((2, context_length), generator=generator)
+
+    # the chunked rollout over a window that keeps the width of the context,
+    # rounded up to whole patches: after the first chunk of 64 steps, a
+    # window shorter than a chunk holds predictions only
+    patch_size = pipeline.model.chronos_config.input_patch_size
+    window_length = -(-context_length // patch_size) * patch_size
+    median = pipeline.quantiles.index(0.5)
+    series, chunks = context, []
+    while sum(chunk.shape[-1] for chunk in chunks) < 200:
+        chunk = pipeline.predict(series[..., -window_length:], prediction_length=64)
+        chunks.append(chunk)
+        series = torch.cat([series, chunk[:, median]], dim=-1)
+    expected = torch.cat(chunks, dim=-1)[..., :200]
+
+    # re-normalizing at every chunk, the incremental rollout is the same computation
+    pipeline.renormalize_tolerance = 0.0
+    incremental = pipeline.predict(
+        context, prediction_length=200, long_horizon="incremental"
+    )
+    validate_tensor(incremental, (2, 9, 200), dtype=torch.float32)
+    assert torch.allclose(incremental, expected, atol=1e-4)
+
+    # with the default tolerance, the statistics are only refreshed on drift
+    pipeline.renormalize_tolerance = ChronosBoltPipeline.renormalize_tolerance
+    incremental = pipeline.predict(
+        context, prediction_length=200, long_horizon="incremental"
+    )
+    assert torch.allclose(incremental, expected, rtol=0.05)
+
+
 # The following tests have been taken from
 # https://github.com/autogluon/autogluon/blob/f57beb26cb769c6e0d484a6af2b89eab8aee73a8/timeseries/tests/unittests/models/chronos/pipeline/test_chronos_bolt.py
 # Author: Caner Turkmen <atturkm@amazon.com>
@@ -0,0 +1,167 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from pathlib import Path
+
+import pytest
+import torch
+
+from chronos import BaseChronosPipeline, EmbeddingStore
+
+DUMMY_MODELS = ["dummy-chronos-model", "dummy-chronos-bolt-model"]
+
+
+def load_pipeline(name: str) -> BaseChronosPipeline:
+    return BaseChronosPipeline.from_pretrained(
+        Path(__file__).parent / name, device_map="cpu"
+    )
+
+
+def as_tuple(state):
+    return state if isinstance(state, tuple) else (state,)
+
+
+def assert_matches_pipeline(pipeline, store_embeddings, store_state, context):
+    for i, series in enumerate(context):
+        embeddings, state = pipeline.embed(series)
+        num_positions = embeddings.shape[1]
+        assert torch.allclose(
+            store_embeddings[i, -num_positions:], embeddings[0], atol=1e-5
+        )
+        assert torch.all(store_embeddings[i, :-num_positions] == 0)
+        for store_s, s in zip(as_tuple(store_state), as_tuple(state)):
+            assert torch.allclose(store_s[i], s[0])
+
+
+@pytest.mark.parametrize("model_name", DUMMY_MODELS)
+def test_embedding_store_matches_pipeline_and_counts_hits(model_name: str):
+    pipeline = load_pipeline(model_name)
+    store = EmbeddingStore(pipeline)
+    context = [10 * torch.rand(n) + 10 for n in [40, 17, 2 * pipeline.context_length]]
+
+    embeddings, state = store.embed(context)
+    assert_matches_pipeline(pipeline, embeddings, state, context)
+    assert store.stats()["misses"] == 3
+    assert store.stats()["entries"] == 3
+
+    cached_embeddings, cached_state = store.embed(context[::-1])
+    assert store.stats()["hits"] == 3
+    assert store.stats()["hit_rate"] == 0.5
+    assert_matches_pipeline(pipeline, cached_embeddings, cached_state, context[::-1])
+
+    # only the values inside the model context length are fingerprinted
+    longer = torch.cat([torch.rand(5), context[2]])
+    store.embed([longer])
+    assert store.stats()["hits"] == 4
+
+
+@pytest.mark.parametrize(
+    "model_name, pooling",
+    [
+        ("dummy-chronos-model", "mean"),
+        ("dummy-chronos-model", "last"),
+        ("dummy-chronos-bolt-model", "mean"),
+        ("dummy-chronos-bolt-model", "last"),
+        ("dummy-chronos-bolt-model", "reg"),
+    ],
+)
+def test_embedding_store_pools_like_pipeline(model_name: str, pooling: str):
+    pipeline = load_pipeline(model_name)
+    store = EmbeddingStore(pipeline)
+    with_nans = 10 * torch.rand(40) + 10
+    # a missing value, and a whole patch of the Bolt model missing
+    with_nans[3] = torch.nan
+    with_nans[8:24] = torch.nan
+    context = [10 * torch.rand(n) + 10 for n in [17, 2 * pipeline.context_length]]
+    context.append(with_nans)
+
+    pooled = store.embed_pooled(context, pooling=pooling)
+    assert pooled.shape[0] == len(context)
+    assert pooled.dtype == torch.float16
+    for i, series in enumerate(context):
+        expected = pipeline.embed_pooled(series, pooling=pooling)
+        assert torch.allclose(pooled[i], expected[0], atol=1e-3)
+
+    # pooled again from the cached embeddings
+    assert torch.equal(store.embed_pooled(context, pooling=pooling), pooled)
+    assert store.stats()["hits"] == len(context)
+
+
+@pytest.mark.parametrize("model_name", DUMMY_MODELS)
+def test_embedding_store_invalidates_changed_keys(model_name: str):
+    pipeline = load_pipeline(model_name)
+    store = EmbeddingStore(pipeline)
+    revenue = 10 * torch.rand(30) + 10
+    expenses = 10 * torch.rand(30) + 10
+
+    store.embed([revenue, expenses], keys=["acme/4000", "acme/6000"])
+    assert store.stats()["entries"] == 2
+
+    revenue = torch.cat([revenue, torch.tensor([12.0])])  # a new ledger entry
+    embeddings, state = store.embed(
+        [revenue, expenses], keys=["acme/4000", "acme/6000"]
+    )
+    stats = store.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 2
+    assert stats["hits"] == 1
+    assert_matches_pipeline(pipeline, embeddings, state, [revenue, expenses])
+
+    store.invalidate("acme/6000")
+    assert store.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("model_name", DUMMY_MODELS)
+def test_embedding_store_spills_to_memory_mapped_file(model_name: str, tmp_path):
+    pipeline = load_pipeline(model_name)
+    store = EmbeddingStore(
+        pipeline, max_memory_mb=1e-6, spill_path=tmp_path / "embeddings.bin"
+    )
+    context = [10 * torch.rand(n) + 10 for n in [40, 17, 64]]
+
+    embeddings, state = store.embed(context)
+    stats = store.stats()
+    assert stats["spills"] == 3
+    assert stats["memory_bytes"] == 0
+    assert stats["spill_bytes"] == (tmp_path / "embeddings.bin").stat().st_size
+
+    spilled_embeddings, spilled_state = store.embed(context)
+    assert store.stats()["spill_hits"] == 3
+    assert torch.equal(spilled_embeddings, embeddings)
+    for spilled_s, s in zip(as_tuple(spilled_state), as_tuple(state)):
+        assert torch.equal(spilled_s, s)
+
+
+def test_embedding_store_reuses_space_of_dropped_spilled_entries(tmp_path):
+    pipeline = load_pipeline("dummy-chronos-model")
+    spill_path = tmp_path / "embeddings.bin"
+    store = EmbeddingStore(pipeline, max_memory_mb=1e-6, spill_path=spill_path)
+    revenue = 10 * torch.rand(30) + 10
+    expenses = 10 * torch.rand(30) + 10
+
+    store.embed([revenue, expenses], keys=["acme/4000", "acme/6000"])
+    file_size = spill_path.stat().st_size
+    for _ in range(5):
+        # a new ledger entry replaces the spilled embedding of the same size
+        revenue = torch.cat([revenue[1:], 10 * torch.rand(1) + 10])
+        embeddings, state = store.embed(
+            [revenue, expenses], keys=["acme/4000", "acme/6000"]
+        )
+        stats = store.stats()
+        assert stats["entries"] == 2
+        assert stats["spill_bytes"] == file_size == spill_path.stat().st_size
+    assert store.stats()["invalidations"] == 5
+    assert_matches_pipeline(pipeline, embeddings, state, [revenue, expenses])
+
+    store.invalidate("acme/4000")
+    store.invalidate("acme/6000")
+    assert store.stats()["spill_bytes"] == 0
+    assert spill_path.stat().st_size == 0
+
+
+def test_embedding_store_evicts_without_spill_path():
+    pipeline = load_pipeline("dummy-chronos-model")
+    store = EmbeddingStore(pipeline, max_memory_mb=1e-6)
+    store.embed([torch.rand(20), torch.rand(30)])
+    assert store.stats()["entries"] == 0
+    assert store.stats()["evictions"] == 2
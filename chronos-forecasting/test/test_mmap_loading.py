@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from pathlib import Path
+
+import pytest
+import torch
+from safetensors.torch import load_file
+
+from chronos import BaseChronosPipeline
+from chronos.mmap_loading import load_state_dict_mmap
+
+
+@pytest.mark.parametrize(
+    "model_name", ["dummy-chronos-model", "dummy-chronos-bolt-model"]
+)
+def test_mmap_loading_matches_from_pretrained(model_name: str):
+    model_path = Path(__file__).parent / model_name
+    pipeline = BaseChronosPipeline.from_pretrained(model_path, device_map="cpu")
+    mmap_pipeline = BaseChronosPipeline.from_pretrained(
+        model_path, device_map="cpu", mmap=True
+    )
+    assert type(mmap_pipeline) is type(pipeline)
+    assert not mmap_pipeline.inner_model.training
+
+    state_dict = pipeline.inner_model.state_dict()
+    mmap_state_dict = mmap_pipeline.inner_model.state_dict()
+    assert state_dict.keys() == mmap_state_dict.keys()
+    for name, tensor in state_dict.items():
+        assert torch.equal(mmap_state_dict[name], tensor), name
+
+    context = 10 * torch.rand(size=(4, 32)) + 10
+    torch.manual_seed(0)
+    expected, _ = pipeline.predict_quantiles(context, prediction_length=6)
+    torch.manual_seed(0)
+    quantiles, _ = mmap_pipeline.predict_quantiles(context, prediction_length=6)
+    assert torch.allclose(quantiles, expected)
+
+
+def test_load_state_dict_mmap_reads_safetensors_in_place():
+    checkpoint_dir = Path(__file__).parent / "dummy-chronos-bolt-model"
+    state_dict = load_state_dict_mmap(checkpoint_dir)
+    expected = load_file(checkpoint_dir / "model.safetensors")
+
+    assert state_dict.keys() == expected.keys()
+    for name, tensor in expected.items():
+        assert torch.equal(state_dict[name], tensor), name
+    # all tensors are views on one mapping of the file, not copies
+    tensors = [t for t in state_dict.values() if t.numel()]
+    start = min(t.data_ptr() for t in tensors)
+    end = max(t.data_ptr() + t.numel() * t.element_size() for t in tensors)
+    assert end - start <= (checkpoint_dir / "model.safetensors").stat().st_size
+
+
+def test_mmap_loading_requires_local_checkpoint(tmp_path: Path):
+    with pytest.raises(ValueError, match="local checkpoint directory"):
+        load_state_dict_mmap(tmp_path / "missing")
+    with pytest.raises(ValueError, match="No model checkpoint"):
+        load_state_dict_mmap(tmp_path)
+
+
+def test_mmap_loading_falls_back_on_old_torch(monkeypatch, caplog):
+    monkeypatch.setattr(torch, "__version__", "2.0.1")
+    model_path = Path(__file__).parent / "dummy-chronos-bolt-model"
+    with pytest.raises(RuntimeError, match="requires torch>=2.1"):
+        load_state_dict_mmap(model_path)
+
+    pipeline = BaseChronosPipeline.from_pretrained(
+        model_path, device_map="cpu", mmap=True
+    )
+    assert "loading the weights into memory instead" in caplog.text
+    quantiles, _ = pipeline.predict_quantiles(torch.rand(16), prediction_length=4)
+    assert quantiles.shape == (1, 4, 9)
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from pathlib import Path
+
+import pytest
+import torch
+
+from chronos import BaseChronosPipeline, ChronosBoltPipeline, ChronosPipeline
+from chronos.model_cache import load_manifest, main, prefetch, resolve, verify
+
+DUMMY_MODELS = {
+    "dummy-chronos-model": ChronosPipeline,
+    "dummy-chronos-bolt-model": ChronosBoltPipeline,
+}
+
+
+@pytest.fixture
+def model_cache(tmp_path: Path) -> Path:
+    cache_dir = tmp_path / "models"
+    prefetch([str(Path(__file__).parent / name) for name in DUMMY_MODELS], cache_dir)
+    return cache_dir
+
+
+@pytest.mark.parametrize("model_name", list(DUMMY_MODELS))
+@pytest.mark.parametrize("mmap", [False, True])
+def test_from_pretrained_resolves_from_model_cache(
+    model_cache: Path, model_name: str, mmap: bool
+):
+    model_id = str(Path(__file__).parent / model_name)
+    manifest = load_manifest(model_cache)
+    entry = manifest["models"][model_id]
+    assert entry["pipeline_class"] == DUMMY_MODELS[model_name].__name__
+    assert entry["size"] == sum(f["size"] for f in entry["files"].values())
+    assert "config.json" in entry["files"]
+
+    pipeline = BaseChronosPipeline.from_pretrained(
+        model_id, model_cache=model_cache, mmap=mmap
+    )
+    assert isinstance(pipeline, DUMMY_MODELS[model_name])
+    quantiles, _ = pipeline.predict_quantiles(torch.rand(2, 16), prediction_length=4)
+    assert quantiles.shape[:2] == (2, 4)
+
+
+def test_model_cache_rejects_missing_and_corrupted_models(model_cache: Path):
+    with pytest.raises(ValueError, match="not in the model cache"):
+        BaseChronosPipeline.from_pretrained(
+            "amazon/chronos-t5-small", model_cache=model_cache
+        )
+
+    model_id = str(Path(__file__).parent / "dummy-chronos-bolt-model")
+    weights = resolve(model_id, model_cache) / "model.safetensors"
+    data = bytearray(weights.read_bytes())
+    data[-1] ^= 0xFF
+    weights.write_bytes(bytes(data))
+    # sizes still match, so only the hash check notices
+    assert resolve(model_id, model_cache) == weights.parent
+    assert verify(model_id, model_cache) == [
+        "model.safetensors does not match its SHA-256"
+    ]
+    with pytest.raises(SystemExit):
+        main(["verify", model_id, "--cache-dir", str(model_cache)])
+
+    weights.write_bytes(bytes(data[:-8]))
+    with pytest.raises(ValueError, match="corrupted"):
+        BaseChronosPipeline.from_pretrained(model_id, model_cache=model_cache)
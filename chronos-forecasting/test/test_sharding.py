@@ -0,0 +1,65 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from pathlib import Path
+
+import pytest
+import torch
+
+from chronos import BaseChronosPipeline, ChronosBoltPipeline, ShardedExecutor
+from test.util import validate_tensor
+
+
+def load_pipeline(name: str) -> BaseChronosPipeline:
+    return BaseChronosPipeline.from_pretrained(
+        Path(__file__).parent / name, device_map="cpu"
+    )
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_sharded_executor_matches_pipeline(backend: str):
+    pipeline = load_pipeline("dummy-chronos-bolt-model")
+    assert isinstance(pipeline, ChronosBoltPipeline)
+    context = [10 * torch.rand(n) + 10 for n in [40, 17, 300, 64, 5, 128, 90]]
+    tensor_context = 10 * torch.rand(size=(5, 48)) + 10
+    expected = pipeline.predict(context, prediction_length=12)
+    expected_quantiles, expected_mean = pipeline.predict_quantiles(
+        context, prediction_length=12, quantile_levels=[0.1, 0.5, 0.9]
+    )
+
+    with ShardedExecutor(
+        pipeline, num_workers=3, threads_per_worker=1, backend=backend
+    ) as executor:
+        predictions = executor.predict(context, prediction_length=12)
+        quantiles, mean = executor.predict_quantiles(
+            context, prediction_length=12, quantile_levels=[0.1, 0.5, 0.9]
+        )
+        tensor_predictions = executor.predict(tensor_context)
+
+    assert torch.allclose(predictions, expected, atol=1e-5)
+    assert torch.allclose(quantiles, expected_quantiles, atol=1e-5)
+    assert torch.allclose(mean, expected_mean, atol=1e-5)
+    assert torch.allclose(
+        tensor_predictions, pipeline.predict(tensor_context), atol=1e-5
+    )
+
+
+def test_sharded_executor_with_sampling_pipeline():
+    pipeline = load_pipeline("dummy-chronos-model")
+    context = 10 * torch.rand(size=(5, 16)) + 10
+
+    with ShardedExecutor(pipeline, num_workers=2, min_shard_size=2) as executor:
+        assert executor._shards(context) == [[0, 1, 2], [3, 4]]
+        # too small to be split
+        assert executor._shards(context[:3]) == [[0, 1, 2]]
+        samples = executor.predict(context, prediction_length=3, num_samples=4)
+        single = executor.predict(context[0], prediction_length=3, num_samples=4)
+
+    validate_tensor(samples, (5, 4, 3), dtype=torch.float32)
+    validate_tensor(single, (1, 4, 3), dtype=torch.float32)
+
+
+def test_sharded_executor_raises_on_unknown_backend():
+    pipeline = load_pipeline("dummy-chronos-bolt-model")
+    with pytest.raises(ValueError):
+        ShardedExecutor(pipeline, backend="gpu")
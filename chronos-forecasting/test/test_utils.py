@@ -1,10 +1,11 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import numpy as np
 import pytest
 import torch
 
-from chronos.utils import left_pad_and_stack_1D
+from chronos.utils import left_pad_and_stack_1D, length_buckets, sample_quantiles
 
 
 @pytest.mark.parametrize(
@@ -15,7 +16,7 @@ from chronos.utils import left_pad_and_stack_1D
             torch.tensor([4.0, 5.0, 6.0], dtype=dtype),
             torch.tensor([7.0, 8.0, 9.0, 10.0], dtype=dtype),
         ]
-        for dtype in [torch.int, torch.float16, torch.float32]
+        for dtype in [torch.int, torch.float16, torch.bfloat16, torch.float32]
     ],
 )
 def test_pad_and_stack(tensors: list):
@@ -27,3 +28,103 @@ def test_pad_and_stack(tensors: list):
     ref = torch.concat(tensors).to(dtype=stacked_and_padded.dtype)
 
     assert torch.sum(torch.nan_to_num(stacked_and_padded, nan=0)) == torch.sum(ref)
+
+
+@pytest.mark.parametrize(
+    "series",
+    [
+        [torch.tensor([2.0, 3.0]), torch.tensor([4.0, 5.0, 6.0]), torch.tensor([])],
+        [np.array([2.0, 3.0]), np.array([4.0, 5.0, 6.0]), np.array([])],
+        [[2.0, 3.0], [4.0, 5.0, 6.0], []],
+        [np.array([2.0, 3.0]), [4.0, 5.0, 6.0], torch.tensor([])],
+    ],
+)
+def test_pad_and_stack_right_aligns_values(series: list):
+    stacked_and_padded = left_pad_and_stack_1D(series)
+
+    expected = torch.tensor(
+        [[torch.nan, 2.0, 3.0], [4.0, 5.0, 6.0], [torch.nan] * 3],
+        dtype=stacked_and_padded.dtype,
+    )
+    assert stacked_and_padded.shape == (3, 3)
+    assert torch.allclose(stacked_and_padded, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize("max_length", [1, 2, 3, 10])
+def test_pad_and_stack_truncates_to_max_length(max_length: int):
+    series = [np.arange(5.0), [1.0, 2.0], torch.arange(3.0)]
+    stacked_and_padded = left_pad_and_stack_1D(series, max_length=max_length)
+
+    max_len = min(5, max_length)
+    assert stacked_and_padded.shape == (3, max_len)
+    for row, s in zip(stacked_and_padded, series):
+        n = min(len(s), max_length)
+        assert torch.isnan(row[: max_len - n]).all()
+        assert torch.equal(
+            row[max_len - n :], torch.as_tensor(np.asarray(s[len(s) - n :]))
+        )
+
+
+def test_pad_and_stack_dtype_promotion():
+    assert left_pad_and_stack_1D([[1, 2], [3]]).dtype == torch.float32
+    assert left_pad_and_stack_1D([np.arange(3)]).dtype == torch.float32
+    assert left_pad_and_stack_1D([np.arange(3.0)]).dtype == torch.float64
+    assert left_pad_and_stack_1D([torch.arange(3.0, dtype=torch.float64)]).dtype == (
+        torch.float64
+    )
+
+
+@pytest.mark.parametrize(
+    "lengths, max_ratio, expected",
+    [
+        ([10, 20, 30], 4.0, [[2, 1, 0]]),
+        ([512, 8, 400, 100, 0], 4.0, [[0, 2], [3], [1, 4]]),
+        ([512, 8, 400, 100, 0], 8.0, [[0, 2, 3], [1, 4]]),
+        ([0, 0], 4.0, [[0, 1]]),
+    ],
+)
+def test_length_buckets(lengths: list, max_ratio: float, expected: list):
+    buckets = length_buckets(lengths, max_ratio=max_ratio)
+    assert buckets == expected
+    for bucket in buckets:
+        assert len(length_buckets([lengths[i] for i in bucket], max_ratio)) == 1
+
+
+@pytest.mark.parametrize("method", ["sort", "select"])
+@pytest.mark.parametrize("num_samples", [1, 2, 20, 101])
+def test_sample_quantiles_matches_torch_quantile(method: str, num_samples: int):
+    samples = torch.randn(3, num_samples, 5)
+    quantile_levels = [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0]
+
+    quantiles, mean = sample_quantiles(samples, quantile_levels, method=method)
+
+    expected = torch.quantile(
+        samples.swapaxes(1, 2), q=torch.tensor(quantile_levels), dim=-1
+    ).permute(1, 2, 0)
+    assert quantiles.shape == (3, 5, len(quantile_levels))
+    assert torch.allclose(quantiles, expected, atol=1e-6)
+    assert torch.allclose(mean, samples.mean(dim=1))
+
+
+def test_sample_quantiles_histogram_error_is_bounded():
+    samples = torch.randn(2, 5000, 4)
+    quantile_levels = [0.1, 0.5, 0.9]
+    num_bins = 512
+
+    quantiles, _ = sample_quantiles(
+        samples, quantile_levels, method="histogram", num_bins=num_bins, chunk_size=300
+    )
+
+    expected, _ = sample_quantiles(samples, quantile_levels)
+    bin_width = (samples.amax(dim=1) - samples.amin(dim=1)) / num_bins
+    assert torch.all((quantiles - expected).abs() <= bin_width.unsqueeze(-1) + 1e-6)
+
+    constant, _ = sample_quantiles(torch.ones(1, 10, 2), [0.5], method="histogram")
+    assert torch.equal(constant, torch.ones(1, 2, 1))
+
+
+def test_sample_quantiles_raises_on_invalid_input():
+    with pytest.raises(ValueError):
+        sample_quantiles(torch.randn(1, 5, 2), [0.5], method="unknown")
+    with pytest.raises(ValueError):
+        sample_quantiles(torch.randn(1, 5, 2), [1.5])
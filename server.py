@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import asyncio
 import random
 import os
 import requests
@@ -8,6 +9,12 @@ from jwt_utils import verify_token
 from adapters.ytj_adapter import YTJAdapter
 from adapters.NOCFO_adapter import NOCFOAdapter
 from adapters.financial_monitor import FinancialMonitorAdapter
+from adapters.model_registry import registry as model_registry
+from adapters.forecast_cache import forecast_cache
+from adapters.forecast_batcher import forecast_batcher
+from adapters.forecast_workers import forecast_workers
+from adapters.ledger_source import sources_stats
+from adapters.company_similarity import CompanySimilarityIndex
 
 
 
@@ -19,8 +26,10 @@ os.environ.pop("http_proxy", None)
 # Create server
 mcp = FastMCP("Echo Server", client_session_timeout_seconds=300,)
 ytj = YTJAdapter()
-nocfo = NOCFOAdapter()
+# The Chronos model loads in a background thread; only forecast tools wait for it.
+nocfo = NOCFOAdapter(lazy=True)
 monitor = FinancialMonitorAdapter()
+similarity = CompanySimilarityIndex(nocfo)
 
 
 load_dotenv()
@@ -98,7 +107,7 @@ Returns:
 
 
 @mcp.tool()
-def forecast_financials(company_name: str, metric: str, forecast_periods: int = 12):
+async def forecast_financials(company_name: str, metric: str, forecast_periods: int = 12, frequency: Optional[str] = None):
     """
     Predict future trends of a company's financial metric using the Hugging Face Chronos time series model.
 
@@ -110,17 +119,19 @@ def forecast_financials(company_name: str, metric: str, forecast_periods: int =
                          The company must exist in the financial data file (NOCFO.json).
     - metric (str): The financial metric to forecast (e.g., "cash_and_cash_equivalents", "net_income", "revenue").
                     The metric should match account names in the ledger (lowercased and underscored).
-    - forecast_periods (int): Number of future time steps to forecast. Default is 12.
+    - forecast_periods (int): Number of future periods to forecast. Default is 12.
+    - frequency (str, optional): Period of the series, "daily", "weekly" or "monthly". The ledger entries of the
+                    matching accounts are summed per period. Default is "monthly" (or NOCFO_FORECAST_FREQUENCY).
 
     Functionality:
-    - Extracts historical time series for the specified metric.
+    - Extracts the historical time series of the specified metric, one value per period.
     - Applies the Chronos transformer model to forecast the metric for future periods.
     - Provides 0.1 / 0.5 / 0.9 quantile forecasts (with uncertainty bounds).
     - Returns a visualized plot of the forecast in base64 PNG format.
 
     Returns:
     {
-        "historical": List[float],      # historical values
+        "historical": List[float],      # historical values, one per period
         "forecast": List[float],        # median predicted values
         "plot_base64": str              # PNG chart of the forecast (base64-encoded)
     }
@@ -130,7 +141,14 @@ def forecast_financials(company_name: str, metric: str, forecast_periods: int =
     - Project future revenue based on ledger history.
     - Evaluate risk or capital needs using predictive insights.
     """
-    result = nocfo.forecast_company_metric(company_name, metric, forecast_periods)
+    try:
+        await nocfo.wait_until_ready()
+    except TimeoutError as e:
+        return {"error": str(e)}
+
+    # Awaiting lets concurrent sessions' forecasts be batched into one model call,
+    # run in worker processes when CHRONOS_FORECAST_WORKERS is set.
+    result = await nocfo.forecast_company_metric_async(company_name, metric, forecast_periods, frequency)
 
     return {
         "type": "image",
@@ -144,7 +162,7 @@ def forecast_financials(company_name: str, metric: str, forecast_periods: int =
 
 
 @mcp.tool()
-def monitor_financial_health(token: Optional[str] = None) -> dict:
+async def monitor_financial_health(token: Optional[str] = None) -> dict:
     """
     Analyzes company financial health and returns structured data for UI rendering and LLM summarization.
 
@@ -160,12 +178,76 @@ def monitor_financial_health(token: Optional[str] = None) -> dict:
 
     user_info = verify_token(token)
 
+    try:
+        await monitor.wait_until_ready()
+    except TimeoutError as e:
+        return {"error": str(e)}
 
-    tool_output = monitor.run_monitoring(company_id=user_info["company_id"])
+    # Forecasts run in the batcher thread or the worker processes; awaiting them keeps other tools responsive.
+    tool_output = await monitor.run_monitoring_async(company_id=user_info["company_id"])
 
 
     return tool_output
 
+
+@mcp.tool()
+async def find_similar_companies(company_name: str, account_number: int = 1910, k: int = 3) -> dict:
+    """
+    Find the companies whose ledger account behaves most like the given company's.
+
+    Each company's ledger series are embedded with the Chronos encoder into
+    compact vectors, and the most similar series of other companies are
+    returned by cosine similarity. Use it for questions like "which companies
+    have similar cash-flow dynamics to TechNova?".
+
+    Parameters:
+    - company_name (str): The company to compare (e.g., "TechNova").
+    - account_number (int): Ledger account to compare, 1910 (cash) by default.
+    - k (int): Number of similar companies to return. Default is 3.
+
+    Returns:
+    {
+        "company": str,
+        "account_number": int,
+        "matches": [{"company", "account_number", "account_name", "similarity"}],
+        "query_ms": float
+    }
+    """
+    try:
+        await nocfo.wait_until_ready()
+    except TimeoutError as e:
+        return {"error": str(e)}
+
+    # embedding the ledger on the first call takes a while; keep the event loop free
+    return await asyncio.to_thread(similarity.find_similar, company_name, account_number=account_number, k=k)
+
+
+@mcp.tool()
+def model_status() -> dict:
+    """
+    Report readiness of the Chronos forecasting model.
+
+    Use this tool to check whether forecast tools can answer right away or are
+    still waiting for the model to finish loading after a server restart.
+
+    Returns:
+        A dictionary containing:
+        - "ready" (bool): True once the forecasting model is loaded.
+        - "warmups" (list): Per-model load state, elapsed seconds and time-to-ready.
+        - "loads", "hits", "evictions" (int): Model registry counters.
+        - "forecast_cache" (dict): Forecast cache size and hit/miss counters.
+        - "forecast_batcher" (dict): Batch sizes, throughput and queueing latency of batched forecasts.
+        - "forecast_workers" (dict): Worker processes, free shared-memory slots and latency of pooled forecasts.
+        - "data_sources" (list): Per data file parse count and load time; "loads" stays flat unless the file changes.
+    """
+    status = model_registry.stats()
+    status["ready"] = model_registry.is_loaded(nocfo.model_id)
+    status["forecast_cache"] = forecast_cache.stats()
+    status["forecast_batcher"] = forecast_batcher.stats()
+    status["forecast_workers"] = forecast_workers.stats()
+    status["data_sources"] = sources_stats()
+    return status
+
 # ================================
 # YTJ related
 # ================================
@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import base64
 from dotenv import load_dotenv
 from server import monitor_financial_health
@@ -25,7 +26,7 @@ def run_tool_test():
     print("Step 2: Calling the tool function directly...")
     tool_output = None
     try:
-        tool_output = monitor_financial_health(token=token)
+        tool_output = asyncio.run(monitor_financial_health(token=token))
         print("✅ Tool function executed without errors.")
     except Exception as e:
         print(f"❌ Tool function failed with an exception: {e}")
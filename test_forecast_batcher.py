@@ -0,0 +1,63 @@
+import os
+
+import pytest
+import torch
+from chronos import ChronosPipeline
+
+from adapters.forecast_batcher import ForecastBatcher
+from adapters.forecast_cache import ForecastCache
+
+DUMMY_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chronos-forecasting", "test", "dummy-chronos-model")
+QUANTILES = [0.1, 0.5, 0.9]
+
+
+def _forecast_all(batcher, pipeline, contexts, **predict_kwargs):
+    futures = [
+        batcher.submit(pipeline, "dummy", context, prediction_length=8, quantile_levels=QUANTILES, seed=7, **predict_kwargs)
+        for context in contexts
+    ]
+    return [future.result(timeout=60) for future in futures]
+
+
+def test_series_forecast_is_the_same_alone_and_in_a_batch():
+    pipeline = ChronosPipeline.from_pretrained(DUMMY_MODEL, device_map="cpu", torch_dtype=torch.float32)
+    torch.manual_seed(0)
+    contexts = [10 * torch.rand(n) + 10 for n in (12, 20, 31, 20)]
+
+    for predict_kwargs in ({"decoding": "shared_encoder", "num_samples": 16}, {"num_samples": 16}):
+        # a long wait puts all requests into one batch
+        batched = _forecast_all(ForecastBatcher(max_wait_ms=500, cache=None), pipeline, contexts, **predict_kwargs)
+        for context, (quantiles, mean) in zip(contexts, batched):
+            alone_quantiles, alone_mean = _forecast_all(ForecastBatcher(cache=None), pipeline, [context], **predict_kwargs)[0]
+            # same sample paths; only the float rounding of the padded batch may differ
+            torch.testing.assert_close(quantiles, alone_quantiles)
+            torch.testing.assert_close(mean, alone_mean)
+
+        # in another batch and position, and from the cache, the forecast is the same too
+        cache = ForecastCache()
+        batcher = ForecastBatcher(max_wait_ms=500, cache=cache)
+        reordered = _forecast_all(batcher, pipeline, contexts[::-1], **predict_kwargs)[::-1]
+        cached = _forecast_all(batcher, pipeline, contexts, **predict_kwargs)
+        assert batcher.stats()["cache_hits"] == len(contexts)
+        for expected, other, hit in zip(batched, reordered, cached):
+            torch.testing.assert_close(expected, other)
+            assert torch.equal(other[0], hit[0])
+
+
+class _BrokenCache(ForecastCache):
+    def put(self, key, value):
+        raise OSError("disk full")
+
+
+def test_batcher_survives_a_failing_batch():
+    pipeline = ChronosPipeline.from_pretrained(DUMMY_MODEL, device_map="cpu", torch_dtype=torch.float32)
+    batcher = ForecastBatcher(cache=_BrokenCache())
+    future = batcher.submit(pipeline, "dummy", torch.rand(16), prediction_length=4, quantile_levels=QUANTILES)
+    with pytest.raises(OSError, match="disk full"):
+        future.result(timeout=60)
+
+    batcher.cache = None
+    quantiles, _ = batcher.submit(pipeline, "dummy", torch.rand(16), prediction_length=4, quantile_levels=QUANTILES).result(timeout=60)
+    assert quantiles.shape == (1, 4, len(QUANTILES))
+    assert batcher.stats()["errors"] == 1
+
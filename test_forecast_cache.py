@@ -0,0 +1,86 @@
+import os
+import types
+
+import torch
+from chronos import ChronosPipeline
+
+import adapters.forecast_cache as forecast_cache_module
+from adapters.forecast_batcher import predict_quantiles_seeded
+from adapters.forecast_cache import ForecastCache
+from adapters.model_registry import registry
+
+DUMMY_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chronos-forecasting", "test", "dummy-chronos-model")
+QUANTILES = [0.1, 0.5, 0.9]
+
+
+def _value(x: float):
+    return torch.full((1, 4, 3), x), torch.full((1, 4), x)
+
+
+def _key(context, seed=0, **kwargs):
+    return ForecastCache.make_key("dummy", context, 4, QUANTILES, seed, **kwargs)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, tmp_path):
+    clock = types.SimpleNamespace(time=lambda: 1000.0)
+    monkeypatch.setattr(forecast_cache_module, "time", clock)
+    cache = ForecastCache(ttl_seconds=60, persist_dir=str(tmp_path))
+    key = _key(torch.ones(8))
+    cache.put(key, _value(1.0))
+
+    clock.time = lambda: 1059.0
+    assert torch.equal(cache.get(key)[0], _value(1.0)[0])
+    clock.time = lambda: 1061.0
+    assert cache.get(key) is None
+    # expired on disk too, and removed from there
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ForecastCache(max_entries=2)
+    keys = [_key(torch.full((8,), float(i))) for i in range(3)]
+    cache.put(keys[0], _value(0.0))
+    cache.put(keys[1], _value(1.0))
+    assert cache.get(keys[0]) is not None  # keys[1] is now the least recently used
+    cache.put(keys[2], _value(2.0))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_persist_across_instances(tmp_path):
+    key = _key(torch.ones(8))
+    ForecastCache(persist_dir=str(tmp_path)).put(key, _value(3.0))
+
+    cache = ForecastCache(persist_dir=str(tmp_path))
+    quantiles, mean = cache.get(key)
+    assert torch.equal(quantiles, _value(3.0)[0])
+    assert torch.equal(mean, _value(3.0)[1])
+
+    # the disk is pruned to max_entries like the memory
+    small = ForecastCache(max_entries=2, persist_dir=str(tmp_path))
+    for i in range(4):
+        small.put(_key(torch.full((8,), float(i))), _value(float(i)))
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_identical_keys_and_seeds_give_identical_forecasts():
+    pipeline = ChronosPipeline.from_pretrained(DUMMY_MODEL, device_map="cpu", torch_dtype=torch.float32)
+    model_info = registry.model_info(pipeline, DUMMY_MODEL)
+    context = 10 * torch.rand(24) + 10
+    key = _key(context, seed=3, model_info=model_info, num_samples=16)
+    assert key == _key(context.clone(), seed=3, model_info=dict(model_info), num_samples=16)
+    # anything the forecast depends on changes the key
+    assert key != _key(context, seed=4, model_info=model_info, num_samples=16)
+    assert key != _key(context, seed=3, model_info=model_info, num_samples=32)
+    assert key != _key(context, seed=3, model_info=dict(model_info, inference_mode="int8"), num_samples=16)
+
+    first = predict_quantiles_seeded(pipeline, [context], 4, QUANTILES, seed=3, num_samples=16)
+    second = predict_quantiles_seeded(pipeline, [context.clone()], 4, QUANTILES, seed=3, num_samples=16)
+    assert torch.equal(first[0], second[0])
+    assert torch.equal(first[1], second[1])
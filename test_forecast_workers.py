@@ -0,0 +1,76 @@
+import os
+
+import pytest
+import torch
+from chronos import ChronosPipeline
+
+from adapters.forecast_batcher import ForecastBatcher
+from adapters.forecast_workers import ForecastWorkerPool, ForecastWorkerService
+
+DUMMY_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chronos-forecasting", "test", "dummy-chronos-model")
+QUANTILES = [0.1, 0.5, 0.9]
+PREDICT_KWARGS = {"decoding": "shared_encoder", "num_samples": 16}
+
+
+def _load(**kwargs) -> ChronosPipeline:
+    return ChronosPipeline.from_pretrained(DUMMY_MODEL, device_map="cpu", torch_dtype=torch.float32, **kwargs)
+
+
+def _contexts():
+    generator = torch.Generator().manual_seed(0)
+    return [10 * torch.rand(n, generator=generator) + 10 for n in (12, 20, 31, 20)]
+
+
+def _assert_pool_matches_batcher(pipeline):
+    contexts = _contexts()
+    batcher = ForecastBatcher(cache=None)
+    expected = [
+        batcher.submit(pipeline, "dummy", c, prediction_length=8, quantile_levels=QUANTILES, seed=7, **PREDICT_KWARGS).result(timeout=60)
+        for c in contexts
+    ]
+
+    pool = ForecastWorkerPool(pipeline, num_workers=2, threads_per_worker=1)
+    try:
+        futures = [pool.submit(c, 8, QUANTILES, seed=7, **PREDICT_KWARGS) for c in contexts]
+        for future, (quantiles, mean) in zip(futures, expected):
+            pool_quantiles, pool_mean = future.result(timeout=120)
+            torch.testing.assert_close(pool_quantiles, quantiles)
+            torch.testing.assert_close(pool_mean, mean)
+        stats = pool.stats()
+        assert stats["workers_alive"] == 2
+        assert stats["errors"] == 0
+        return stats
+    finally:
+        pool.close()
+
+
+def test_pool_forecasts_like_the_batcher():
+    stats = _assert_pool_matches_batcher(_load())
+    assert not stats["quantized"]
+
+
+def test_pool_forecasts_int8_pipelines():
+    stats = _assert_pool_matches_batcher(_load(inference_mode="int8"))
+    assert stats["quantized"]
+
+
+def test_closing_the_pool_fails_pending_forecasts():
+    pool = ForecastWorkerPool(_load(), num_workers=1, threads_per_worker=1, slots=1)
+    futures = [pool.submit(c, 8, QUANTILES, **PREDICT_KWARGS) for c in _contexts()]
+    pool.close()
+    for future in futures:
+        # each one either completed or failed, none is left hanging
+        if future.exception(timeout=10) is not None:
+            with pytest.raises(RuntimeError, match="closed"):
+                future.result()
+    assert any(future.exception() is not None for future in futures)
+
+
+def test_worker_service_forecasts_long_horizons_in_process():
+    service = ForecastWorkerService(num_workers=1, max_prediction_length=8, cache=None)
+    # longer than the slots of the pool: no pool is started
+    quantiles, mean = service.submit(_load(), "dummy", torch.rand(16), prediction_length=12, quantile_levels=QUANTILES).result(timeout=60)
+    assert quantiles.shape == (1, 12, len(QUANTILES))
+    assert mean.shape == (1, 12)
+    assert service.stats()["fallbacks"] == 1
+    assert service.stats()["pools"] == {}
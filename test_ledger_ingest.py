@@ -0,0 +1,146 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from adapters.ledger_snapshot import compile_snapshot, is_current, load_snapshot, write_snapshot
+from adapters.ledger_source import LedgerSource
+from adapters.ledger_store import LedgerStore
+from adapters.ledger_stream import CHUNK_SIZE, stream_company, stream_company_names, stream_ledger
+
+NOCFO_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "NOCFO.json")
+# a chunk size of one byte cuts every token, escape and multi-byte character
+CHUNK_SIZES = [1, 7, CHUNK_SIZE]
+
+# non-ASCII names, escapes, brackets inside strings, account numbers given
+# as strings and after the entries, and sections the reader skips
+ODD_DATA = {
+    'Å "quoted" Oy': {
+        "ledger": [
+            {
+                "entries": [
+                    {"date": "2024-01-02", "debit": 1.5e3, "credit": 0, "description": 'é\\"☃ ]}'},
+                    {"date": "2024-02-01", "debit": 0, "credit": 12, "document_number": "A-1"},
+                ],
+                "account_name": "Cash é",
+                "account_number": "1910",
+            },
+            {"account_number": 3000, "account_name": "Sales", "entries": []},
+        ],
+        "journal": [[{"a": "]}"}], {"b": "[{"}],
+    },
+    "Empty": {"ledger": []},
+}
+
+
+def assert_same_store(expected: LedgerStore, actual: LedgerStore):
+    assert actual.companies == expected.companies
+    for company in expected.companies:
+        assert actual.accounts(company) == expected.accounts(company)
+    assert list(actual.strings) == list(expected.strings)
+    for name in LedgerStore.COLUMNS:
+        assert actual.columns[name].dtype == expected.columns[name].dtype
+        np.testing.assert_array_equal(actual.columns[name], expected.columns[name])
+
+
+@pytest.fixture
+def nocfo_json(tmp_path):
+    path = tmp_path / "NOCFO.json"
+    with open(NOCFO_JSON, "rb") as f:
+        path.write_bytes(f.read())
+    return str(path)
+
+
+@pytest.fixture
+def odd_json(tmp_path):
+    path = tmp_path / "odd.json"
+    path.write_text(json.dumps(ODD_DATA, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_stream_ledger_matches_json_load(chunk_size):
+    with open(NOCFO_JSON, encoding="utf-8") as f:
+        data = json.load(f)
+    store, stats = stream_ledger(NOCFO_JSON, chunk_size=chunk_size)
+    assert_same_store(LedgerStore.from_data(data), store)
+    assert stats["bytes"] == os.path.getsize(NOCFO_JSON)
+    assert stats["entries"] == len(store)
+
+    company = list(data)[-1]
+    assert stream_company(NOCFO_JSON, company, chunk_size=chunk_size) == data[company]
+    assert stream_company_names(NOCFO_JSON, chunk_size=chunk_size) == list(data)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_stream_ledger_handles_unusual_json(odd_json, chunk_size):
+    store, _ = stream_ledger(odd_json, chunk_size=chunk_size)
+    assert_same_store(LedgerStore.from_data(ODD_DATA), store)
+    assert stream_company(odd_json, 'Å "quoted" Oy', chunk_size=chunk_size) == ODD_DATA['Å "quoted" Oy']
+
+
+def test_stream_ledger_reads_only_requested_companies():
+    with open(NOCFO_JSON, encoding="utf-8") as f:
+        data = json.load(f)
+    company = list(data)[0]
+    store, stats = stream_ledger(NOCFO_JSON, companies=[company], chunk_size=1024)
+    assert_same_store(LedgerStore.from_data({company: data[company]}), store)
+    # reading stops after the first company
+    assert stats["bytes"] < os.path.getsize(NOCFO_JSON)
+
+    with pytest.raises(KeyError):
+        stream_company(NOCFO_JSON, "No Such Company")
+
+
+@pytest.mark.parametrize("chunk_size", [7, CHUNK_SIZE])
+def test_stream_ledger_rejects_truncated_json(tmp_path, chunk_size):
+    path = tmp_path / "truncated.json"
+    with open(NOCFO_JSON, "rb") as f:
+        path.write_bytes(f.read()[:-50])
+    with pytest.raises(ValueError):
+        stream_ledger(str(path), chunk_size=chunk_size)
+
+
+def test_snapshot_round_trip(nocfo_json, odd_json, tmp_path):
+    path = compile_snapshot(nocfo_json)
+    assert path == str(tmp_path / "NOCFO.ledger")
+    assert is_current(path, nocfo_json)
+    store = load_snapshot(path, nocfo_json)
+    assert_same_store(LedgerStore.from_json(nocfo_json), store)
+    # mapped read-only, not copied
+    assert not store.columns["debit"].flags.writeable
+    source = LedgerSource(nocfo_json, snapshot=path)
+    assert_same_store(store, source.ledger)
+    assert source.mode == "snapshot"
+
+    for data, name in ((ODD_DATA, "odd.ledger"), ({}, "empty.ledger")):
+        write_snapshot(LedgerStore.from_data(data), str(tmp_path / name))
+        assert_same_store(LedgerStore.from_data(data), load_snapshot(str(tmp_path / name)))
+
+
+def test_stale_and_truncated_snapshots_are_rejected(nocfo_json, tmp_path):
+    path = compile_snapshot(nocfo_json)
+    with open(path, "rb") as f:
+        contents = f.read()
+
+    truncated = tmp_path / "truncated.ledger"
+    truncated.write_bytes(contents[:-100])
+    with pytest.raises(ValueError, match="truncated"):
+        load_snapshot(str(truncated))
+
+    garbage = tmp_path / "garbage.ledger"
+    garbage.write_bytes(b"garbage")
+    with pytest.raises(ValueError, match="not a ledger snapshot"):
+        load_snapshot(str(garbage))
+
+    st = os.stat(nocfo_json)
+    os.utime(nocfo_json, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert not is_current(path, nocfo_json)
+    with pytest.raises(ValueError, match="out of date"):
+        load_snapshot(path, nocfo_json)
+
+    # the source falls back to parsing the JSON file
+    source = LedgerSource(nocfo_json, snapshot=path)
+    assert_same_store(LedgerStore.from_json(nocfo_json), source.ledger)
+    assert source.mode == "json"
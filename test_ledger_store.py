@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from adapters.ledger_store import LedgerStore, forecast_index
+
+# no cash entries in March
+DATA = {
+    "Acme": {
+        "ledger": [
+            {
+                "account_number": 1910,
+                "account_name": "Cash and equivalents",
+                "entries": [
+                    {"date": "2024-01-15", "debit": 100, "credit": 0},
+                    {"date": "2024-01-31", "debit": 0, "credit": 30},
+                    {"date": "2024-02-10", "debit": 50, "credit": 0},
+                    {"date": "2024-04-02", "debit": 0, "credit": 20},
+                ],
+            },
+            {
+                "account_number": 3000,
+                "account_name": "Sales",
+                "entries": [{"date": "2024-03-05", "debit": 0, "credit": 999}],
+            },
+        ]
+    }
+}
+
+
+def days(index: pd.DatetimeIndex) -> list:
+    return index.strftime("%Y-%m-%d").tolist()
+
+
+def test_metric_series_fills_gap_months_and_forecast_continues_it():
+    store = LedgerStore.from_data(DATA)
+    series = store.metric_series("Acme", "cash_and_equivalents")
+    assert days(series.index) == ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"]
+    assert series.tolist() == [70, 50, 0, -20]
+
+    expected_forecast = ["2024-05-01", "2024-06-01", "2024-07-01"]
+    assert days(forecast_index(series.index, 3)) == expected_forecast
+    # an index without a frequency, e.g. after slicing by position
+    history = series.index[[0, 1, 3]]
+    assert history.freq is None
+    assert days(forecast_index(history, 3)) == expected_forecast
+
+
+@pytest.mark.parametrize("frequency", ["daily", "weekly", "monthly"])
+def test_forecast_index_continues_each_frequency(frequency):
+    series = LedgerStore.from_data(DATA).metric_series("Acme", "cash", frequency=frequency)
+    index = forecast_index(series.index, 4, frequency)
+    assert len(index) == 4
+    assert index[0] > series.index[-1]
+    # the history and the forecast together are one regular range
+    combined = series.index.append(index)
+    assert pd.infer_freq(combined) is not None
+    assert (combined[1:] - combined[:-1]).min() > pd.Timedelta(0)